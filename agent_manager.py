@@ -1,60 +1,157 @@
+import threading
+import time
 import streamlit as st
 from prompts import ERROR_BREAKDOWN, ERROR_COMBINE_STEPS, AGENT_TASK_PREFIX
-from langchain_openai import ChatOpenAI
 from config import LLM_MODEL
+from llm_cache import get_llm_cache, normalize_prompt
+from llm_gateway import langchain_chat_model
 
-llm = ChatOpenAI(model=LLM_MODEL)
+_llm = None
+_llm_lock = threading.Lock()
 
-async def break_down_prompt(prompt):
-    """Use LLM to break down user prompt into actionable steps."""
+def get_llm():
+    """Get the process-wide langchain chat model, built on first use."""
+    global _llm
+
+    with _llm_lock:
+        if _llm is None:
+            _llm = langchain_chat_model(LLM_MODEL)
+        return _llm
+
+def parse_step_line(line):
+    """Extract the step text from a numbered or bulleted line, or None."""
+    line = line.strip()
+    if not (line and (line[0].isdigit() or line.startswith('•') or line.startswith('-') or line.startswith('*'))):
+        return None
+    
+    step = line
+    if '. ' in line:
+        step = line.split('. ', 1)[1]
+    elif ') ' in line:
+        step = line.split(') ', 1)[1]
+    elif ' ' in line and line[0].isdigit():
+        step = line.split(' ', 1)[1]
+    elif line.startswith(('•', '-', '*')):
+        step = line[1:].strip()
+    
+    return step or None
+
+class StepStreamParser:
+    """Incrementally parses streamed LLM text into steps, one per completed line."""
+    
+    def __init__(self):
+        self.buffer = ""
+        self.text = ""
+    
+    def feed(self, chunk):
+        """Add a chunk of text and return the steps whose lines are now complete."""
+        self.text += chunk
+        self.buffer += chunk
+        *lines, self.buffer = self.buffer.split('\n')
+        return [step for step in map(parse_step_line, lines) if step]
+    
+    def flush(self):
+        """Return the step on the final, unterminated line, if any."""
+        step = parse_step_line(self.buffer)
+        self.buffer = ""
+        return [step] if step else []
+
+async def stream_break_down_prompt(prompt, model=None):
+    """Use LLM to break down user prompt into steps, yielding each step as soon as its line is complete.
+    
+    `model` overrides the chat model, e.g. with a record/replay stand-in.
+    """
     from prompts import STEP_BREAKDOWN_PROMPT
     
     breakdown_prompt = STEP_BREAKDOWN_PROMPT.format(user_request=prompt)
+    cache = get_llm_cache()
+    cache_key = cache.make_key('breakdown', LLM_MODEL, STEP_BREAKDOWN_PROMPT, normalize_prompt(prompt))
+    
+    async def response_chunks():
+        cached_text = cache.get(cache_key)
+        if cached_text is not None:
+            yield cached_text
+            return
+        async for chunk in (model or get_llm()).astream(breakdown_prompt):
+            yield chunk.content
+        cache.set(cache_key, parser.text)
+    
+    start = time.perf_counter()
+    first_step_at = None
+    parser = StepStreamParser()
+    steps_yielded = 0
     
     try:
-        response = await llm.ainvoke(breakdown_prompt)
-        steps_text = response.content
-        steps = []
-        
-        for line in steps_text.split('\n'):
-            line = line.strip()
-            if line and (line[0].isdigit() or line.startswith('•') or line.startswith('-') or line.startswith('*')):
-                step = line
-                if '. ' in line:
-                    step = line.split('. ', 1)[1]
-                elif ') ' in line:
-                    step = line.split(') ', 1)[1]
-                elif ' ' in line and line[0].isdigit():
-                    step = line.split(' ', 1)[1]
-                elif line.startswith(('•', '-', '*')):
-                    step = line[1:].strip()
-                
-                if step:
-                    steps.append(step)
+        async for content in response_chunks():
+            for step in parser.feed(content):
+                first_step_at = first_step_at or time.perf_counter()
+                steps_yielded += 1
+                yield step
         
-        return steps if steps else ["1. " + steps_text]
+        final_steps = parser.flush() or ([] if steps_yielded else ["1. " + parser.text])
+        for step in final_steps:
+            first_step_at = first_step_at or time.perf_counter()
+            steps_yielded += 1
+            yield step
     except Exception as e:
         st.error(ERROR_BREAKDOWN.format(error=e))
-        return [f"1. Execute the following task: {prompt}"]
+        if not steps_yielded:
+            yield f"1. Execute the following task: {prompt}"
+        return
+    
+    total = time.perf_counter() - start
+    print(f"ℹ️  Step breakdown: {steps_yielded} steps, first step after {first_step_at - start:.2f}s, total {total:.2f}s")
+
+async def break_down_prompt(prompt, model=None):
+    """Use LLM to break down user prompt into actionable steps."""
+    return [step async for step in stream_break_down_prompt(prompt, model)]
+
+def build_combined_prompt(original_request, steps):
+    """Combine steps into an execution prompt with a fixed template, without an LLM call."""
+    from prompts import COMBINED_PROMPT_TEMPLATE
+    
+    approved_steps = '\n'.join(f"{i+1}. {step}" for i, step in enumerate(steps))
+    return COMBINED_PROMPT_TEMPLATE.format(original_request=original_request, approved_steps=approved_steps)
+
+def fallback_combined_prompt(original_request, steps):
+    """A plain execution prompt for when the steps could not be combined."""
+    return AGENT_TASK_PREFIX.format(task=original_request, steps='; '.join(steps))
 
-async def combine_steps_into_prompt(original_request, steps):
-    """Use LLM to combine approved steps into a comprehensive prompt for browser automation."""
+async def combine_steps_into_prompt(original_request, steps, generated_steps=None, model=None, fallback=True):
+    """Use LLM to combine approved steps into a comprehensive prompt for browser automation.
+    
+    When the steps are exactly the `generated_steps` from the breakdown, the LLM
+    already wrote them as executable instructions, so a fixed template is used.
+    If the LLM call fails, a plain fallback prompt is returned, or with
+    `fallback=False` the error is raised, so callers can tell the two apart.
+    """
     from prompts import STEP_COMBINATION_PROMPT
     
+    if generated_steps is not None and list(steps) == list(generated_steps):
+        print("ℹ️  Steps approved unchanged, combining with template")
+        return build_combined_prompt(original_request, steps)
+    
     approved_steps = '\n'.join(f"{i+1}. {step}" for i, step in enumerate(steps))
     combine_prompt = STEP_COMBINATION_PROMPT.format(
         original_request=original_request,
         approved_steps=approved_steps
     )
+    cache = get_llm_cache()
+    cache_key = cache.make_key(
+        'combine', LLM_MODEL, STEP_COMBINATION_PROMPT,
+        [normalize_prompt(original_request), [normalize_prompt(step) for step in steps]]
+    )
     
     try:
-        response = await llm.ainvoke(combine_prompt)
-        return response.content.strip()
+        combined = cache.get(cache_key)
+        if combined is None:
+            response = await (model or get_llm()).ainvoke(combine_prompt)
+            combined = response.content.strip()
+            cache.set(cache_key, combined)
+        return combined
     except Exception as e:
+        if not fallback:
+            raise
         st.error(ERROR_COMBINE_STEPS.format(error=e))
         # Fallback: create a simple combined prompt
-        fallback_prompt = AGENT_TASK_PREFIX.format(
-            task=original_request, 
-            steps='; '.join(steps)
-        )
-        return fallback_prompt
+        return fallback_combined_prompt(original_request, steps)
@@ -0,0 +1,187 @@
+# Persisted browser login state for the Workflow Automator
+#
+# After a successful run the screener.in cookies and localStorage are saved,
+# encrypted, per app user and Screener.in account, so later runs start
+# already logged in. The encryption key is derived from the Screener.in
+# credentials, so a state can only be read back with the same credentials.
+
+import base64
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+from config import (
+    AUTH_STATE_ENABLED,
+    AUTH_STATE_DIR,
+    AUTH_STATE_SECRET,
+    AUTH_STATE_MAX_AGE,
+    AUTH_STATE_DOMAINS,
+    AUTH_STATE_KDF_ITERATIONS,
+)
+
+SALT_BYTES = 16
+
+# Cookie fields kept in a saved state, all accepted back by CDP Storage.setCookies
+COOKIE_FIELDS = ('name', 'value', 'domain', 'path', 'expires', 'httpOnly', 'secure', 'sameSite')
+
+
+def _digest(*parts):
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+
+def _matches_domain(host, domains=AUTH_STATE_DOMAINS):
+    """Whether a cookie domain or origin host belongs to one of `domains`."""
+    host = host.lstrip('.').lower()
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+
+def filter_storage_state(state, domains=AUTH_STATE_DOMAINS):
+    """Keep only the cookies and origins of the given domains."""
+    cookies = [
+        {field: cookie[field] for field in COOKIE_FIELDS if field in cookie}
+        for cookie in state.get('cookies', []) if _matches_domain(cookie.get('domain', ''), domains)
+    ]
+    origins = [
+        origin for origin in state.get('origins', [])
+        if _matches_domain(origin.get('origin', '').split('://', 1)[-1].split(':', 1)[0], domains)
+    ]
+    return {'cookies': cookies, 'origins': origins}
+
+
+class AuthStateStore:
+    """Encrypted on-disk storage states keyed by app user and Screener.in account."""
+
+    def __init__(self, directory=AUTH_STATE_DIR, secret=AUTH_STATE_SECRET, max_age=AUTH_STATE_MAX_AGE,
+                 iterations=AUTH_STATE_KDF_ITERATIONS, enabled=AUTH_STATE_ENABLED):
+        self.directory = Path(directory)
+        self.secret = secret or ''
+        self.max_age = max_age
+        self.iterations = iterations
+        self.enabled = enabled
+        self._lock = threading.Lock()
+
+    def _path(self, app_user, email):
+        # App user prefix lets `invalidate` find every state of one user
+        return self.directory / f"{_digest(app_user)[:16]}-{_digest(app_user, email.lower())[:32]}.bin"
+
+    def _fernet(self, credentials, salt):
+        """Cipher keyed by the credentials, the optional app secret and a per-file salt."""
+        kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=self.iterations)
+        material = '\0'.join([self.secret, credentials['email'].lower(), credentials['password']])
+        return Fernet(base64.urlsafe_b64encode(kdf.derive(material.encode('utf-8'))))
+
+    def load(self, app_user, credentials):
+        """Saved storage state for a user and account, or None.
+
+        A state that is too old or was saved under a different password is deleted.
+        """
+        if not self.enabled or not app_user:
+            return None
+
+        path = self._path(app_user, credentials['email'])
+        with self._lock:
+            if not path.exists():
+                return None
+            blob = path.read_bytes()
+            try:
+                token = self._fernet(credentials, blob[:SALT_BYTES]).decrypt(blob[SALT_BYTES:], ttl=self.max_age)
+            except InvalidToken:
+                path.unlink(missing_ok=True)
+                return None
+        return json.loads(token)
+
+    def save(self, app_user, credentials, state):
+        """Encrypt and save a storage state; returns False if there was nothing to save."""
+        if not self.enabled or not app_user:
+            return False
+
+        state = filter_storage_state(state)
+        if not state['cookies']:
+            return False
+
+        salt = os.urandom(SALT_BYTES)
+        token = self._fernet(credentials, salt).encrypt(json.dumps(state).encode('utf-8'))
+        path = self._path(app_user, credentials['email'])
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix('.tmp')
+            tmp_path.write_bytes(salt + token)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, path)
+        return True
+
+    def invalidate(self, app_user, keep_email=None):
+        """Delete a user's saved states, except the one for `keep_email` if given."""
+        if not app_user or not self.directory.exists():
+            return 0
+
+        keep = self._path(app_user, keep_email) if keep_email else None
+        removed = 0
+        with self._lock:
+            for path in self.directory.glob(f"{_digest(app_user)[:16]}-*.bin"):
+                if path != keep:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+        return removed
+
+
+async def apply_storage_state(browser_session, state):
+    """Load cookies and localStorage into a browser session; returns the init script ids to remove later."""
+    cookies = []
+    for cookie in state.get('cookies', []):
+        cookie = dict(cookie)
+        # Session cookies are exported with expires=-1, which CDP would treat as expired
+        if cookie.get('expires') in (0, -1):
+            cookie.pop('expires')
+        cookies.append(cookie)
+    await browser_session._cdp_set_cookies(cookies)
+
+    script_ids = []
+    for origin in state.get('origins', []):
+        if not origin.get('localStorage'):
+            continue
+        items = ' '.join(
+            f"window.localStorage.setItem({json.dumps(item['name'])}, {json.dumps(item['value'])});"
+            for item in origin['localStorage']
+        )
+        script = (
+            f"(function() {{ if (window.location.origin !== {json.dumps(origin['origin'])}) return; "
+            f"try {{ {items} }} catch (e) {{}} }})();"
+        )
+        script_ids.append(await browser_session._cdp_add_init_script(script))
+    return script_ids
+
+
+async def remove_init_scripts(browser_session, script_ids):
+    """Remove init scripts added by `apply_storage_state` before the session goes back to the pool."""
+    for script_id in script_ids:
+        try:
+            await browser_session._cdp_remove_init_script(script_id)
+        except Exception as e:
+            print(f"⚠️ Could not remove init script: {e}")
+
+
+async def export_storage_state(browser_session):
+    """Cookies and localStorage of the auth domains from a browser session."""
+    state = await browser_session._cdp_get_storage_state()
+    return filter_storage_state(state)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_auth_state_store():
+    """Get the process-wide auth state store."""
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            _store = AuthStateStore()
+        return _store
@@ -0,0 +1,336 @@
+# Batch workflow runs for the Workflow Automator
+#
+# Runs many screener queries from a CSV or JSONL file. Each prompt is broken
+# down into steps, combined into an execution prompt and run by the browser
+# agent, with at most BATCH_CONCURRENCY runs at once. Batches started from the
+# UI never take browsers from interactive runs: they launch their own pool of
+# BATCH_CONCURRENCY browsers or, with WORKER_MODE=process, queue their runs for
+# the worker fleet like any other run. A JSON line per job is appended to the
+# results file as soon as the job finishes; that file is also the checkpoint,
+# so running the same batch again skips the jobs that already succeeded. UI
+# batches are named after the app user, credentials and file content, so one
+# user's upload never resumes or shows another's batch.
+#
+# Run from the command line with:
+#     python batch.py prompts.csv --output results.jsonl
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from config import BATCH_CONCURRENCY, BATCH_DIR, JOB_TIMEOUT, WORKER_MODE, WORKER_POLL_INTERVAL
+from llm_cache import normalize_prompt
+
+# Job outcomes recorded in the results file
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+
+def job_id_for(prompt):
+    """Stable id of a prompt, so a batch file can be edited and resumed."""
+    return hashlib.sha256(normalize_prompt(prompt).encode('utf-8')).hexdigest()[:12]
+
+
+def batch_id_for(data, sensitive_data, app_user=None):
+    """Id of a UI batch: the user's credential scope and the uploaded file's content."""
+    from result_cache import credential_scope
+
+    digest = hashlib.sha256(credential_scope(sensitive_data, app_user).encode('utf-8') + b'\0')
+    digest.update(data)
+    return digest.hexdigest()[:16]
+
+
+def parse_prompts(text, fmt):
+    """Read jobs from CSV (a `prompt` column, optional `id`) or JSONL (objects or strings).
+
+    Prompts that appear twice under the same id run once.
+    """
+    if fmt == 'csv':
+        rows = list(csv.DictReader(io.StringIO(text)))
+        if rows and 'prompt' not in rows[0]:
+            raise ValueError("CSV batch files need a 'prompt' column")
+    elif fmt == 'jsonl':
+        rows = []
+        for number, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {number} is not valid JSON: {e}")
+            rows.append(row if isinstance(row, dict) else {'prompt': row})
+    else:
+        raise ValueError(f"Unsupported batch file format: {fmt}")
+
+    jobs = {}
+    for row in rows:
+        prompt = str(row.get('prompt') or '').strip()
+        if prompt:
+            job_id = str(row.get('id') or job_id_for(prompt))
+            jobs.setdefault(job_id, {'id': job_id, 'prompt': prompt})
+    return list(jobs.values())
+
+
+def load_prompts(path):
+    """Read jobs from a .csv or .jsonl file."""
+    path = Path(path)
+    fmt = 'csv' if path.suffix.lower() == '.csv' else 'jsonl'
+    return parse_prompts(path.read_text(encoding='utf-8'), fmt)
+
+
+def read_results(output_path):
+    """Records in a results file, latest per job id."""
+    results = {}
+    path = Path(output_path)
+    if not path.exists():
+        return results
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by a crash; the job reruns
+                continue
+            results[record['id']] = record
+    return results
+
+
+class BatchRun:
+    """Runs a batch of jobs and appends each job's result to a JSONL file."""
+
+    def __init__(self, jobs, sensitive_data, output_path, concurrency=BATCH_CONCURRENCY, app_user=None,
+                 pool=None, fleet=None, timeout=JOB_TIMEOUT):
+        self.jobs = jobs
+        self.sensitive_data = dict(sensitive_data)
+        self.output_path = Path(output_path)
+        self.concurrency = max(1, concurrency)
+        self.app_user = app_user
+        self.scope = None
+        self.pool = pool
+        self.fleet = fleet
+        self.timeout = timeout
+        self.done = {
+            job_id for job_id, record in read_results(self.output_path).items() if record['status'] == JOB_SUCCEEDED
+        }
+        self.pending = [job for job in jobs if job['id'] not in self.done]
+        self.started_at = time.time()
+        self.finished = False
+        self._write_lock = threading.Lock()
+        self._end_partial_line()
+
+    def _end_partial_line(self):
+        """Terminate a last line cut short by a crash, so the next result starts on its own line."""
+        if not self.output_path.exists() or self.output_path.stat().st_size == 0:
+            return
+        with open(self.output_path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+
+    def _write(self, record):
+        """Append one result and flush it to disk before the next job can finish."""
+        with self._write_lock:
+            self.output_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.output_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    async def _execute(self, run_id, combined, steps, prompt):
+        """Run one workflow on the batch's pool or the worker fleet; returns (done, agent_steps, final_result)."""
+        if self.fleet is not None:
+            return await self._execute_on_fleet(run_id, combined, steps, prompt)
+
+        from browser import execute_workflow
+        from event_channel import EventChannel
+        from screenshot_store import ScreenshotStore
+
+        result = await asyncio.wait_for(
+            execute_workflow(combined, self.sensitive_data, EventChannel(run_id), ScreenshotStore(), pool=self.pool,
+                             app_user=self.app_user, steps=steps, request=prompt),
+            timeout=self.timeout
+        )
+        return result.is_done(), result.number_of_steps(), result.final_result()
+
+    async def _execute_on_fleet(self, run_id, combined, steps, prompt):
+        """Queue one workflow for the worker fleet and wait for it to finish."""
+        from job_runner import JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED
+
+        self.fleet.submit('workflow', {'query': combined, 'sensitive_data': self.sensitive_data,
+                                       'app_user': self.app_user, 'steps': steps, 'request': prompt},
+                          job_id=run_id, timeout=self.timeout)
+        try:
+            job = self.fleet.status(run_id)
+            while job['status'] in (JOB_QUEUED, JOB_RUNNING):
+                await asyncio.sleep(WORKER_POLL_INTERVAL)
+                job = self.fleet.status(run_id)
+        except asyncio.CancelledError:
+            self.fleet.cancel(run_id)
+            raise
+        if job['status'] != JOB_SUCCEEDED:
+            raise RuntimeError(job['error'] or f"Workflow run {job['status']}")
+        result = job['result']
+        return result['is_done'], result['agent_steps'], result['final_result']
+
+    async def _run_job(self, job, semaphore):
+        from agent_manager import break_down_prompt, combine_steps_into_prompt
+        from result_table import result_table_path
+
+        async with semaphore:
+            record = {'id': job['id'], 'prompt': job['prompt'], 'run_id': uuid.uuid4().hex, 'started_at': time.time()}
+            try:
+                steps = await break_down_prompt(job['prompt'])
+                # The generated steps are used unedited, so they are combined with the template
+                combined = await combine_steps_into_prompt(job['prompt'], steps, generated_steps=steps)
+                done, agent_steps, result = await self._execute(record['run_id'], combined, steps, job['prompt'])
+                record.update(
+                    status=JOB_SUCCEEDED if done else JOB_FAILED, steps=steps, agent_steps=agent_steps, result=result,
+                    error=None if done else "Agent stopped before finishing",
+                )
+                table = result_table_path(record['run_id'])
+                if table.exists():
+                    record['table'] = str(table)
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                record.update(status=JOB_FAILED, error=f"Timed out after {self.timeout:.0f}s")
+            except Exception as e:
+                record.update(status=JOB_FAILED, error=str(e))
+
+            record['finished_at'] = time.time()
+            record['duration_s'] = round(record['finished_at'] - record['started_at'], 2)
+            self._write(record)
+            icon = '✅' if record['status'] == JOB_SUCCEEDED else '❌'
+            print(f"{icon} Batch job {job['id']} {record['status']} in {record['duration_s']:.0f}s")
+            return record
+
+    async def run(self):
+        """Run the pending jobs; returns their records."""
+        print(f"🚀 Batch: {len(self.pending)} jobs to run, {len(self.done)} already done, "
+              f"concurrency {self.concurrency}")
+        semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            return await asyncio.gather(*(self._run_job(job, semaphore) for job in self.pending))
+        finally:
+            self.finished = True
+
+    def progress(self):
+        """Counts of succeeded, failed and remaining jobs, read back from the results file."""
+        results = read_results(self.output_path)
+        ids = {job['id'] for job in self.jobs}
+        # Failures from an earlier run are retried, so they count as remaining until rerun
+        records = [
+            record for job_id, record in results.items()
+            if job_id in ids and (job_id in self.done or record['finished_at'] >= self.started_at)
+        ]
+        succeeded = sum(1 for record in records if record['status'] == JOB_SUCCEEDED)
+        failed = len(records) - succeeded
+        return {'total': len(ids), 'succeeded': succeeded, 'failed': failed,
+                'remaining': len(ids) - len(records), 'finished': self.finished}
+
+
+# --------- UI Batches ---------
+_batches = {}
+_batches_lock = threading.Lock()
+
+
+def start_batch(batch_id, jobs, sensitive_data, app_user=None):
+    """Run a batch on the job runner loop, or return the one already running under `batch_id`.
+
+    The results file is named after `batch_id`, so starting the same batch
+    again resumes it. A running batch is only handed back to the app user and
+    credentials that started it.
+    """
+    from job_runner import get_job_runner
+    from result_cache import credential_scope
+
+    scope = credential_scope(sensitive_data, app_user)
+    with _batches_lock:
+        batch = _batches.get(batch_id)
+        if batch is not None and not batch.finished:
+            if batch.scope != scope:
+                raise ValueError(f"Batch {batch_id} belongs to another user")
+            return batch
+        batch = BatchRun(jobs, sensitive_data, Path(BATCH_DIR) / f"{batch_id}.jsonl", app_user=app_user)
+        batch.scope = scope
+        batch.future = get_job_runner().run_coroutine(_run_with_own_capacity(batch))
+        _batches[batch_id] = batch
+        return batch
+
+
+async def _run_with_own_capacity(batch):
+    """Run a UI batch on the worker fleet, or on a browser pool of its own that closes with it."""
+    if WORKER_MODE == 'process':
+        from worker_fleet import get_worker_fleet
+        batch.fleet = get_worker_fleet()
+        return await batch.run()
+
+    from browser import build_browser_profile
+    from browser_pool import BrowserPool
+
+    batch.pool = BrowserPool(build_browser_profile(), size=batch.concurrency)
+    try:
+        return await batch.run()
+    finally:
+        await batch.pool.close()
+
+
+def get_batch(batch_id):
+    """Get a batch started from the UI, or None."""
+    with _batches_lock:
+        return _batches.get(batch_id)
+
+
+def cancel_batch(batch_id):
+    """Stop a running batch; finished jobs stay in its results file."""
+    batch = get_batch(batch_id)
+    if batch is None or batch.finished:
+        return False
+    return batch.future.cancel()
+
+
+def main():
+    """Run a batch of workflow prompts from a CSV or JSONL file."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('prompts', help="CSV with a 'prompt' column, or JSONL of prompts")
+    parser.add_argument('--output', help='Results file (default: next to the prompts file)')
+    parser.add_argument('--concurrency', type=int, default=BATCH_CONCURRENCY, help='Workflows run at once')
+    parser.add_argument('--restart', action='store_true', help='Ignore results from a previous run')
+    args = parser.parse_args()
+
+    missing = [name for name in ('SCREENER_EMAIL', 'SCREENER_PASSWORD') if not os.environ.get(name)]
+    if missing:
+        parser.error(f"set {' and '.join(missing)} to the screener.in login the batch should use")
+
+    from browser import build_browser_profile
+    from browser_pool import BrowserPool
+
+    output = Path(args.output or Path(args.prompts).with_suffix('.results.jsonl'))
+    if args.restart and output.exists():
+        output.unlink()
+    sensitive_data = {'email': os.environ['SCREENER_EMAIL'], 'password': os.environ['SCREENER_PASSWORD']}
+
+    async def run():
+        pool = BrowserPool(build_browser_profile(), size=args.concurrency)
+        batch = BatchRun(load_prompts(args.prompts), sensitive_data, output, args.concurrency, pool=pool)
+        try:
+            await batch.run()
+        finally:
+            await pool.close()
+        return batch.progress()
+
+    progress = asyncio.run(run())
+    print(f"📊 {progress['succeeded']}/{progress['total']} succeeded, {progress['failed']} failed. "
+          f"Results in {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,856 @@
+#!/usr/bin/env python3
+"""
+Benchmark script for the Workflow Automator.
+Records timings for performance-sensitive paths and writes them as JSON.
+With --baseline, compares the timings against a stored results file and
+exits non-zero on regressions.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent
+
+# Benchmarks run against local stubs: never read or fill the LLM cache, and let
+# the model clients be built without an API key
+os.environ.setdefault('LLM_CACHE_ENABLED', 'False')
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+os.environ.setdefault('ANONYMIZED_TELEMETRY', 'false')
+
+# Timings slower than the baseline by more than this fraction are regressions
+DEFAULT_TOLERANCE = 0.25
+# Differences below this many seconds are noise, whatever the ratio
+MIN_REGRESSION_S = 0.002
+
+# Runs in a fresh interpreter: import the app modules, then wait for browser setup
+STARTUP_SNIPPET = """
+import json, time
+started = time.perf_counter()
+import ui_components
+imported = time.perf_counter()
+from browser_setup import wait_for_browser_setup
+ready = wait_for_browser_setup()
+finished = time.perf_counter()
+print(json.dumps({
+    'import_s': imported - started,
+    'setup_s': finished - imported,
+    'total_s': finished - started,
+    'setup_ok': ready,
+}))
+"""
+
+def _run_startup_process(env=None):
+    """Start the app modules in a fresh interpreter and return its timings."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP_SNIPPET],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True, env=env
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process_s'] = time.perf_counter() - started
+    return timings
+
+def _summarize(samples, key):
+    """Median, min and max of one timing across samples."""
+    values = [sample[key] for sample in samples]
+    return {
+        'median': statistics.median(values),
+        'min': min(values),
+        'max': max(values),
+    }
+
+def bench_startup(runs=3):
+    """Measure cold-start (no install manifest) and warm-start app startup times.
+
+    The runs use their own manifest file, so the user's manifest is never
+    touched. A cold start runs `playwright install`, which only verifies an
+    existing Chromium install.
+    """
+    print("🧪 Benchmarking app startup...", file=sys.stderr)
+
+    cold, warm = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest_path = Path(tmp) / 'install.json'
+        env = {**os.environ, 'WORKFLOW_INSTALL_MANIFEST': str(manifest_path)}
+        for _ in range(runs):
+            if manifest_path.exists():
+                manifest_path.unlink()
+            cold.append(_run_startup_process(env))
+            warm.append(_run_startup_process(env))
+
+    results = {}
+    for name, samples in (('cold', cold), ('warm', warm)):
+        results[name] = {
+            key: _summarize(samples, key)
+            for key in ('import_s', 'setup_s', 'total_s', 'process_s')
+        }
+        results[name]['setup_ok'] = all(sample['setup_ok'] for sample in samples)
+        print(
+            f"✅ {name} start: total {results[name]['total_s']['median']:.2f}s "
+            f"(import {results[name]['import_s']['median']:.2f}s, "
+            f"setup {results[name]['setup_s']['median']:.2f}s)", file=sys.stderr
+        )
+    return results
+
+# Modules the login and input views must not load
+HEAVY_MODULES = (
+    'browser', 'browser_use', 'langchain_openai', 'openai', 'auth_state', 'cryptography', 'pyarrow', 'tiktoken',
+)
+# Imports profiled by the import benchmark: what every rerun of main.py needs, and what a run adds
+IMPORT_TARGETS = {
+    'views': 'import session_manager, ui_components',
+    'agent': 'import browser, agent_manager',
+}
+
+def _import_profile(statement):
+    """Run `statement` under -X importtime in a fresh interpreter; returns {module: cumulative seconds}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        modules[name.strip()] = {'cumulative_s': int(cumulative) / 1e6, 'top_level': not name[1:].startswith(' ')}
+    return modules
+
+def bench_imports(runs=3):
+    """Profile import time of the app's views and of the browser/LLM machinery they now load lazily."""
+    print("🧪 Profiling imports (-X importtime)...", file=sys.stderr)
+
+    results = {}
+    for name, statement in IMPORT_TARGETS.items():
+        samples, profile = [], {}
+        for _ in range(runs):
+            profile = _import_profile(statement)
+            samples.append({'total_s': sum(m['cumulative_s'] for m in profile.values() if m['top_level'])})
+        slowest = sorted(
+            ((module, m['cumulative_s']) for module, m in profile.items() if m['top_level']),
+            key=lambda item: item[1], reverse=True
+        )[:10]
+        results[name] = {
+            'total_s': _summarize(samples, 'total_s'),
+            'heavy_modules_loaded': [module for module in HEAVY_MODULES if module in profile],
+            'slowest_top_level': dict(slowest),
+        }
+        print(
+            f"✅ {name} ({statement}): median {results[name]['total_s']['median']:.2f}s, "
+            f"heavy modules: {', '.join(results[name]['heavy_modules_loaded']) or 'none'}", file=sys.stderr
+        )
+    return results
+
+def _timed(func, iterations):
+    """Call `func` repeatedly with its output silenced and return the per-call times."""
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(iterations):
+            started = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - started)
+    return times
+
+def _timing_summary(times):
+    return {
+        'median': statistics.median(times),
+        'min': min(times),
+        'max': max(times),
+    }
+
+def bench_launch(runs=3):
+    """Measure headless browser launch and shutdown times."""
+    from browser_use import BrowserSession
+    from browser import build_browser_profile
+
+    print("🧪 Benchmarking browser launch...", file=sys.stderr)
+
+    async def launch():
+        session = BrowserSession(browser_profile=build_browser_profile())
+        started = time.perf_counter()
+        await asyncio.wait_for(session.start(), timeout=60)
+        launched = time.perf_counter()
+        await session.kill()
+        return {'launch_s': launched - started, 'kill_s': time.perf_counter() - launched}
+
+    try:
+        samples = [asyncio.run(launch()) for _ in range(runs)]
+    except Exception as e:
+        print(f"⚠️ Browser launch failed, skipping: {e!r}", file=sys.stderr)
+        return {'skipped': repr(e)}
+
+    results = {key: _summarize(samples, key) for key in ('launch_s', 'kill_s')}
+    print(f"✅ Launch: median {results['launch_s']['median']:.2f}s", file=sys.stderr)
+    return results
+
+# Stubbed LLM output for the pipeline benchmarks
+BREAKDOWN_STEPS = 40
+STUB_BREAKDOWN = ''.join(
+    f"{i}. Open the screen and set filter {i} to a market capitalisation above {i * 100} crore\n"
+    for i in range(1, BREAKDOWN_STEPS + 1)
+)
+PIPELINE_ITERATIONS = 50
+
+def bench_breakdown(runs=3):
+    """Measure step breakdown streaming and parsing against a stub model."""
+    from agent_manager import break_down_prompt
+    from replay import LLMRecording, ReplayLLM, CALL_STREAM
+
+    print("🧪 Benchmarking step breakdown parsing...", file=sys.stderr)
+
+    def breakdown():
+        recording = LLMRecording()
+        recording.add(CALL_STREAM, '', STUB_BREAKDOWN)
+        steps = asyncio.run(break_down_prompt("Find profitable small caps", ReplayLLM(recording, langchain=True)))
+        assert len(steps) == BREAKDOWN_STEPS
+
+    results = {'total_s': _timing_summary(_timed(breakdown, runs * PIPELINE_ITERATIONS))}
+    print(f"✅ Breakdown of {BREAKDOWN_STEPS} steps: median {results['total_s']['median'] * 1000:.2f} ms",
+          file=sys.stderr)
+    return results
+
+def bench_combine(runs=3):
+    """Measure combining steps with the template fast path and with a stub model."""
+    from agent_manager import combine_steps_into_prompt
+    from replay import LLMRecording, ReplayLLM, CALL_INVOKE
+
+    print("🧪 Benchmarking step combination...", file=sys.stderr)
+    steps = [line.split('. ', 1)[1] for line in STUB_BREAKDOWN.splitlines()]
+    edited = steps[:-1] + ["Export the results"]
+
+    def template():
+        asyncio.run(combine_steps_into_prompt("Find profitable small caps", steps, generated_steps=steps))
+
+    def llm():
+        recording = LLMRecording()
+        recording.add(CALL_INVOKE, '', "Go to screener.in and run the screen.")
+        asyncio.run(combine_steps_into_prompt(
+            "Find profitable small caps", edited, generated_steps=steps, model=ReplayLLM(recording, langchain=True)
+        ))
+
+    results = {
+        'template_s': _timing_summary(_timed(template, runs * PIPELINE_ITERATIONS)),
+        'llm_s': _timing_summary(_timed(llm, runs * PIPELINE_ITERATIONS)),
+    }
+    print(
+        f"✅ Combine: template {results['template_s']['median'] * 1000:.2f} ms, "
+        f"stub LLM {results['llm_s']['median'] * 1000:.2f} ms", file=sys.stderr
+    )
+    return results
+
+# Execution prompts in the verbose style the combination LLM tends to write,
+# used when there are no saved plans or runs to benchmark
+SAMPLE_EXECUTION_PROMPTS = [
+    """**Objective:** Find undervalued small-cap stocks on screener.in.
+
+Please make sure to carefully follow these steps in order to complete the task:
+
+1. Navigate to the screener.in website and log in with the provided credentials. Wait for the page to load completely.
+2. Once that is done, go to the screens section. Please make sure that you are logged in before proceeding.
+3. Set the P/E ratio filter to less than 15. It is important to enter the value accurately.
+4. Set the market cap filter to below 5000 crore. Please wait for the page to load completely.
+5. Apply the filters and run the query. Verify that the filters have been applied correctly.
+6. Give the filtered results, including company names, P/E and market cap.
+
+Remember to perform every step directly on the website without asking for confirmation. Please make sure to log in with the provided credentials. Finally, report the filtered results.""",
+    """Objective: Companies with ROE above 20% and low debt
+
+On screener.in, carry out the following steps in order:
+1. Navigate to screener.in and log in with the provided credentials
+2. Set ROE filter to greater than 20%
+3. Set debt to equity filter to less than 0.5
+4. Apply filters and give the filtered results
+
+Perform every step directly on the website without asking for confirmation, then report the filtered results.""",
+    """You are going to help the user find dividend stocks. First, you need to navigate to screener.in and log in \
+with the provided credentials. Make sure that the login was successful before continuing. Then you should open the \
+screens page and create a new screen. In the query box, you will need to enter a condition so that the dividend \
+yield is above 3%. You should also add a condition for market capitalization above 1000 crore. Please wait for the \
+results to load. Please make sure that the filters have been applied properly. In order to complete the task, you \
+must give the filtered results with the company names, the dividend yield and the market cap. Please do not ask the \
+user for confirmation at any point. Remember to give the filtered results with the company names, the dividend yield \
+and the market cap.""",
+]
+
+def _saved_execution_prompts():
+    """Distinct execution prompts from the plan library and the run history, and the runs' mean agent steps."""
+    import sqlite3
+    from config import PLAN_LIBRARY_PATH, RUN_STORE_PATH
+
+    prompts, steps = {}, []
+    for path, query in (
+        (PLAN_LIBRARY_PATH, "SELECT combined_prompt FROM plans"),
+        (RUN_STORE_PATH, "SELECT combined_prompt FROM runs WHERE combined_prompt IS NOT NULL"),
+    ):
+        if not Path(path).exists():
+            continue
+        try:
+            with contextlib.closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as conn:
+                for (text,) in conn.execute(query):
+                    prompts.setdefault(text.strip(), None)
+                if path == RUN_STORE_PATH:
+                    steps = [row[0] for row in conn.execute(
+                        "SELECT agent_steps FROM runs WHERE direct = 0 AND agent_steps IS NOT NULL")]
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not read {path}: {e}", file=sys.stderr)
+    return [text for text in prompts if text], (statistics.mean(steps) if steps else None)
+
+# Agent steps per run assumed when the run history has no agent runs
+DEFAULT_AGENT_STEPS = 12
+
+def bench_compaction(runs=3):
+    """Measure prompt compaction over saved execution prompts: tokens and cost saved, and its own cost."""
+    from prompt_compaction import compact_prompt, get_tokenizer
+    from config import PROMPT_TOKEN_BUDGET, PROMPT_INPUT_COST_PER_MTOK
+
+    corpus, agent_steps = _saved_execution_prompts()
+    source = 'saved'
+    if not corpus:
+        corpus, source = SAMPLE_EXECUTION_PROMPTS, 'sample'
+    agent_steps = agent_steps or DEFAULT_AGENT_STEPS
+    print(f"🧪 Benchmarking prompt compaction over {len(corpus)} {source} prompts "
+          f"({get_tokenizer()[0]} tokenizer, budget {PROMPT_TOKEN_BUDGET})...", file=sys.stderr)
+
+    results_by_prompt = [compact_prompt(text) for text in corpus]
+    before = sum(result.tokens_before for result in results_by_prompt)
+    after = sum(result.tokens_after for result in results_by_prompt)
+    saved_per_run = statistics.mean(result.saved_tokens for result in results_by_prompt) * agent_steps
+    results = {
+        'corpus': source,
+        'prompts': len(corpus),
+        'tokenizer': get_tokenizer()[0],
+        'budget': PROMPT_TOKEN_BUDGET,
+        'tokens_before': before,
+        'tokens_after': after,
+        'reduction': 1 - after / before if before else 0.0,
+        'over_budget': sum(result.over_budget for result in results_by_prompt),
+        'agent_steps_per_run': agent_steps,
+        'tokens_saved_per_run': saved_per_run,
+        'cost_saved_per_run_usd': saved_per_run * PROMPT_INPUT_COST_PER_MTOK / 1_000_000,
+        'compact_s': _timing_summary(_timed(lambda: [compact_prompt(text) for text in corpus], runs * 10)),
+    }
+    print(
+        f"✅ Compaction: {before:,} -> {after:,} tokens ({results['reduction']:.0%} smaller), "
+        f"~{saved_per_run:,.0f} tokens / ${results['cost_saved_per_run_usd']:.4f} saved per run, "
+        f"{results['compact_s']['median'] * 1000:.2f} ms per corpus", file=sys.stderr
+    )
+    return results
+
+def _stub_png(width, height, seed=0):
+    """A PNG of noise, which compresses about as badly as a real page screenshot."""
+    from PIL import Image
+
+    image = Image.effect_noise((width, height), 32 + seed % 32).convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+class _StubCDPSession:
+    """Answers Runtime.evaluate with a fixed page summary."""
+
+    def __init__(self):
+        self.session_id = 'stub'
+        self.cdp_client = self
+        self.send = self
+        self.Runtime = self
+
+    async def evaluate(self, params=None, session_id=None):
+        return {'result': {'value': {'url': 'https://www.screener.in/screen/raw/', 'duration': 120.0,
+                                     'nodes': 1500, 'height': 2400}}}
+
+class _StubBrowserSession:
+    """Browser session stand-in: fixed screenshots, this process as the browser process."""
+
+    def __init__(self, screenshot):
+        from types import SimpleNamespace
+
+        self.screenshot = screenshot
+        self._local_browser_watchdog = SimpleNamespace(browser_pid=os.getpid())
+        self._cdp_session = _StubCDPSession()
+
+    async def take_screenshot(self, full_page=False):
+        return self.screenshot
+
+    async def get_or_create_cdp_session(self, focus=True):
+        return self._cdp_session
+
+def _stub_agent(browser_session):
+    from types import SimpleNamespace
+
+    history = SimpleNamespace(model_thoughts=lambda: [], is_done=lambda: False)
+    return SimpleNamespace(browser_session=browser_session, state=SimpleNamespace(history=history))
+
+def bench_hooks(runs=3):
+    """Measure the per-step overhead of the agent step hooks with a stub browser."""
+    from browser import make_step_hooks
+    from capture_policy import CapturePolicy
+    from event_channel import EventChannel
+    from instrumentation import RunTracer
+    from screenshot_store import ScreenshotStore
+
+    print("🧪 Benchmarking step hook overhead...", file=sys.stderr)
+    steps = runs * 10
+
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = _stub_agent(_StubBrowserSession(_stub_png(1280, 800)))
+        tracer = RunTracer('benchmark-hooks', trace_dir=tmp)
+        on_start, on_end = make_step_hooks(
+            EventChannel('benchmark-hooks'), ScreenshotStore(cache_dir=Path(tmp) / 'cache'), tracer,
+            CapturePolicy(policy='viewport', capture_at='both')
+        )
+
+        async def run_steps():
+            times = []
+            for _ in range(steps):
+                started = time.perf_counter()
+                await on_start(agent)
+                await on_end(agent)
+                times.append(time.perf_counter() - started)
+            return times
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            times = asyncio.run(run_steps())
+        tracer.finish('succeeded')
+
+    results = {'step_overhead_s': _timing_summary(times)}
+    print(f"✅ Hooks: median {results['step_overhead_s']['median'] * 1000:.1f} ms/step (two captures)",
+          file=sys.stderr)
+    return results
+
+def bench_screenshots(runs=3):
+    """Measure decoding, thumbnailing and storing viewport and full-page screenshots."""
+    from screenshot_store import ScreenshotStore
+
+    print("🧪 Benchmarking screenshot decode...", file=sys.stderr)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, size in (('viewport', (1280, 800)), ('full_page', (1280, 6000))):
+            images = [_stub_png(*size, seed=i) for i in range(runs * 3)]
+            store = ScreenshotStore(cache_dir=Path(tmp) / name)
+            frames = iter(images)
+            results[f"{name}_s"] = _timing_summary(_timed(lambda: store.add(next(frames)), len(images)))
+            print(f"✅ {name}: median {results[f'{name}_s']['median'] * 1000:.1f} ms", file=sys.stderr)
+    return results
+
+# History sizes rendered by the UI benchmark, in agent steps
+UI_HISTORY_SIZES = (10, 100, 300)
+
+UI_SCRIPT = """
+from session_manager import SessionManager
+from ui_components import UIComponents
+
+SessionManager.initialize_session_state()
+UIComponents.workflow_execution_view()
+"""
+
+def bench_ui(runs=3):
+    """Measure reruns of the workflow execution view with large run histories."""
+    from streamlit.testing.v1 import AppTest
+    from screenshot_store import ScreenshotStore
+    from thought_log import ThoughtLog
+
+    print("🧪 Benchmarking workflow view render...", file=sys.stderr)
+    # The view's unlabelled text area logs a warning with a stack trace on every render
+    logging.getLogger('streamlit.elements.lib.policies').setLevel(logging.ERROR)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        script = Path(tmp) / 'workflow_view.py'
+        script.write_text(UI_SCRIPT)
+        screenshot = _stub_png(1280, 800)
+
+        for size in UI_HISTORY_SIZES:
+            store = ScreenshotStore(cache_dir=Path(tmp) / f"cache-{size}", dedup_distance=-1)
+            with contextlib.redirect_stdout(io.StringIO()):
+                for step in range(1, size + 1):
+                    store.add(screenshot, step, 'end')
+
+            app = AppTest.from_file(str(script), default_timeout=60)
+            app.session_state['authenticated'] = True
+            app.session_state['credentials_configured'] = True
+            app.session_state['sensitive_data'] = {'email': 'user@example.com', 'password': 'x'}
+            app.session_state['current_prompt'] = "Find profitable small caps"
+            app.session_state['combined_prompt'] = STUB_BREAKDOWN
+            app.session_state['agent_ran'] = True
+            app.session_state['agent_completed'] = True
+            app.session_state['final_result'] = "Done"
+            thought_log = ThoughtLog(f"bench-{size}", directory=Path(tmp) / 'thoughts')
+            for step in range(1, size + 1):
+                thought_log.start_step(step, f"Apply filter {step}")
+                thought_log.end_step(step, action='click_element', result=f"Filter {step} applied")
+            app.session_state['thought_log'] = thought_log
+            app.session_state['screenshots'] = store
+
+            # The first run also compiles the script and imports the app
+            app.run()
+            times = _timed(app.run, runs * 3)
+            assert not app.exception, app.exception
+            results[f"steps_{size}_s"] = _timing_summary(times)
+            print(f"✅ {size} steps: median {results[f'steps_{size}_s']['median'] * 1000:.0f} ms/render",
+                  file=sys.stderr)
+    return results
+
+# Screenshot policies compared by the capture benchmark: (policy, capture_at)
+CAPTURE_CONFIGS = (
+    ('full_page', 'both'),
+    ('viewport', 'both'),
+    ('adaptive', 'both'),
+    ('adaptive', 'end'),
+)
+CAPTURE_STEPS = 9
+CAPTURE_TABLE_ROWS = 300
+
+# Appends a page of rows to the results table, like loading the next page of a screen
+APPEND_ROWS_SCRIPT = """
+(() => {{
+    const body = document.querySelector('tbody');
+    for (let i = 0; i < {rows}; i++) {{
+        const row = body.insertRow();
+        for (let j = 0; j < 10; j++) row.insertCell().textContent = (Math.random() * 1000).toFixed(2);
+    }}
+    return body.rows.length;
+}})()
+"""
+
+def _write_results_page(path, rows):
+    """Write a long, screener-style results table to an HTML file."""
+    header = ''.join(f"<th>Column {j}</th>" for j in range(10))
+    body = ''.join(
+        "<tr>" + ''.join(f"<td>{(i * 37 + j * 11) % 1000}.{j}</td>" for j in range(10)) + "</tr>"
+        for i in range(rows)
+    )
+    path.write_text(
+        f"<html><body><h1>Query results</h1><table><thead><tr>{header}</tr></thead>"
+        f"<tbody>{body}</tbody></table></body></html>"
+    )
+
+async def _evaluate(session, expression):
+    """Evaluate JavaScript on the session's current page."""
+    cdp_session = await session.get_or_create_cdp_session()
+    await cdp_session.cdp_client.send.Runtime.evaluate(
+        params={'expression': expression, 'returnByValue': True}, session_id=cdp_session.session_id
+    )
+
+async def _run_capture_policy(policy_name, capture_at, page_url, steps):
+    """Capture screenshots for simulated agent steps under one policy."""
+    from browser_use import BrowserSession
+    from browser import build_browser_profile
+    from capture_policy import CapturePolicy
+
+    session = BrowserSession(browser_profile=build_browser_profile())
+    await session.start()
+    try:
+        await session.navigate_to(page_url)
+        policy = CapturePolicy(policy=policy_name, capture_at=capture_at)
+        step_latencies, step_bytes = [], []
+        for step in range(1, steps + 1):
+            # Every third step loads more results, a substantial DOM change
+            if step % 3 == 0:
+                await _evaluate(session, APPEND_ROWS_SCRIPT.format(rows=CAPTURE_TABLE_ROWS))
+
+            started = time.perf_counter()
+            captured = 0
+            for label in ('start', 'end'):
+                if not policy.should_capture(label):
+                    continue
+                is_final = step == steps and label == 'end'
+                full_page = await policy.full_page(session, is_final=is_final)
+                captured += len(await session.take_screenshot(full_page=full_page))
+            step_latencies.append(time.perf_counter() - started)
+            step_bytes.append(captured)
+        return step_latencies, step_bytes
+    finally:
+        await session.kill()
+
+def bench_capture(runs=3):
+    """Compare per-step screenshot latency and bytes captured across capture policies."""
+    print("🧪 Benchmarking screenshot capture policies...", file=sys.stderr)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        page = Path(tmp) / 'results.html'
+        _write_results_page(page, CAPTURE_TABLE_ROWS)
+
+        for policy_name, capture_at in CAPTURE_CONFIGS:
+            latencies, sizes = [], []
+            for _ in range(runs):
+                run_latencies, run_sizes = asyncio.run(
+                    _run_capture_policy(policy_name, capture_at, page.as_uri(), CAPTURE_STEPS)
+                )
+                latencies.extend(run_latencies)
+                sizes.extend(run_sizes)
+
+            name = f"{policy_name}/{capture_at}"
+            results[name] = {
+                'step_latency_s': {
+                    'median': statistics.median(latencies),
+                    'min': min(latencies),
+                    'max': max(latencies),
+                },
+                'step_bytes_median': statistics.median(sizes),
+                'bytes_per_run': sum(sizes) / runs,
+            }
+            print(
+                f"✅ {name}: median {results[name]['step_latency_s']['median'] * 1000:.0f} ms/step, "
+                f"{results[name]['bytes_per_run'] / 1024:.0f} KB/run", file=sys.stderr
+            )
+    return results
+
+# Public screener.in pages loaded by the network benchmark
+NETWORK_BENCH_URLS = (
+    'https://www.screener.in/',
+    'https://www.screener.in/company/RELIANCE/consolidated/',
+    'https://www.screener.in/screens/',
+)
+# Network profiles compared: name -> NetworkProfile keyword arguments, None for no interception
+NETWORK_CONFIGS = {
+    'off': None,
+    'default': {},
+    'default+images': {'image_max_width': 800},
+}
+
+# Load time and bytes transferred for the current page, once its load event has fired
+PAGE_LOAD_SCRIPT = """
+(() => {
+    const nav = performance.getEntriesByType('navigation')[0];
+    if (!nav || !nav.loadEventEnd) return null;
+    const resources = performance.getEntriesByType('resource');
+    return {
+        load_s: nav.loadEventEnd / 1000,
+        bytes: nav.transferSize + resources.reduce((total, entry) => total + (entry.transferSize || 0), 0),
+        resources: resources.length,
+    };
+})()
+"""
+
+async def _page_load(session, timeout=30.0):
+    """Wait for the current page's load event and return its load time and bytes."""
+    cdp_session = await session.get_or_create_cdp_session()
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        result = await cdp_session.cdp_client.send.Runtime.evaluate(
+            params={'expression': PAGE_LOAD_SCRIPT, 'returnByValue': True}, session_id=cdp_session.session_id
+        )
+        value = result.get('result', {}).get('value')
+        if value:
+            return value
+        await asyncio.sleep(0.1)
+    raise TimeoutError("Page did not finish loading")
+
+async def _run_network_profile(profile_kwargs, urls):
+    """Load each page in a fresh browser with or without a network profile."""
+    from browser_use import BrowserSession
+    from browser import build_browser_profile
+    from network_profile import NetworkInterceptor, NetworkProfile
+
+    loads = []
+    stats = None
+    for url in urls:
+        # A fresh browser per page so nothing is served from the HTTP cache
+        session = BrowserSession(browser_profile=build_browser_profile())
+        await session.start()
+        try:
+            interceptor = None
+            if profile_kwargs is not None:
+                interceptor = NetworkInterceptor(NetworkProfile(**profile_kwargs))
+                await interceptor.attach(session)
+            await session.navigate_to(url)
+            loads.append(await _page_load(session))
+            if interceptor:
+                page_stats = interceptor.get_stats()
+                stats = stats or {'blocked': 0, 'blocked_by_type': {}, 'downscaled_bytes_saved': 0}
+                stats['blocked'] += page_stats['blocked']
+                stats['downscaled_bytes_saved'] += page_stats['downscaled_bytes_saved']
+                for resource_type, count in page_stats['blocked_by_type'].items():
+                    stats['blocked_by_type'][resource_type] = stats['blocked_by_type'].get(resource_type, 0) + count
+        finally:
+            await session.kill()
+    return loads, stats
+
+def bench_network(runs=3):
+    """Compare page-load time and bytes transferred with and without the network profile.
+
+    Blocked requests never reach the network, so the interceptor cannot size
+    them; the bytes a profile saves are measured here against the
+    unprofiled ('off') loads of the same pages.
+    """
+    print("🧪 Benchmarking network profiles...", file=sys.stderr)
+
+    results = {}
+    for name, profile_kwargs in NETWORK_CONFIGS.items():
+        loads, blocked, blocked_by_type, downscaled_bytes_saved = [], 0, {}, 0
+        for _ in range(runs):
+            run_loads, stats = asyncio.run(_run_network_profile(profile_kwargs, NETWORK_BENCH_URLS))
+            loads.extend(run_loads)
+            if stats:
+                blocked += stats['blocked']
+                downscaled_bytes_saved += stats['downscaled_bytes_saved']
+                for resource_type, count in stats['blocked_by_type'].items():
+                    blocked_by_type[resource_type] = blocked_by_type.get(resource_type, 0) + count
+
+        results[name] = {
+            'load_s': _summarize(loads, 'load_s'),
+            'bytes_per_page_median': statistics.median(load['bytes'] for load in loads),
+            'blocked_per_page': blocked / len(loads),
+            'blocked_by_type_per_page': {
+                resource_type: count / len(loads) for resource_type, count in sorted(blocked_by_type.items())
+            },
+            'downscaled_bytes_saved_per_page': downscaled_bytes_saved / len(loads),
+        }
+        if 'off' in results:
+            results[name]['bytes_saved_per_page'] = (
+                results['off']['bytes_per_page_median'] - results[name]['bytes_per_page_median']
+            )
+        print(
+            f"✅ {name}: median load {results[name]['load_s']['median']:.2f}s, "
+            f"{results[name]['bytes_per_page_median'] / 1024:.0f} KB/page "
+            f"({results[name].get('bytes_saved_per_page', 0) / 1024:.0f} KB saved), "
+            f"{results[name]['blocked_per_page']:.1f} requests blocked/page", file=sys.stderr
+        )
+    return results
+
+async def _run_replays(name, runs):
+    """Replay a cassette `runs` times through execute_workflow; returns run times and step records."""
+    from replay import Cassette, run_cassette
+    from instrumentation import get_metrics_registry
+
+    run_times, steps = [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        _, run_id = await run_cassette(Cassette(name, 'replay'))
+        run_times.append(time.perf_counter() - started)
+        steps.extend(get_metrics_registry().get_steps(run_id))
+    return run_times, steps
+
+def bench_replay(runs=3):
+    """Replay a recorded workflow offline and measure step latency, memory and throughput."""
+    from config import REPLAY_CASSETTE, REPLAY_DIR
+
+    print(f"🧪 Benchmarking offline replay of cassette '{REPLAY_CASSETTE}'...", file=sys.stderr)
+    if not (Path(REPLAY_DIR) / REPLAY_CASSETTE).exists():
+        print(f"⚠️ No cassette at {Path(REPLAY_DIR) / REPLAY_CASSETTE}; record one with `python replay.py record`",
+              file=sys.stderr)
+        return {'skipped': 'no cassette'}
+
+    from instrumentation import summarize_steps
+
+    run_times, steps = asyncio.run(_run_replays(REPLAY_CASSETTE, runs))
+    step_times = sorted(step['wall_s'] or 0 for step in steps)
+    summary = summarize_steps(steps)
+    results = {
+        'run_s': {
+            'median': statistics.median(run_times),
+            'min': min(run_times),
+            'max': max(run_times),
+        },
+        'steps_per_run': len(steps) / runs,
+        'step_latency_s': {
+            'median': statistics.median(step_times) if step_times else None,
+            'p95': step_times[int(0.95 * (len(step_times) - 1))] if step_times else None,
+        },
+        'peak_browser_rss_mb': summary['peak_browser_rss_mb'],
+        'runs_per_minute': 60 * runs / sum(run_times),
+    }
+    print(
+        f"✅ Replay: median {results['run_s']['median']:.1f}s/run, "
+        f"{results['steps_per_run']:.0f} steps/run, {results['runs_per_minute']:.1f} runs/min", file=sys.stderr
+    )
+    return results
+
+BENCHMARKS = {
+    'startup': bench_startup,
+    'imports': bench_imports,
+    'launch': bench_launch,
+    'breakdown': bench_breakdown,
+    'combine': bench_combine,
+    'compaction': bench_compaction,
+    'hooks': bench_hooks,
+    'screenshots': bench_screenshots,
+    'ui': bench_ui,
+    'capture': bench_capture,
+    'network': bench_network,
+    'replay': bench_replay,
+}
+
+# Benchmarks that need a browser or a recorded cassette, left out of the default run
+BROWSER_BENCHMARKS = ('launch', 'capture', 'network', 'replay')
+
+def _timings(results, path=()):
+    """Yield (path, median) for every timing summary in a results tree."""
+    for key, value in results.items():
+        if isinstance(value, dict):
+            if key.endswith('_s') and isinstance(value.get('median'), (int, float)):
+                yield '.'.join(path + (key,)), value['median']
+            else:
+                yield from _timings(value, path + (key,))
+
+def compare_results(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Compare median timings with a baseline; returns (path, baseline, current) of each regression."""
+    baseline_timings = dict(_timings(baseline['benchmarks']))
+    regressions = []
+    for path, current in _timings(results['benchmarks']):
+        before = baseline_timings.get(path)
+        if before is None:
+            continue
+        if current > before * (1 + tolerance) and current - before > MIN_REGRESSION_S:
+            regressions.append((path, before, current))
+    return regressions
+
+def main():
+    """Run the selected benchmarks and write the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('benchmarks', nargs='*',
+                        help=f"Any of {', '.join(BENCHMARKS)}; defaults to all but {', '.join(BROWSER_BENCHMARKS)}")
+    parser.add_argument('--runs', type=int, default=3, help='Samples per measurement')
+    parser.add_argument('--output', default='-', help='JSON output path, or - for stdout')
+    parser.add_argument('--baseline', help='Results JSON to compare against; exits 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed slowdown against the baseline as a fraction')
+    args = parser.parse_args()
+    benchmarks = args.benchmarks or [name for name in BENCHMARKS if name not in BROWSER_BENCHMARKS]
+    unknown = [name for name in benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    print("🚀 Running benchmarks...", file=sys.stderr)
+    results = {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'timestamp': time.time(),
+        'benchmarks': {},
+    }
+    # Progress, including what the benchmarked modules print, goes to stderr so stdout is only the JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        for name in benchmarks:
+            print(f"\n--- {name} ---", file=sys.stderr)
+            results['benchmarks'][name] = BENCHMARKS[name](runs=args.runs)
+
+    output = json.dumps(results, indent=2)
+    if args.output == '-':
+        print(output)
+    else:
+        Path(args.output).write_text(output)
+        print(f"📊 Results written to {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        regressions = compare_results(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for path, before, current in regressions:
+            print(f"❌ Regression in {path}: {before * 1000:.2f} ms -> {current * 1000:.2f} ms "
+                  f"(+{(current / before - 1):.0%})", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No regressions against {args.baseline} (tolerance {args.tolerance:.0%})", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,162 +1,602 @@
 from browser_use import Agent, BrowserProfile
-from browser_use.llm import ChatOpenAI
+import asyncio
 import base64
-from prompts import BROWSER_AUTOMATION_PROMPT
-from config import LLM_MODEL
+import uuid
+from prompts import BROWSER_AUTOMATION_PROMPT, AUTH_STATE_HINT
+from config import LLM_MODEL, BROWSER_SINGLE_PROCESS, WORKER_MODE, DIRECT_QUERY_ENABLED, RESULT_CACHE_MAX_AGE
 import streamlit as st
-from browser_setup import setup_browser_environment, get_browser_profile_args
+from browser_setup import start_browser_setup, get_browser_profile_args
+from browser_pool import BrowserPool, browser_rss_mb, browser_cpu_seconds
+from screenshot_store import ScreenshotStore, prune_disk_cache
+from job_runner import get_job_runner, JobQueueFull, JOB_FAILED, JOB_QUEUED, JOB_RUNNING
+from worker_fleet import get_worker_fleet
+from event_channel import (
+    create_channel, register_channel, retain_channel, get_channel, drop_channel, EVENT_STARTED, EVENT_STEP_START, EVENT_STEP_END,
+    EVENT_SCREENSHOT, EVENT_COMPLETED, EVENT_ERROR,
+)
+from capture_policy import CapturePolicy
+from thought_log import describe_step_outcome
+from auth_state import get_auth_state_store, apply_storage_state, export_storage_state, remove_init_scripts
+from network_profile import create_interceptor, format_network_stats
+from replay import configured_cassette
+from instrumentation import RunTracer, InstrumentedLLM, current_tracer, navigation_timing, summarize_steps
+from llm_gateway import browser_use_chat_model
+from screen_query import (
+    ScreenCompileError, ScreenResult, compile_steps, open_screen, read_results_page, page_count, extract_result_table,
+)
+from result_table import ResultTable, result_table_path, prune_result_tables
+from run_store import get_run_store
+from result_cache import get_result_cache, result_cache_key
+from prompt_compaction import compact_prompt, format_compaction
 import platform
+import threading
+import time
+from pathlib import Path
 
-llm = ChatOpenAI(model=LLM_MODEL)
-
-# Setup browser environment with error handling
-try:
-    setup_browser_environment()
-except Exception as e:
-    st.error(f"Browser setup failed: {e}")
-    print(f"Browser setup error: {e}")
-
-# Get browser profile arguments with platform-specific optimizations
-browser_args = get_browser_profile_args()
-
-# Add additional arguments for cloud deployment
-if platform.system() == 'Linux':
-    browser_args.extend([
-        '--disable-dev-shm-usage',
-        '--disable-gpu-sandbox',
-        '--no-sandbox',
-        '--disable-setuid-sandbox',
-        '--disable-background-timer-throttling',
-        '--disable-backgrounding-occluded-windows',
-        '--disable-renderer-backgrounding',
-        '--disable-features=VizDisplayCompositor',
-        '--disable-ipc-flooding-protection',
-        '--single-process',
-        '--no-zygote',
-        '--disable-background-networking',
-        '--disable-default-apps',
-        '--disable-sync',
-        '--disable-translate',
-        '--hide-scrollbars',
-        '--mute-audio',
-        '--no-first-run',
-        '--safebrowsing-disable-auto-update',
-        '--disable-client-side-phishing-detection',
-        '--disable-component-update',
-        '--disable-domain-reliability',
-        '--disable-features=AudioServiceOutOfProcess',
-        '--disable-hang-monitor',
-        '--disable-prompt-on-repost',
-        '--disable-features=TranslateUI'
-    ])
-
-custom_browser_profile = BrowserProfile(
-    headless=True, 
-    args=browser_args,
-    # Set a large window size to ensure full page capture
-    window_size={"width": 1920, "height": 1080},
-    # Remove viewport constraint to allow full page screenshots
-    # viewport={"width": 1200, "height": 800}
-)
+# Setup browser environment in the background so importing this module never blocks;
+# the browser pool waits for it before launching Chromium
+start_browser_setup()
+
+def build_browser_profile(single_process=BROWSER_SINGLE_PROCESS):
+    """Build the headless browser profile with platform-specific optimizations.
+
+    Single-process Chromium keeps memory low on small hosts; worker processes
+    that each own a browser can turn it off.
+    """
+    # Get browser profile arguments with platform-specific optimizations
+    browser_args = get_browser_profile_args(single_process=single_process)
+
+    # Add additional arguments for cloud deployment
+    if platform.system() == 'Linux':
+        browser_args.extend([
+            '--disable-dev-shm-usage',
+            '--disable-gpu-sandbox',
+            '--no-sandbox',
+            '--disable-setuid-sandbox',
+            '--disable-background-timer-throttling',
+            '--disable-backgrounding-occluded-windows',
+            '--disable-renderer-backgrounding',
+            '--disable-features=VizDisplayCompositor',
+            '--disable-ipc-flooding-protection',
+            '--disable-background-networking',
+            '--disable-default-apps',
+            '--disable-sync',
+            '--disable-translate',
+            '--hide-scrollbars',
+            '--mute-audio',
+            '--no-first-run',
+            '--safebrowsing-disable-auto-update',
+            '--disable-client-side-phishing-detection',
+            '--disable-component-update',
+            '--disable-domain-reliability',
+            '--disable-features=AudioServiceOutOfProcess',
+            '--disable-hang-monitor',
+            '--disable-prompt-on-repost',
+            '--disable-features=TranslateUI'
+        ])
+
+    return BrowserProfile(
+        headless=True, 
+        args=browser_args,
+        # Set a large window size to ensure full page capture
+        window_size={"width": 1920, "height": 1080},
+        # Remove viewport constraint to allow full page screenshots
+        # viewport={"width": 1200, "height": 800}
+    )
+
+_chat_model = None
+_agent_llm = None
+_browser_pool = None
+_singletons_lock = threading.Lock()
+
+def get_chat_model():
+    """Get the process-wide browser-use chat model, built on first use."""
+    global _chat_model
+
+    with _singletons_lock:
+        if _chat_model is None:
+            _chat_model = browser_use_chat_model(LLM_MODEL)
+        return _chat_model
+
+def get_agent_llm():
+    """Get the agent's chat model, instrumented for per-step timing."""
+    global _agent_llm
 
-async def on_step_start_hook(agent: Agent):
-    """Hook function that captures and records agent activity at each step start."""
-    # Get step number from session state
-    step_counter = st.session_state.get('step_counter', {'n': 0})
-    step_num = step_counter['n'] + 1
-    st.session_state['step_counter']['n'] = step_num
+    chat_model = get_chat_model()
+    with _singletons_lock:
+        if _agent_llm is None:
+            _agent_llm = InstrumentedLLM(chat_model)
+        return _agent_llm
 
-    # Capture screenshot
+def get_browser_pool():
+    """Get the process-wide pool of warm browser sessions shared by all workflow runs."""
+    global _browser_pool
+
+    with _singletons_lock:
+        if _browser_pool is None:
+            _browser_pool = BrowserPool(build_browser_profile())
+        return _browser_pool
+
+def get_screenshot_store():
+    """Get this session's screenshot store, creating it if needed."""
+    store = st.session_state.get('screenshots')
+    if not isinstance(store, ScreenshotStore):
+        store = ScreenshotStore()
+        st.session_state['screenshots'] = store
+    return store
+
+async def capture_screenshot(browser_session, screenshots, step_num, label, full_page=False):
+    """Capture the current page into a screenshot store."""
+    tracer = current_tracer()
     try:
-        website_screenshot = await agent.browser_session.take_screenshot(full_page=True)
-        screenshot_bytes = base64.b64decode(website_screenshot)
-        if 'screenshots' not in st.session_state:
-            st.session_state['screenshots'] = []
-        st.session_state['screenshots'].append(screenshot_bytes)
+        start = time.perf_counter()
+        website_screenshot = await browser_session.take_screenshot(full_page=full_page)
+        # Older browser-use versions return base64 text, newer ones raw bytes
+        if isinstance(website_screenshot, str):
+            screenshot_bytes = base64.b64decode(website_screenshot)
+        else:
+            screenshot_bytes = website_screenshot
+        captured = time.perf_counter()
+        # Decoding and thumbnailing is CPU work, keep it off the event loop
+        frame = await asyncio.to_thread(screenshots.add, screenshot_bytes, step_num, label)
+        if tracer:
+            tracer.add('screenshot_capture_s', captured - start)
+            tracer.add('screenshot_decode_s', time.perf_counter() - captured)
+            tracer.add('screenshot_bytes', len(screenshot_bytes))
+        return frame
     except Exception as e:
         print(f"Error taking screenshot: {e}")
         # Continue without screenshot
+        return None
 
-    # Get the current action being performed
+async def record_step_resources(tracer, browser_session):
+    """Measure the step's page navigation time and the browser's memory and CPU."""
     try:
-        thoughts = agent.state.history.model_thoughts()
-        if thoughts and len(thoughts) > 0:
-            current_action = thoughts[-1].next_goal
-        else:
-            current_action = "Starting step"
+        url, navigation_s = await navigation_timing(browser_session)
+        # Only charge a navigation to the step in which the page changed
+        if url != tracer.last_url:
+            tracer.add('navigation_s', navigation_s)
+            tracer.last_url = url
+        cpu = browser_cpu_seconds(browser_session)
+        return {'url': url, 'browser_rss_mb': browser_rss_mb(browser_session), 'browser_cpu_s': cpu}
     except Exception as e:
-        print(f"Error getting current action: {e}")
-        current_action = "Starting step"
-    
-    # Update session state with live action
-    if 'latest_thoughts' not in st.session_state:
-        st.session_state['latest_thoughts'] = ""
-    
-    # Add new step action to thoughts with timestamp
-    step_action = f"**Step {step_num} Started:** {current_action}\n\n"
-    st.session_state['latest_thoughts'] += step_action
-
-async def on_step_end_hook(agent: Agent):
-    """Hook function that captures and records agent activity at each step end."""
-    # Get step number from session state
-    step_counter = st.session_state.get('step_counter', {'n': 0})
-    step_num = step_counter['n']
-    st.session_state['step_counter']['n'] = step_num
-
-    # Capture screenshot
-    try:
-        website_screenshot = await agent.browser_session.take_screenshot(full_page=True)
-        screenshot_bytes = base64.b64decode(website_screenshot)
-        if 'screenshots' not in st.session_state:
-            st.session_state['screenshots'] = []
-        st.session_state['screenshots'].append(screenshot_bytes)
-    except Exception as e:
-        print(f"Error taking screenshot: {e}")
-        # Continue without screenshot
-    st.session_state['step_counter']['n'] = step_num
+        print(f"⚠️ Could not read step resources: {e}")
+        return {}
+
+def make_step_hooks(channel, screenshots, tracer=None, policy=None, interceptor=None, step_counter=None):
+    """Build step hooks that publish agent activity to a run's event channel.
+
+    The hooks run on the background worker, so they must not touch
+    st.session_state; the UI folds the published events into it.
+    """
+    policy = policy or CapturePolicy()
+    step_counter = step_counter if step_counter is not None else {'n': 0}
+    cpu_at_start = {'s': None}
+
+    async def on_step_start_hook(agent: Agent):
+        """Hook function that captures and records agent activity at each step start."""
+        step_counter['n'] += 1
+        step_num = step_counter['n']
+        if tracer:
+            tracer.start_step(step_num)
+            cpu_at_start['s'] = browser_cpu_seconds(agent.browser_session)
+
+        # The agent may have switched to a tab that is not intercepted yet
+        if interceptor:
+            try:
+                await interceptor.enable_for_current_target()
+            except Exception as e:
+                print(f"⚠️ Could not enable request interception: {e}")
+
+        # Capture screenshot
+        if policy.should_capture('start'):
+            full_page = await policy.full_page(agent.browser_session)
+            frame = await capture_screenshot(agent.browser_session, screenshots, step_num, 'start', full_page=full_page)
+            if frame:
+                channel.publish(EVENT_SCREENSHOT, step=step_num, frame=frame.to_dict())
+
+        # Get the current action being performed
+        try:
+            thoughts = agent.state.history.model_thoughts()
+            if thoughts and len(thoughts) > 0:
+                current_action = thoughts[-1].next_goal
+            else:
+                current_action = "Starting step"
+        except Exception as e:
+            print(f"Error getting current action: {e}")
+            current_action = "Starting step"
+
+        if tracer:
+            tracer.annotate(goal=current_action)
+        channel.publish(EVENT_STEP_START, step=step_num, goal=current_action)
+
+    async def on_step_end_hook(agent: Agent):
+        """Hook function that captures and records agent activity at each step end."""
+        step_num = step_counter['n']
+
+        # Capture screenshot, rendering the whole page once the agent is done
+        if policy.should_capture('end'):
+            full_page = await policy.full_page(agent.browser_session, is_final=agent.state.history.is_done())
+            frame = await capture_screenshot(agent.browser_session, screenshots, step_num, 'end', full_page=full_page)
+            if frame:
+                channel.publish(EVENT_SCREENSHOT, step=step_num, frame=frame.to_dict())
+
+        if tracer:
+            resources = await record_step_resources(tracer, agent.browser_session)
+            # CPU used by the browser during this step rather than since launch
+            if resources.get('browser_cpu_s') is not None and cpu_at_start['s'] is not None:
+                resources['browser_cpu_s'] -= cpu_at_start['s']
+            else:
+                resources['browser_cpu_s'] = None
+            if interceptor:
+                resources.update(interceptor.take_step_counts())
+            tracer.end_step(**resources)
+
+        action, result = describe_step_outcome(agent)
+        channel.publish(EVENT_STEP_END, step=step_num, action=action, result=result)
+
+    return on_step_start_hook, on_step_end_hook
+
+def format_pool_metrics(metrics):
+    """Format browser pool metrics as a short status line."""
+    return (
+        f"hits={metrics['hits']} misses={metrics['misses']} "
+        f"hit_rate={metrics['hit_rate']:.0%} recycled={metrics['recycled']} "
+        f"lease_wait_avg={metrics['lease_wait_avg']:.2f}s lease_wait_max={metrics['lease_wait_max']:.2f}s "
+        f"idle={metrics['idle']}/{metrics['size']}"
+    )
 
 def cleanup_screenshots():
     """Reset screenshots in session state and reset step counter."""
-    st.session_state['screenshots'] = []
+    get_screenshot_store().clear()
     st.session_state['step_counter'] = {'n': 0}
+    prune_disk_cache()
+
+async def restore_auth_state(browser_session, app_user, sensitive_data):
+    """Load the saved screener.in login for this user and account; returns init script ids, or None."""
+    try:
+        state = await asyncio.to_thread(get_auth_state_store().load, app_user, sensitive_data)
+        if not state:
+            return None
+        script_ids = await apply_storage_state(browser_session, state)
+        print(f"✅ Restored saved screener.in session ({len(state['cookies'])} cookies)")
+        return script_ids
+    except Exception as e:
+        print(f"⚠️ Could not restore saved session: {e}")
+        return None
 
-async def execute_workflow(query):
-    """Execute the workflow using the browser automation agent."""
-    # Create agent with simplified configuration
+async def save_auth_state(browser_session, app_user, sensitive_data):
+    """Save the session's screener.in login for later runs."""
+    try:
+        state = await export_storage_state(browser_session)
+        if await asyncio.to_thread(get_auth_state_store().save, app_user, sensitive_data, state):
+            print("✅ Saved screener.in session for later runs")
+    except Exception as e:
+        print(f"⚠️ Could not save session: {e}")
 
-    prompt = BROWSER_AUTOMATION_PROMPT.format(prompt=query)
+async def attach_interceptor(interceptor, browser_session):
+    """Start the run's network profile; the run goes ahead unfiltered if interception fails."""
+    if not interceptor:
+        return
+    try:
+        await interceptor.attach(browser_session)
+    except Exception as e:
+        print(f"⚠️ Could not enable network profile: {e}")
+
+def compile_direct_query(steps, enabled=DIRECT_QUERY_ENABLED):
+    """Compile approved steps into a screen query, or None if the browser agent has to run them."""
+    if not steps or not enabled:
+        return None
+    try:
+        screen = compile_steps(steps)
+    except ScreenCompileError as e:
+        print(f"ℹ️  No direct query, running the browser agent: {e}")
+        return None
+    print(f"✅ Compiled steps into screen query: {screen.describe()}")
+    return screen
+
+async def run_direct_query(screen, browser_session, sensitive_data, channel, screenshots, tracer=None,
+                           interceptor=None, step_counter=None):
+    """Run a compiled screen query without the agent; returns a ScreenResult, or None if the agent should take over.
+
+    Publishes the same events as the agent's step hooks: one step opens the
+    screen (logging in if needed), then one step per results page read.
+    """
+    step_counter = step_counter if step_counter is not None else {'n': 0}
+
+    async def run_step(goal, action, work, full_page=False):
+        step_counter['n'] += 1
+        step_num = step_counter['n']
+        cpu_start = browser_cpu_seconds(browser_session)
+        if tracer:
+            tracer.start_step(step_num, goal=goal)
+        channel.publish(EVENT_STEP_START, step=step_num, goal=goal)
+        try:
+            value, result = await work()
+        except Exception as e:
+            channel.publish(EVENT_STEP_END, step=step_num, action=action,
+                            result=f"Failed, handing over to the browser agent: {e}")
+            raise
+
+        frame = await capture_screenshot(browser_session, screenshots, step_num, 'end', full_page=full_page)
+        if frame:
+            channel.publish(EVENT_SCREENSHOT, step=step_num, frame=frame.to_dict())
+        if tracer:
+            resources = await record_step_resources(tracer, browser_session)
+            cpu = resources.get('browser_cpu_s')
+            resources['browser_cpu_s'] = cpu - cpu_start if cpu is not None and cpu_start is not None else None
+            if interceptor:
+                resources.update(interceptor.take_step_counts())
+            tracer.end_step(**resources)
+        channel.publish(EVENT_STEP_END, step=step_num, action=action, result=result)
+        return value
+
+    async def open_step():
+        logged_in = await open_screen(browser_session, screen, sensitive_data)
+        return logged_in, "Logged in and opened the results page" if logged_in else "Opened the results page"
+
+    table = ResultTable()
+
+    async def read_page(page):
+        data = await read_results_page(browser_session, screen.url, page)
+        table.add_page(data['headers'], data['rows'])
+        return data, f"Read {len(data['rows'])} rows ({table.num_rows} so far)"
+
+    try:
+        await run_step(f"Run screen query: {screen.describe()}", "Open screen query", open_step)
+        page, pages, total = 1, 1, None
+        while page <= pages:
+            data = await run_step(f"Read results page {page}", "Extract results table",
+                                  lambda: read_page(page), full_page=page == 1)
+            if page == 1:
+                pages, total = page_count(data), data.get('total')
+            if not data['rows']:
+                break
+            page += 1
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"⚠️ Direct query failed, running the browser agent: {e}")
+        return None
+    return ScreenResult(screen, table, total, steps=step_counter['n'])
+
+async def save_result_table(browser_session, result, run_id):
+    """Save the run's results table for the UI; returns its path, or None.
+
+    Direct queries already hold their table; after an agent run, the table is
+    read from the DOM if the agent finished on a screen's results page.
+    """
+    try:
+        table = result.table if isinstance(result, ScreenResult) else await extract_result_table(browser_session)
+        if table is None or not table.num_rows:
+            return None
+        path = await asyncio.to_thread(table.save, result_table_path(run_id))
+        await asyncio.to_thread(prune_result_tables)
+        print(f"✅ Saved results table: {table.num_rows} rows from {table.pages} pages")
+        return path
+    except Exception as e:
+        print(f"⚠️ Could not read the results table: {e}")
+        return None
+
+def record_run(write, *args, **kwargs):
+    """Write to the run history; a failed write never fails the run."""
+    try:
+        write(*args, **kwargs)
+    except Exception as e:
+        print(f"⚠️ Could not record run history: {e}")
+
+async def execute_workflow(query, sensitive_data, channel, screenshots, pool=None, app_user=None, cassette=None,
+                           steps=None, request=None):
+    """Execute the workflow using the browser automation agent.
+
+    With a record/replay `cassette` (or REPLAY_MODE set), the browser's HTTP
+    traffic and the agent's LLM calls are recorded to it or served from it.
+    Approved `steps` that compile into a screen query run directly, without
+    the agent, which only takes over if the direct run fails. The run is
+    recorded in the run history under the user's `request` prompt.
+    """
+    pool = pool or get_browser_pool()
+    tracer = RunTracer(channel.run_id).activate()
+    status = 'failed'
+    history = compaction = None
+    result = table_path = error = None
     
     try:
-        agent = Agent(
-            task=prompt,
-            llm=llm,
-            sensitive_data={
-                'https://www.screener.in/': {
-                    'email': st.session_state['sensitive_data']['email'],
-                    'password': st.session_state['sensitive_data']['password']
-                }
-            },
-            browser_profile=custom_browser_profile
+        cassette = cassette or configured_cassette()
+        # Replays are benchmarks, not user runs, so they stay out of the history
+        history = None if cassette else get_run_store()
+        if history:
+            record_run(history.start_run, channel.run_id, request or query, app_user=app_user, combined_prompt=query,
+                       steps=steps, cache_key=result_cache_key(query, sensitive_data, app_user))
+        interceptor = cassette.interceptor() if cassette else create_interceptor()
+        agent_llm = InstrumentedLLM(cassette.wrap_llm(get_chat_model())) if cassette else get_agent_llm()
+        # Cassettes hold agent runs, so recording and replaying always use the agent
+        screen = None if cassette else compile_direct_query(steps)
+        # The agent resends its task every step; cassettes keep the prompt they were recorded with
+        compaction = None if cassette else compact_prompt(query)
+        prompt = BROWSER_AUTOMATION_PROMPT.format(prompt=compaction.text if compaction else query)
+        step_counter = {'n': 0}
+        on_step_start_hook, on_step_end_hook = make_step_hooks(
+            channel, screenshots, tracer, interceptor=interceptor, step_counter=step_counter
         )
 
-        # Initialize session state for live updates
-        if 'latest_thoughts' not in st.session_state:
-            st.session_state['latest_thoughts'] = ""
-        st.session_state['agent_ran'] = True
-        st.session_state['agent_completed'] = False
-        st.session_state['start_realtime_updates'] = True
-        
-        result = await agent.run(on_step_start=on_step_start_hook, on_step_end=on_step_end_hook)
-        st.session_state['latest_thoughts'] += f"\n\n**Workflow completed successfully!**"
-        st.session_state['agent_completed'] = True
-        st.session_state['start_realtime_updates'] = False
-        st.session_state['final_result'] = result.final_result()
+        async with pool.lease() as browser_session:
+            await attach_interceptor(interceptor, browser_session)
+            script_ids = await restore_auth_state(browser_session, app_user, sensitive_data)
+            auth_restored = script_ids is not None
+            channel.publish(EVENT_STARTED, prompt=query, auth_restored=auth_restored)
+            if auth_restored:
+                prompt += AUTH_STATE_HINT
+
+            try:
+                result = None
+                if screen is not None:
+                    result = await run_direct_query(
+                        screen, browser_session, sensitive_data, channel, screenshots, tracer,
+                        interceptor=interceptor, step_counter=step_counter
+                    )
+                if result is None:
+                    agent = Agent(
+                        task=prompt,
+                        llm=agent_llm,
+                        sensitive_data={
+                            'https://www.screener.in/': {
+                                'email': sensitive_data['email'],
+                                'password': sensitive_data['password']
+                            }
+                        },
+                        browser_session=browser_session
+                    )
+                    result = await agent.run(on_step_start=on_step_start_hook, on_step_end=on_step_end_hook)
+                if result.is_done():
+                    await save_auth_state(browser_session, app_user, sensitive_data)
+                    # Paging through results would add requests a cassette does not hold
+                    if not cassette:
+                        table_path = await save_result_table(browser_session, result, channel.run_id)
+                if cassette:
+                    cassette.save(query=query)
+            finally:
+                await remove_init_scripts(browser_session, script_ids or [])
+                if interceptor:
+                    await interceptor.detach()
+                    print(f"ℹ️  Network profile: {format_network_stats(interceptor.get_stats())}")
+
+        direct = isinstance(result, ScreenResult)
+        if compaction and not direct:
+            print(f"ℹ️  Prompt compaction: {format_compaction(compaction, result.number_of_steps())}")
+        print(f"ℹ️  Run finished in {result.number_of_steps()} steps "
+              f"(direct query: {direct}, saved session restored: {auth_restored})")
+        print(f"ℹ️  Browser pool: {format_pool_metrics(pool.get_metrics())}")
+        channel.publish(EVENT_COMPLETED, result=result.final_result(), table=table_path)
+        status = 'succeeded'
         return result
         
+    except asyncio.CancelledError:
+        status = 'cancelled'
+        raise
     except Exception as e:
-        st.session_state['latest_thoughts'] += f"\n\n**Error during execution: {str(e)}**"
-        st.session_state['agent_error'] = True
-        st.session_state['agent_completed'] = True
-        st.session_state['start_realtime_updates'] = False
-        st.session_state['final_result'] = f"Error: {str(e)}"
-        raise e
\ No newline at end of file
+        error = str(e)
+        channel.publish(EVENT_ERROR, error=error)
+        raise e
+    finally:
+        tracer.finish(status)
+        tracer.deactivate()
+        if history:
+            metrics = summarize_steps(tracer.registry.get_steps(channel.run_id))
+            if compaction and result is not None and not isinstance(result, ScreenResult):
+                metrics.update(compaction.savings(result.number_of_steps()))
+            record_run(
+                history.finish_run, channel.run_id, status,
+                result=result.final_result() if result is not None else None, error=error,
+                agent_steps=result.number_of_steps() if result is not None else None,
+                direct=isinstance(result, ScreenResult), table_path=table_path,
+                events=channel.read_since(0), metrics=metrics
+            )
+
+# --------- Background Jobs ---------
+def serve_cached_run(run):
+    """Replay a recorded run's outcome on a new channel and return the new run id."""
+    run_id = uuid.uuid4().hex
+    channel = create_channel(run_id)
+    channel.publish(EVENT_STARTED, prompt=run['combined_prompt'], cached_from=run['run_id'])
+    frames = [frame for frame in run['screenshots'] or [] if Path(frame['path']).exists()]
+    if frames:
+        channel.publish(EVENT_SCREENSHOT, step=frames[-1].get('step'), frame=frames[-1])
+    table = run['table_path'] if run['table_path'] and Path(run['table_path']).exists() else None
+    channel.publish(EVENT_COMPLETED, result=run['result'], table=table, cached_from=run['run_id'],
+                    cached_at=run['finished_at'])
+    print(f"✅ Served workflow from run {run['run_id']} ({time.time() - run['finished_at']:.0f}s old)")
+    return run_id
+
+def start_workflow_run(query, sensitive_data, screenshots, app_user=None, steps=None, request=None, max_age=None,
+                       force_refresh=False):
+    """Submit a workflow to the job runner and return its run id.
+
+    `steps` are the approved steps, run as a direct screen query when they compile into one;
+    `request` is the user's prompt, under which the run is kept in the run history.
+
+    An identical workflow that succeeded within `max_age` seconds (RESULT_CACHE_MAX_AGE by
+    default) is served from the run history, unless `force_refresh` is set, and one that is
+    already queued or running is joined rather than started again.
+
+    Raises JobQueueFull when too many runs are already waiting.
+    """
+    sensitive_data = dict(sensitive_data)
+    cache = get_result_cache()
+    key = result_cache_key(query, sensitive_data, app_user)
+
+    if not force_refresh:
+        run = cache.lookup(key, RESULT_CACHE_MAX_AGE if max_age is None else max_age)
+        if run is not None:
+            return serve_cached_run(run)
+
+    def is_active(run_id):
+        status = get_run_status(run_id) if get_channel(run_id) is not None else None
+        return status is not None and status['status'] in (JOB_QUEUED, JOB_RUNNING)
+
+    def submit():
+        run_id = uuid.uuid4().hex
+
+        if WORKER_MODE == 'process':
+            # Worker processes publish screenshot references; the UI loads them from the shared disk cache
+            fleet = get_worker_fleet()
+            fleet.submit('workflow', {'query': query, 'sensitive_data': sensitive_data, 'app_user': app_user,
+                                      'steps': steps, 'request': request}, job_id=run_id)
+            register_channel(fleet.channel(run_id))
+            return run_id
+
+        channel = create_channel(run_id)
+
+        def on_finish(job):
+            cache.release(key, run_id)
+            # Cancelled or timed-out runs never reach execute_workflow's error handler
+            if not channel.closed:
+                channel.publish(EVENT_ERROR, error=job.error or f"Workflow run {job.status}")
+            if job.status == JOB_FAILED:
+                print(f"❌ Workflow run failed: {job.error}")
+
+        try:
+            get_job_runner().submit(
+                lambda: execute_workflow(query, sensitive_data, channel, screenshots, app_user=app_user, steps=steps,
+                                         request=request),
+                name='workflow',
+                job_id=run_id,
+                on_finish=on_finish
+            )
+        except JobQueueFull:
+            drop_channel(run_id)
+            raise
+        return run_id
+
+    run_id, joined = cache.single_flight(key, is_active, submit, force_refresh=force_refresh)
+    if joined:
+        # The joining session follows the run too, so each session's drop_channel is balanced
+        retain_channel(run_id)
+        print(f"ℹ️ Joined in-flight workflow run {run_id}")
+    return run_id
+
+def get_run_status(run_id):
+    """Get the job status snapshot for a workflow run, or None."""
+    if WORKER_MODE == 'process':
+        return get_worker_fleet().status(run_id)
+
+    job = get_job_runner().status(run_id)
+    if job is None:
+        return None
+    status = job.to_dict()
+    status['queue_position'] = get_job_runner().queue_position(run_id)
+    return status
+
+def cancel_workflow_run(run_id):
+    """Cancel a queued or running workflow."""
+    if WORKER_MODE == 'process':
+        return get_worker_fleet().cancel(run_id)
+    return get_job_runner().cancel(run_id)
+
+def warm_browser_pool():
+    """Pre-launch browser sessions on the job runner loop without waiting."""
+    if WORKER_MODE == 'process':
+        # Worker processes own their browsers; starting the fleet is enough
+        get_worker_fleet()
+        return
+    get_job_runner().run_coroutine(get_browser_pool().warm())
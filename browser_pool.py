@@ -0,0 +1,323 @@
+# Warm browser session pool for the Workflow Automator
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+import psutil
+from browser_use import BrowserSession
+
+from browser_setup import wait_for_browser_setup
+from config import (
+    BROWSER_POOL_SIZE,
+    BROWSER_POOL_MAX_USES,
+    BROWSER_POOL_MAX_RSS_MB,
+    BROWSER_POOL_LEASE_TIMEOUT,
+)
+
+# Storage types wiped from every origin a leased session visited
+RESET_STORAGE_TYPES = 'local_storage,session_storage,indexeddb,cache_storage,service_workers,websql'
+
+
+class BrowserPoolTimeout(RuntimeError):
+    """Raised when no browser session frees up within the pool's lease timeout."""
+
+
+class PooledSession:
+    """A pre-launched browser session tracked by the pool."""
+
+    def __init__(self, session):
+        self.session = session
+        self.uses = 0
+        self.created_at = time.time()
+
+
+class BrowserPool:
+    """Process-wide pool of warm browser sessions leased to workflow runs.
+
+    Sessions are bound to the event loop that launched them, normally the job
+    runner's long-lived loop. The pool refuses to be used from another loop
+    while that one is open; once it is closed, the browsers launched on it are
+    killed and the pool starts over on the new loop.
+    """
+
+    def __init__(self, browser_profile, size=BROWSER_POOL_SIZE, max_uses=BROWSER_POOL_MAX_USES,
+                 max_rss_mb=BROWSER_POOL_MAX_RSS_MB, lease_timeout=BROWSER_POOL_LEASE_TIMEOUT):
+        # keep_alive stops Agent.close() from killing a session we want to reuse
+        self.browser_profile = browser_profile.model_copy(update={'keep_alive': True})
+        self.size = max(1, size)
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self.lease_timeout = lease_timeout
+
+        self._idle = []
+        self._leased = set()
+        self._total = 0
+        self._loop = None
+        self._condition = None
+        self._metrics = {
+            'hits': 0,
+            'misses': 0,
+            'recycled': 0,
+            'reset_failures': 0,
+            'leases': 0,
+            'lease_wait_total': 0.0,
+            'lease_wait_max': 0.0,
+        }
+
+    def _bind_loop(self):
+        """Attach the pool to the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        if self._loop is not None and not self._loop.is_closed():
+            raise RuntimeError("Browser pool is in use on another event loop")
+
+        dropped = self._idle + list(self._leased)
+        if dropped:
+            # Their CDP connections died with the old loop, so only their processes can be stopped
+            print(f"⚠️ Browser pool moved to a new event loop, killing {len(dropped)} session(s)")
+            for pooled in dropped:
+                kill_browser_process(pooled.session)
+        self._idle = []
+        self._leased = set()
+        self._total = 0
+        self._loop = loop
+        self._condition = asyncio.Condition()
+
+    async def _launch(self):
+        """Start a new browser session from the pool profile."""
+        if not await asyncio.to_thread(wait_for_browser_setup):
+            print("⚠️ Browser environment setup failed, trying to launch anyway")
+        session = BrowserSession(browser_profile=self.browser_profile.model_copy())
+        await session.start()
+        return PooledSession(session)
+
+    async def warm(self, count=None):
+        """Pre-launch sessions until `count` (default: pool size) are idle."""
+        self._bind_loop()
+        target = min(count or self.size, self.size)
+
+        launched = 0
+        while True:
+            async with self._condition:
+                if len(self._idle) >= target or self._total >= self.size:
+                    break
+                self._total += 1
+
+            try:
+                pooled = await self._launch()
+            except Exception as e:
+                async with self._condition:
+                    self._total -= 1
+                    self._condition.notify()
+                print(f"❌ Failed to pre-launch browser session: {e}")
+                break
+
+            async with self._condition:
+                self._idle.append(pooled)
+                self._condition.notify()
+            launched += 1
+
+        if launched:
+            print(f"✅ Browser pool warmed with {launched} session(s)")
+        return launched
+
+    @asynccontextmanager
+    async def lease(self):
+        """Lease a browser session for the duration of a workflow run."""
+        pooled = await self._acquire()
+        try:
+            yield pooled.session
+        finally:
+            await self._release(pooled)
+
+    async def _acquire(self):
+        """Take an idle session, launch a new one, or wait for a release.
+
+        `lease_timeout` bounds the whole wait, however often the waiter is woken
+        and loses the session to another one.
+        """
+        self._bind_loop()
+        started = time.perf_counter()
+        deadline = started + self.lease_timeout
+        launch = False
+
+        async with self._condition:
+            while True:
+                if self._idle:
+                    pooled = self._idle.pop()
+                    self._metrics['hits'] += 1
+                    break
+                if self._total < self.size:
+                    self._total += 1
+                    self._metrics['misses'] += 1
+                    launch = True
+                    break
+                try:
+                    await asyncio.wait_for(self._condition.wait(), timeout=max(0.0, deadline - time.perf_counter()))
+                except asyncio.TimeoutError:
+                    raise BrowserPoolTimeout(
+                        f"No browser available within {self.lease_timeout:g}s; all {self.size} are in use"
+                    ) from None
+
+        if launch:
+            try:
+                pooled = await self._launch()
+            except Exception:
+                async with self._condition:
+                    self._total -= 1
+                    self._condition.notify()
+                raise
+
+        waited = time.perf_counter() - started
+        self._metrics['leases'] += 1
+        self._metrics['lease_wait_total'] += waited
+        self._metrics['lease_wait_max'] = max(self._metrics['lease_wait_max'], waited)
+
+        pooled.uses += 1
+        self._leased.add(pooled)
+        return pooled
+
+    async def _release(self, pooled):
+        """Reset a leased session and return it to the pool, or recycle it."""
+        self._leased.discard(pooled)
+        keep = True
+        try:
+            await self._reset_session(pooled.session)
+        except Exception as e:
+            print(f"⚠️ Browser session reset failed, recycling it: {e}")
+            self._metrics['reset_failures'] += 1
+            keep = False
+
+        if keep and pooled.uses >= self.max_uses:
+            keep = False
+        if keep and self.max_rss_mb:
+            rss_mb = browser_rss_mb(pooled.session)
+            if rss_mb is not None and rss_mb > self.max_rss_mb:
+                print(f"ℹ️  Browser session using {rss_mb:.0f} MB RSS, recycling it")
+                keep = False
+
+        if not keep:
+            self._metrics['recycled'] += 1
+            await self._close_session(pooled.session)
+
+        async with self._condition:
+            if keep:
+                self._idle.append(pooled)
+            else:
+                self._total -= 1
+            self._condition.notify()
+
+    async def _reset_session(self, session):
+        """Clear cookies, storage and extra tabs left behind by a run."""
+        tabs = await session.get_tabs()
+
+        origins = set()
+        for tab in tabs:
+            parsed = urlparse(tab.url)
+            if parsed.scheme in ('http', 'https'):
+                origins.add(f"{parsed.scheme}://{parsed.netloc}")
+
+        await session.clear_cookies()
+        for origin in origins:
+            await session.cdp_client.send.Storage.clearDataForOrigin(
+                params={'origin': origin, 'storageTypes': RESET_STORAGE_TYPES}
+            )
+
+        for tab in tabs[1:]:
+            await session.close_page(tab.target_id)
+        await session.navigate_to('about:blank')
+
+    async def _close_session(self, session):
+        """Kill a session, ignoring errors from an already dead browser."""
+        try:
+            await session.kill()
+        except Exception as e:
+            print(f"⚠️ Error closing browser session: {e}")
+
+    async def close(self):
+        """Kill every idle session in the pool."""
+        if self._condition is None:
+            return
+        async with self._condition:
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+        for pooled in idle:
+            await self._close_session(pooled.session)
+
+    def get_metrics(self):
+        """Return pool hit/miss and lease-wait metrics."""
+        metrics = dict(self._metrics)
+        leases = metrics['leases']
+        lookups = metrics['hits'] + metrics['misses']
+        metrics['hit_rate'] = metrics['hits'] / lookups if lookups else 0.0
+        metrics['lease_wait_avg'] = metrics['lease_wait_total'] / leases if leases else 0.0
+        metrics['idle'] = len(self._idle)
+        metrics['total'] = self._total
+        metrics['size'] = self.size
+        return metrics
+
+
+def _browser_processes(session):
+    """A session's browser process followed by its descendants, or None if the browser is unknown or gone."""
+    watchdog = getattr(session, '_local_browser_watchdog', None)
+    pid = getattr(watchdog, 'browser_pid', None)
+    if not pid:
+        return None
+
+    try:
+        process = psutil.Process(pid)
+        return [process] + process.children(recursive=True)
+    except psutil.Error:
+        return None
+
+
+def kill_browser_process(session):
+    """Kill a session's browser process tree directly, for sessions whose event loop is gone."""
+    processes = _browser_processes(session)
+    if not processes:
+        return False
+
+    for process in processes[1:]:
+        try:
+            process.kill()
+        except psutil.Error:
+            continue
+    try:
+        processes[0].kill()
+        return True
+    except psutil.Error:
+        return False
+
+
+def browser_rss_mb(session):
+    """Resident memory of a session's browser process tree in MB, if known."""
+    processes = _browser_processes(session)
+    if not processes:
+        return None
+
+    rss = 0
+    for process in processes:
+        try:
+            rss += process.memory_info().rss
+        except psutil.Error:
+            continue
+    return rss / (1024 * 1024)
+
+
+def browser_cpu_seconds(session):
+    """CPU time used so far by a session's browser process tree in seconds, if known."""
+    processes = _browser_processes(session)
+    if not processes:
+        return None
+
+    cpu = 0.0
+    for process in processes:
+        try:
+            times = process.cpu_times()
+            cpu += times.user + times.system
+        except psutil.Error:
+            continue
+    return cpu
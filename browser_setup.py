@@ -4,12 +4,26 @@ Browser setup module for Playwright configuration.
 Handles browser installation and platform-specific configurations.
 """
 
+import json
 import os
 import platform
 import subprocess
 import sys
+import threading
+import time
+from importlib import metadata
 from pathlib import Path
 
+# Written next to the installed browsers once `playwright install` has succeeded;
+# WORKFLOW_INSTALL_MANIFEST points it elsewhere (the startup benchmark uses this)
+INSTALL_MANIFEST_NAME = '.workflow_automator_install.json'
+
+# Once-per-process setup state
+_setup_lock = threading.Lock()
+_thread_lock = threading.Lock()
+_setup_thread = None
+_setup_result = None
+
 def force_install_playwright_browsers():
     """Force install Playwright browsers for the current platform."""
     print("🔧 Installing Playwright browsers...")
@@ -22,6 +36,7 @@ def force_install_playwright_browsers():
         
         print("✅ Playwright browsers installed successfully!")
         print(result.stdout)
+        write_install_manifest()
         return True
         
     except subprocess.CalledProcessError as e:
@@ -29,6 +44,111 @@ def force_install_playwright_browsers():
         print(f"Error output: {e.stderr}")
         return False
 
+def get_playwright_browsers_path():
+    """Get the directory Playwright installs browsers into."""
+    env_path = os.environ.get('PLAYWRIGHT_BROWSERS_PATH')
+    if env_path == '0':
+        import playwright
+        return Path(playwright.__file__).parent / 'driver' / 'package' / '.local-browsers'
+    if env_path:
+        return Path(env_path)
+
+    system = platform.system()
+    if system == 'Darwin':
+        return Path.home() / 'Library' / 'Caches' / 'ms-playwright'
+    if system == 'Windows':
+        return Path(os.environ.get('LOCALAPPDATA', Path.home() / 'AppData' / 'Local')) / 'ms-playwright'
+    return Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'ms-playwright'
+
+def get_install_key():
+    """Get the Playwright version and Chromium revision this process expects."""
+    try:
+        import playwright
+        version = metadata.version('playwright')
+        browsers_file = Path(playwright.__file__).parent / 'driver' / 'package' / 'browsers.json'
+        browsers = json.loads(browsers_file.read_text())['browsers']
+        revision = next(b['revision'] for b in browsers if b['name'] == 'chromium')
+        return {'playwright_version': version, 'chromium_revision': revision}
+    except Exception as e:
+        print(f"⚠️ Could not determine Playwright browser revision: {e}")
+        return None
+
+def is_chromium_installed(install_key):
+    """Cheap filesystem check for the expected Chromium revision."""
+    browser_dir = get_playwright_browsers_path() / f"chromium-{install_key['chromium_revision']}"
+    if (browser_dir / 'INSTALLATION_COMPLETE').exists():
+        return True
+
+    executables = [
+        'chrome-linux/chrome',
+        'chrome-linux64/chrome',
+        'chrome-mac/Chromium.app/Contents/MacOS/Chromium',
+        'chrome-mac-arm64/Google Chrome for Testing.app/Contents/MacOS/Google Chrome for Testing',
+        'chrome-mac-x64/Google Chrome for Testing.app/Contents/MacOS/Google Chrome for Testing',
+        'chrome-win/chrome.exe',
+        'chrome-win64/chrome.exe',
+    ]
+    return any((browser_dir / executable).exists() for executable in executables)
+
+def get_install_manifest_path():
+    """Get the path of the install manifest."""
+    env_path = os.environ.get('WORKFLOW_INSTALL_MANIFEST')
+    return Path(env_path) if env_path else get_playwright_browsers_path() / INSTALL_MANIFEST_NAME
+
+def read_install_manifest():
+    """Read the install manifest, or None if it is missing or unreadable."""
+    try:
+        return json.loads(get_install_manifest_path().read_text())
+    except (OSError, ValueError):
+        return None
+
+def manifest_matches(install_key, manifest=None):
+    """Whether the install manifest records this Playwright version and Chromium revision."""
+    manifest = manifest if manifest is not None else read_install_manifest()
+    return bool(install_key and manifest) and all(manifest.get(k) == v for k, v in install_key.items())
+
+def write_install_manifest(install_key=None):
+    """Record the installed Playwright version and Chromium revision."""
+    install_key = install_key or get_install_key()
+    if not install_key:
+        return
+
+    manifest = dict(install_key, installed_at=time.time())
+    manifest_path = get_install_manifest_path()
+    try:
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        manifest_path.write_text(json.dumps(manifest, indent=2))
+    except OSError as e:
+        print(f"⚠️ Could not write install manifest: {e}")
+
+def ensure_playwright_browsers():
+    """Install Chromium unless the manifest and the browser files show the expected revision is installed.
+
+    Browser files without a matching manifest may be a partial or older
+    install, so `playwright install` runs and verifies them; it only
+    downloads what is missing.
+    """
+    install_key = get_install_key()
+
+    if manifest_matches(install_key) and is_chromium_installed(install_key):
+        print(f"✅ Chromium {install_key['chromium_revision']} already installed, skipping install")
+        return True
+
+    print("🔧 Installing Playwright Chromium...")
+    try:
+        result = subprocess.run([
+            sys.executable, "-m", "playwright", "install", "chromium"
+        ], capture_output=True, text=True, check=True)
+        print(result.stdout)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Failed to install browsers: {e}")
+        print(f"Error output: {e.stderr}")
+        return False
+
+    write_install_manifest(install_key)
+    print("✅ Playwright browsers installed successfully!")
+    return True
+
 def setup_playwright_environment():
     """Setup Playwright environment variables for the current platform."""
     
@@ -44,17 +164,12 @@ def setup_playwright_environment():
             print("ℹ️  Using default Playwright browser paths")
     
     elif system == 'Linux':
-        # On Linux (cloud deployment), set specific paths and force install
+        # On Linux (cloud deployment), set specific paths
         print("ℹ️  Setting up Playwright for Linux cloud deployment")
         
         # Set environment variables for cloud deployment
         os.environ.setdefault('PLAYWRIGHT_BROWSERS_PATH', '/home/appuser/.cache/ms-playwright')
         os.environ.setdefault('PLAYWRIGHT_SKIP_BROWSER_DOWNLOAD', '0')
-        
-        # Force install browsers for cloud deployment
-        if not force_install_playwright_browsers():
-            print("❌ Failed to install browsers for cloud deployment")
-            return False
     
     else:
         # Windows or other platforms
@@ -63,8 +178,12 @@ def setup_playwright_environment():
     # Ensure browsers are downloaded
     os.environ.setdefault('PLAYWRIGHT_SKIP_BROWSER_DOWNLOAD', '0')
 
-def get_browser_profile_args():
-    """Get browser profile arguments based on the platform."""
+def get_browser_profile_args(single_process=True):
+    """Get browser profile arguments based on the platform.
+
+    `single_process=False` lets Chromium use its normal multi-process model,
+    for hosts where each worker owns its own browser.
+    """
     system = platform.system()
     
     base_args = [
@@ -85,8 +204,6 @@ def get_browser_profile_args():
             '--disable-renderer-backgrounding',
             '--disable-features=VizDisplayCompositor',
             '--disable-ipc-flooding-protection',
-            '--single-process',  # Use single process for cloud deployment
-            '--no-zygote',  # Disable zygote process
             '--disable-setuid-sandbox',
             '--disable-background-networking',
             '--disable-default-apps',
@@ -107,24 +224,53 @@ def get_browser_profile_args():
             '--disable-features=TranslateUI',
             '--disable-ipc-flooding-protection'
         ])
+        if single_process:
+            base_args.extend([
+                '--single-process',  # Use single process for cloud deployment
+                '--no-zygote',  # Disable zygote process
+            ])
     
     return base_args
 
 def setup_browser_environment():
-    """Complete browser environment setup."""
-    print("🔧 Setting up browser environment...")
-    
-    # Setup environment variables
-    setup_playwright_environment()
-    
-    # Force install browsers for cloud deployment
-    if platform.system() == 'Linux':
-        if not force_install_playwright_browsers():
+    """Complete browser environment setup, at most once per process."""
+    global _setup_result
+
+    with _setup_lock:
+        if _setup_result is not None:
+            return _setup_result
+
+        print("🔧 Setting up browser environment...")
+        
+        # Setup environment variables
+        setup_playwright_environment()
+        
+        # Install browsers for cloud deployment unless already present
+        if platform.system() == 'Linux' and not ensure_playwright_browsers():
             print("❌ Failed to install browsers for cloud deployment")
+            _setup_result = False
             return False
-    
-    print("✅ Browser environment setup complete")
-    return True
+        
+        print("✅ Browser environment setup complete")
+        _setup_result = True
+        return True
+
+def start_browser_setup():
+    """Run browser environment setup in a background thread without blocking."""
+    global _setup_thread
+
+    with _thread_lock:
+        if _setup_thread is None:
+            _setup_thread = threading.Thread(
+                target=setup_browser_environment, name='browser-setup', daemon=True
+            )
+            _setup_thread.start()
+        return _setup_thread
+
+def wait_for_browser_setup(timeout=None):
+    """Block until browser environment setup has finished and return its result."""
+    start_browser_setup().join(timeout)
+    return bool(_setup_result)
 
 def verify_browser_installation():
     """Verify that browsers are properly installed."""
@@ -142,5 +288,9 @@ def verify_browser_installation():
         return False
 
 if __name__ == "__main__":
-    setup_browser_environment()
+    if '--force' in sys.argv:
+        setup_playwright_environment()
+        force_install_playwright_browsers()
+    else:
+        setup_browser_environment()
     verify_browser_installation() 
\ No newline at end of file
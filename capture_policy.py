@@ -0,0 +1,79 @@
+# Screenshot capture policy for the Workflow Automator
+#
+# Decides when a step captures a screenshot and whether it renders the whole
+# page or only the viewport. Full-page rendering of long screener.in result
+# tables is the slowest part of a step, so it is kept for the moments it
+# adds information.
+
+from config import SCREENSHOT_CAPTURE_POLICY, SCREENSHOT_CAPTURE_AT, SCREENSHOT_DOM_CHANGE_THRESHOLD
+
+# Capture policies
+POLICY_FULL_PAGE = 'full_page'  # every capture renders the whole page
+POLICY_VIEWPORT = 'viewport'    # every capture renders the viewport only
+POLICY_ADAPTIVE = 'adaptive'    # viewport, full page on the final step or a large DOM change
+
+CAPTURE_POLICIES = (POLICY_FULL_PAGE, POLICY_VIEWPORT, POLICY_ADAPTIVE)
+
+# Cheap summary of the page used to detect substantial DOM changes
+DOM_SIGNATURE_SCRIPT = """
+(() => ({
+    url: location.href,
+    nodes: document.getElementsByTagName('*').length,
+    height: document.documentElement.scrollHeight,
+}))()
+"""
+
+
+async def dom_signature(browser_session):
+    """URL, element count and scroll height of the current page."""
+    cdp_session = await browser_session.get_or_create_cdp_session(focus=False)
+    result = await cdp_session.cdp_client.send.Runtime.evaluate(
+        params={'expression': DOM_SIGNATURE_SCRIPT, 'returnByValue': True},
+        session_id=cdp_session.session_id
+    )
+    return result.get('result', {}).get('value')
+
+
+def dom_change(previous, current):
+    """Relative size of the change between two DOM signatures, 1.0 for a new page."""
+    if not previous or not current:
+        return 1.0
+    if previous['url'] != current['url']:
+        return 1.0
+    nodes = abs(current['nodes'] - previous['nodes']) / max(previous['nodes'], 1)
+    height = abs(current['height'] - previous['height']) / max(previous['height'], 1)
+    return max(nodes, height)
+
+
+class CapturePolicy:
+    """Per-run screenshot policy: when to capture and whether to render the full page."""
+
+    def __init__(self, policy=SCREENSHOT_CAPTURE_POLICY, capture_at=SCREENSHOT_CAPTURE_AT,
+                 dom_change_threshold=SCREENSHOT_DOM_CHANGE_THRESHOLD):
+        if policy not in CAPTURE_POLICIES:
+            print(f"⚠️ Unknown screenshot policy '{policy}', using '{POLICY_ADAPTIVE}'")
+            policy = POLICY_ADAPTIVE
+        self.policy = policy
+        self.capture_at = capture_at
+        self.dom_change_threshold = dom_change_threshold
+        self._last_full_page = None
+
+    def should_capture(self, label):
+        """Whether to capture at this point of a step ('start' or 'end')."""
+        return self.capture_at != 'end' or label == 'end'
+
+    async def full_page(self, browser_session, is_final=False):
+        """Whether this capture should render the full page."""
+        if self.policy != POLICY_ADAPTIVE:
+            return self.policy == POLICY_FULL_PAGE
+
+        try:
+            signature = await dom_signature(browser_session)
+        except Exception as e:
+            print(f"⚠️ Could not read DOM signature: {e}")
+            return is_final
+
+        if is_final or dom_change(self._last_full_page, signature) >= self.dom_change_threshold:
+            self._last_full_page = signature
+            return True
+        return False
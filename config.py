@@ -25,10 +25,13 @@ STEP_SCREENSHOT_FORMAT = 'step_{}.png'
 SESSION_KEYS = {
     'authenticated': False,
     'login_error': "",
-    'latest_thoughts': "",
+    'thought_log': None,
+    'thought_page': 1,
     'agent_ran': False,
     'agent_completed': False,
     'final_result': "",
+    'result_table': None,
+    'result_cached_at': None,
     'start_realtime_updates': False,
     'credentials_configured': False,
     'sensitive_data': {},
@@ -40,7 +43,14 @@ SESSION_KEYS = {
     'edited_steps': [],
     'agent_error': False,
     'combined_prompt': "",
-    'step_counter': {'n': 0}
+    'prompt_compaction': None,
+    'step_counter': {'n': 0},
+    'run_id': None,
+    'event_cursor': 0,
+    'breakdown_streaming': False,
+    'batch_id': None,
+    'plan_match': None,
+    'app_user': ""
 }
 
 # --------- UI Layout ---------
@@ -82,4 +92,138 @@ os.environ.setdefault('PLAYWRIGHT_SKIP_BROWSER_DOWNLOAD', '0')
 
 # --------- Debug Configuration ---------
 DEBUG_MODE = get_env_var('DEBUG_MODE', 'False').lower() == 'true'
-LOG_LEVEL = get_env_var('LOG_LEVEL', 'INFO') 
\ No newline at end of file
+LOG_LEVEL = get_env_var('LOG_LEVEL', 'INFO') 
+
+# --------- Browser Pool Configuration ---------
+BROWSER_POOL_SIZE = int(get_env_var('BROWSER_POOL_SIZE', '2'))
+BROWSER_POOL_MAX_USES = int(get_env_var('BROWSER_POOL_MAX_USES', '20'))
+BROWSER_POOL_MAX_RSS_MB = int(get_env_var('BROWSER_POOL_MAX_RSS_MB', '1024'))
+BROWSER_POOL_LEASE_TIMEOUT = float(get_env_var('BROWSER_POOL_LEASE_TIMEOUT', '120'))
+
+# --------- Screenshot Store Configuration ---------
+SCREENSHOT_CACHE_DIR = os.path.join(SCREENSHOTS_DIR, 'cache')
+SCREENSHOT_THUMBNAIL_WIDTH = int(get_env_var('SCREENSHOT_THUMBNAIL_WIDTH', '640'))
+SCREENSHOT_THUMBNAIL_FORMAT = get_env_var('SCREENSHOT_THUMBNAIL_FORMAT', 'JPEG')  # JPEG or WEBP
+SCREENSHOT_THUMBNAIL_QUALITY = int(get_env_var('SCREENSHOT_THUMBNAIL_QUALITY', '70'))
+SCREENSHOT_MEMORY_BUDGET_MB = int(get_env_var('SCREENSHOT_MEMORY_BUDGET_MB', '8'))
+SCREENSHOT_DISK_BUDGET_MB = int(get_env_var('SCREENSHOT_DISK_BUDGET_MB', '512'))
+SCREENSHOT_DEDUP_DISTANCE = int(get_env_var('SCREENSHOT_DEDUP_DISTANCE', '0'))
+SCREENSHOT_CAPTURE_POLICY = get_env_var('SCREENSHOT_CAPTURE_POLICY', 'adaptive')  # adaptive, viewport or full_page
+SCREENSHOT_CAPTURE_AT = get_env_var('SCREENSHOT_CAPTURE_AT', 'both')  # both (step start and end) or end
+SCREENSHOT_DOM_CHANGE_THRESHOLD = float(get_env_var('SCREENSHOT_DOM_CHANGE_THRESHOLD', '0.3'))  # relative change for a full-page capture
+
+# --------- Live Update Configuration ---------
+LIVE_UPDATE_INTERVAL = float(get_env_var('LIVE_UPDATE_INTERVAL', '0.5'))  # seconds between fragment refreshes
+
+# --------- Job Runner Configuration ---------
+JOB_CONCURRENCY = int(get_env_var('JOB_CONCURRENCY', str(BROWSER_POOL_SIZE)))
+JOB_QUEUE_SIZE = int(get_env_var('JOB_QUEUE_SIZE', '20'))
+JOB_TIMEOUT = float(get_env_var('JOB_TIMEOUT', '900'))  # seconds per workflow run
+JOB_HISTORY_SIZE = int(get_env_var('JOB_HISTORY_SIZE', '200'))
+
+# --------- Worker Fleet Configuration ---------
+DATA_DIR = get_env_var('DATA_DIR', 'data')
+WORKER_MODE = get_env_var('WORKER_MODE', 'thread')  # 'thread' (in-process job runner) or 'process'
+WORKER_COUNT = int(get_env_var('WORKER_COUNT', str(os.cpu_count() or 2)))
+WORKER_QUEUE_PATH = get_env_var('WORKER_QUEUE_PATH', os.path.join(DATA_DIR, 'worker_queue.db'))
+WORKER_POLL_INTERVAL = float(get_env_var('WORKER_POLL_INTERVAL', '0.2'))
+WORKER_EVENT_RETENTION = float(get_env_var('WORKER_EVENT_RETENTION', '86400'))  # seconds
+WORKER_HEARTBEAT_INTERVAL = float(get_env_var('WORKER_HEARTBEAT_INTERVAL', '5'))  # seconds between running-job heartbeats
+WORKER_HEARTBEAT_TIMEOUT = float(get_env_var('WORKER_HEARTBEAT_TIMEOUT', '60'))  # seconds without one before a job is orphaned
+BROWSER_SINGLE_PROCESS = get_env_var('BROWSER_SINGLE_PROCESS', 'True').lower() == 'true'
+WORKER_BROWSER_SINGLE_PROCESS = get_env_var('WORKER_BROWSER_SINGLE_PROCESS', 'False').lower() == 'true'
+
+# --------- Plan Library Configuration ---------
+PLAN_LIBRARY_ENABLED = get_env_var('PLAN_LIBRARY_ENABLED', 'True').lower() == 'true'
+PLAN_LIBRARY_PATH = get_env_var('PLAN_LIBRARY_PATH', os.path.join(DATA_DIR, 'plans.db'))
+PLAN_LIBRARY_MAX_ENTRIES = int(get_env_var('PLAN_LIBRARY_MAX_ENTRIES', '500'))
+PLAN_MATCH_THRESHOLD = float(get_env_var('PLAN_MATCH_THRESHOLD', '0.8'))  # word overlap (Jaccard) for a fuzzy match
+
+# --------- Batch Configuration ---------
+BATCH_CONCURRENCY = int(get_env_var('BATCH_CONCURRENCY', str(BROWSER_POOL_SIZE)))
+BATCH_DIR = get_env_var('BATCH_DIR', os.path.join(DATA_DIR, 'batches'))
+BATCH_REFRESH_INTERVAL = float(get_env_var('BATCH_REFRESH_INTERVAL', '2'))  # seconds between progress refreshes
+
+# --------- LLM Gateway Configuration ---------
+LLM_MAX_CONNECTIONS = int(get_env_var('LLM_MAX_CONNECTIONS', '20'))
+LLM_MAX_KEEPALIVE = int(get_env_var('LLM_MAX_KEEPALIVE', '10'))
+LLM_REQUEST_TIMEOUT = float(get_env_var('LLM_REQUEST_TIMEOUT', '60'))  # seconds
+LLM_RPM_LIMIT = float(get_env_var('LLM_RPM_LIMIT', '500'))  # requests per minute of the OpenAI tier
+LLM_TPM_LIMIT = float(get_env_var('LLM_TPM_LIMIT', '30000'))  # tokens per minute of the OpenAI tier
+LLM_RATE_SHARE = float(get_env_var('LLM_RATE_SHARE', '1'))  # fraction of the limits this process may use
+LLM_MAX_RETRIES = int(get_env_var('LLM_MAX_RETRIES', '5'))
+LLM_BACKOFF_BASE = float(get_env_var('LLM_BACKOFF_BASE', '0.5'))  # seconds
+LLM_BACKOFF_MAX = float(get_env_var('LLM_BACKOFF_MAX', '30'))  # seconds
+
+# --------- LLM Cache Configuration ---------
+LLM_CACHE_ENABLED = get_env_var('LLM_CACHE_ENABLED', 'True').lower() == 'true'
+LLM_CACHE_PATH = get_env_var('LLM_CACHE_PATH', os.path.join(DATA_DIR, 'llm_cache.db'))
+LLM_CACHE_TTL = float(get_env_var('LLM_CACHE_TTL', str(7 * 24 * 3600)))  # seconds
+LLM_CACHE_MAX_ENTRIES = int(get_env_var('LLM_CACHE_MAX_ENTRIES', '1000'))
+
+# --------- Instrumentation Configuration ---------
+TRACE_ENABLED = get_env_var('TRACE_ENABLED', 'True').lower() == 'true'
+TRACE_DIR = get_env_var('TRACE_DIR', os.path.join(DATA_DIR, 'traces'))
+METRICS_HISTORY_RUNS = int(get_env_var('METRICS_HISTORY_RUNS', '50'))
+
+# --------- Auth State Configuration ---------
+AUTH_STATE_ENABLED = get_env_var('AUTH_STATE_ENABLED', 'True').lower() == 'true'
+AUTH_STATE_DIR = get_env_var('AUTH_STATE_DIR', os.path.join(DATA_DIR, 'auth_state'))
+AUTH_STATE_SECRET = get_env_var('AUTH_STATE_SECRET', '')  # optional extra key material for encryption
+AUTH_STATE_MAX_AGE = int(get_env_var('AUTH_STATE_MAX_AGE', str(7 * 24 * 3600)))  # seconds
+AUTH_STATE_DOMAINS = tuple(get_env_var('AUTH_STATE_DOMAINS', 'screener.in').split(','))
+AUTH_STATE_KDF_ITERATIONS = int(get_env_var('AUTH_STATE_KDF_ITERATIONS', '200000'))
+
+# --------- Network Profile Configuration ---------
+NETWORK_PROFILE_ENABLED = get_env_var('NETWORK_PROFILE_ENABLED', 'True').lower() == 'true'
+NETWORK_BLOCKED_RESOURCE_TYPES = tuple(filter(None, get_env_var('NETWORK_BLOCKED_RESOURCE_TYPES', 'Font,Media').split(',')))  # CDP resource types
+NETWORK_BLOCKED_DOMAINS = tuple(filter(None, get_env_var(
+    'NETWORK_BLOCKED_DOMAINS',
+    'google-analytics.com,googletagmanager.com,doubleclick.net,googlesyndication.com,googleadservices.com,'
+    'facebook.net,connect.facebook.net,hotjar.com,clarity.ms,scorecardresearch.com,quantserve.com,'
+    'adservice.google.com,amazon-adsystem.com,taboola.com,outbrain.com'
+).split(',')))
+NETWORK_ALLOWED_DOMAINS = tuple(filter(None, get_env_var('NETWORK_ALLOWED_DOMAINS', 'screener.in').split(',')))  # first-party domains
+NETWORK_BLOCK_THIRD_PARTY = get_env_var('NETWORK_BLOCK_THIRD_PARTY', 'False').lower() == 'true'
+NETWORK_IMAGE_MAX_WIDTH = int(get_env_var('NETWORK_IMAGE_MAX_WIDTH', '0'))  # 0 disables image downscaling
+
+# --------- Record/Replay Configuration ---------
+REPLAY_MODE = get_env_var('REPLAY_MODE', '')  # '' (live), 'record' or 'replay'
+REPLAY_DIR = get_env_var('REPLAY_DIR', os.path.join(DATA_DIR, 'cassettes'))
+REPLAY_CASSETTE = get_env_var('REPLAY_CASSETTE', 'default')
+
+# --------- Thought Log Configuration ---------
+THOUGHT_LOG_MAX_ENTRIES = int(get_env_var('THOUGHT_LOG_MAX_ENTRIES', '200'))  # entries kept in memory per run
+THOUGHT_LOG_PAGE_SIZE = int(get_env_var('THOUGHT_LOG_PAGE_SIZE', '20'))
+THOUGHT_LOG_SPILL = get_env_var('THOUGHT_LOG_SPILL', 'True').lower() == 'true'  # keep evicted entries on disk
+THOUGHT_LOG_DIR = get_env_var('THOUGHT_LOG_DIR', os.path.join(DATA_DIR, 'thoughts'))
+THOUGHT_LOG_RETENTION = float(get_env_var('THOUGHT_LOG_RETENTION', '86400'))  # seconds spill files are kept
+
+# --------- Direct Query Configuration ---------
+DIRECT_QUERY_ENABLED = get_env_var('DIRECT_QUERY_ENABLED', 'True').lower() == 'true'  # run filter-only workflows without the agent
+DIRECT_QUERY_URL = get_env_var('DIRECT_QUERY_URL', 'https://www.screener.in/screen/raw/')
+DIRECT_QUERY_TIMEOUT = float(get_env_var('DIRECT_QUERY_TIMEOUT', '30'))  # seconds per page load
+DIRECT_QUERY_RESULT_LIMIT = int(get_env_var('DIRECT_QUERY_RESULT_LIMIT', '50'))  # rows on the results page
+
+# --------- Result Table Configuration ---------
+RESULT_TABLE_DIR = get_env_var('RESULT_TABLE_DIR', os.path.join(DATA_DIR, 'results'))
+RESULT_TABLE_RETENTION = float(get_env_var('RESULT_TABLE_RETENTION', str(7 * 24 * 3600)))  # seconds tables are kept
+RESULT_TABLE_MAX_PAGES = int(get_env_var('RESULT_TABLE_MAX_PAGES', '20'))  # results pages read per run
+
+# --------- Run History Configuration ---------
+RUN_STORE_ENABLED = get_env_var('RUN_STORE_ENABLED', 'True').lower() == 'true'
+RUN_STORE_PATH = get_env_var('RUN_STORE_PATH', os.path.join(DATA_DIR, 'runs.db'))
+RUN_STORE_RETENTION = float(get_env_var('RUN_STORE_RETENTION', str(90 * 24 * 3600)))  # seconds; 0 keeps runs forever
+RUN_HISTORY_PAGE_SIZE = int(get_env_var('RUN_HISTORY_PAGE_SIZE', '20'))  # runs listed in the history view
+
+# --------- Result Cache Configuration ---------
+RESULT_CACHE_ENABLED = get_env_var('RESULT_CACHE_ENABLED', 'True').lower() == 'true'
+RESULT_CACHE_MAX_AGE = int(get_env_var('RESULT_CACHE_MAX_AGE', '900'))  # default freshness window in seconds; 0 always runs
+RESULT_CACHE_WINDOWS = (0, 300, 900, 3600, 4 * 3600, 24 * 3600)  # freshness windows offered in the UI, in seconds
+RESULT_CACHE_SECRET_PATH = get_env_var('RESULT_CACHE_SECRET_PATH', os.path.join(DATA_DIR, 'result_cache.key'))
+
+# --------- Prompt Compaction Configuration ---------
+PROMPT_COMPACTION_ENABLED = get_env_var('PROMPT_COMPACTION_ENABLED', 'True').lower() == 'true'
+PROMPT_TOKEN_BUDGET = int(get_env_var('PROMPT_TOKEN_BUDGET', '300'))  # tokens allowed for the execution prompt
+PROMPT_TOKENIZER = get_env_var('PROMPT_TOKENIZER', 'tiktoken')  # tiktoken, or estimate to count without it
+PROMPT_INPUT_COST_PER_MTOK = float(get_env_var('PROMPT_INPUT_COST_PER_MTOK', '2.50'))  # USD per million input tokens
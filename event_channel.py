@@ -0,0 +1,149 @@
+# Run event channels for the Workflow Automator
+#
+# A workflow run executes off the Streamlit script thread and publishes its
+# progress here. The UI reads new events incrementally with a cursor.
+
+import statistics
+import threading
+import time
+from collections import deque
+
+# Event kinds published by a workflow run
+EVENT_STARTED = 'started'
+EVENT_STEP_START = 'step_start'
+EVENT_STEP_END = 'step_end'
+EVENT_SCREENSHOT = 'screenshot'
+EVENT_COMPLETED = 'completed'
+EVENT_ERROR = 'error'
+
+# Step events whose publish-to-render delay is tracked as step-to-screen latency
+LATENCY_EVENT_KINDS = (EVENT_STEP_START, EVENT_STEP_END, EVENT_SCREENSHOT)
+
+
+class RunEvent:
+    """A single event published by a workflow run."""
+
+    def __init__(self, seq, kind, data):
+        self.seq = seq
+        self.kind = kind
+        self.data = data
+        self.ts = time.time()
+
+    def to_dict(self):
+        """Serializable form of this event."""
+        return {'seq': self.seq, 'kind': self.kind, 'ts': self.ts, 'data': self.data}
+
+
+class EventChannel:
+    """Thread-safe, append-only event log for one workflow run."""
+
+    def __init__(self, run_id, latency_window=500):
+        self.run_id = run_id
+        self.closed = False
+        self._events = []
+        self._condition = threading.Condition()
+        self._latencies = deque(maxlen=latency_window)
+
+    def publish(self, kind, **data):
+        """Append an event and wake up any waiting readers."""
+        with self._condition:
+            event = RunEvent(len(self._events) + 1, kind, data)
+            self._events.append(event)
+            if kind in (EVENT_COMPLETED, EVENT_ERROR):
+                self.closed = True
+            self._condition.notify_all()
+        return event
+
+    def read_since(self, cursor=0):
+        """Events with a sequence number greater than `cursor`."""
+        with self._condition:
+            return self._events[cursor:]
+
+    def wait(self, cursor=0, timeout=None):
+        """Block until events newer than `cursor` exist or the channel closes."""
+        with self._condition:
+            self._condition.wait_for(lambda: len(self._events) > cursor or self.closed, timeout)
+            return self._events[cursor:]
+
+    def record_render(self, events):
+        """Record step-to-screen latency for events that were just rendered."""
+        now = time.time()
+        with self._condition:
+            for event in events:
+                if event.kind in LATENCY_EVENT_KINDS:
+                    self._latencies.append(now - event.ts)
+
+    def latency_stats(self):
+        """Median and p95 step-to-screen latency in seconds."""
+        with self._condition:
+            samples = sorted(self._latencies)
+        if not samples:
+            return {'count': 0, 'median': None, 'p95': None}
+        return {
+            'count': len(samples),
+            'median': statistics.median(samples),
+            'p95': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        }
+
+
+_channels = {}
+# Sessions following each run; a run's channel is forgotten when the last one drops it
+_channel_refs = {}
+_channels_lock = threading.Lock()
+
+
+def create_channel(run_id):
+    """Create and register the event channel for a run."""
+    channel = EventChannel(run_id)
+    with _channels_lock:
+        _channels[run_id] = channel
+        _channel_refs[run_id] = 1
+    return channel
+
+
+def register_channel(channel):
+    """Register an existing channel, e.g. one backed by the worker queue."""
+    with _channels_lock:
+        _channels[channel.run_id] = channel
+        _channel_refs[channel.run_id] = 1
+    return channel
+
+
+def retain_channel(run_id):
+    """Follow an already registered run from another session; returns its channel, or None."""
+    with _channels_lock:
+        channel = _channels.get(run_id)
+        if channel is not None:
+            _channel_refs[run_id] = _channel_refs.get(run_id, 0) + 1
+        return channel
+
+
+def get_channel(run_id):
+    """Look up the event channel for a run, or None."""
+    with _channels_lock:
+        return _channels.get(run_id)
+
+
+def leave_channel(run_id):
+    """Stop following a run that other sessions still follow.
+
+    Returns False, keeping the reference, when no other session follows the
+    run, so the caller can cancel it instead.
+    """
+    with _channels_lock:
+        refs = _channel_refs.get(run_id, 1)
+        if refs <= 1:
+            return False
+        _channel_refs[run_id] = refs - 1
+        return True
+
+
+def drop_channel(run_id):
+    """Stop following a run; its channel is forgotten once no session follows it."""
+    with _channels_lock:
+        refs = _channel_refs.get(run_id, 1) - 1
+        if refs > 0:
+            _channel_refs[run_id] = refs
+            return
+        _channel_refs.pop(run_id, None)
+        _channels.pop(run_id, None)
@@ -0,0 +1,249 @@
+# Run instrumentation for the Workflow Automator
+#
+# Per-step timing and resource records for workflow runs. Each record goes to
+# a JSONL trace file (one per run) and to an in-process metrics registry that
+# backs the debug panel.
+
+import contextvars
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from config import TRACE_ENABLED, TRACE_DIR, METRICS_HISTORY_RUNS
+
+# Tracer of the run executing in the current task; LLM calls report to it
+_current_tracer = contextvars.ContextVar('current_tracer', default=None)
+
+# Timing of the page's last navigation, in milliseconds
+NAVIGATION_TIMING_SCRIPT = """
+(() => {
+    const nav = performance.getEntriesByType('navigation')[0];
+    return nav ? {url: location.href, duration: nav.duration} : {url: location.href, duration: null};
+})()
+"""
+
+# Per-step durations that make up a step's wall time, in display order
+TIME_COMPONENTS = ('llm_s', 'screenshot_capture_s', 'screenshot_decode_s', 'navigation_s')
+
+
+def current_tracer():
+    """The tracer of the run executing in the current task, or None."""
+    return _current_tracer.get()
+
+
+class RunTracer:
+    """Collects per-step timing and resource records for one workflow run."""
+
+    def __init__(self, run_id, trace_dir=TRACE_DIR, registry=None, enabled=TRACE_ENABLED):
+        self.run_id = run_id
+        self.registry = registry or get_metrics_registry()
+        self.trace_path = Path(trace_dir) / f"{run_id}.jsonl" if enabled else None
+        self.last_url = None
+        self._step = None
+        self._step_t0 = None
+        self._lock = threading.Lock()
+        self._token = None
+
+        if self.trace_path:
+            self.trace_path.parent.mkdir(parents=True, exist_ok=True)
+        self.registry.start_run(run_id)
+
+    def activate(self):
+        """Make this tracer current for the calling task and the tasks it creates."""
+        self._token = _current_tracer.set(self)
+        return self
+
+    def deactivate(self):
+        """Undo `activate`."""
+        if self._token is not None:
+            _current_tracer.reset(self._token)
+            self._token = None
+
+    def start_step(self, step, **fields):
+        """Begin a step record."""
+        with self._lock:
+            self._step = {
+                'run_id': self.run_id,
+                'step': step,
+                'started_at': time.time(),
+                'wall_s': None,
+                'llm_s': 0.0,
+                'llm_calls': 0,
+                'prompt_tokens': 0,
+                'completion_tokens': 0,
+                'screenshot_capture_s': 0.0,
+                'screenshot_decode_s': 0.0,
+                'screenshot_bytes': 0,
+                'navigation_s': None,
+                'url': None,
+                'browser_rss_mb': None,
+                'browser_cpu_s': None,
+                'requests': 0,
+                'requests_blocked': 0,
+                'requests_blocked_by_type': {},
+                'downscaled_bytes_saved': 0,
+            }
+            self._step.update(fields)
+            self._step_t0 = time.perf_counter()
+
+    def annotate(self, **fields):
+        """Set descriptive fields on the current step; ignored between steps."""
+        with self._lock:
+            if self._step is not None:
+                self._step.update(fields)
+
+    def add(self, metric, value):
+        """Add to a numeric metric of the current step; ignored between steps."""
+        with self._lock:
+            if self._step is not None and value is not None:
+                self._step[metric] = (self._step.get(metric) or 0) + value
+
+    def record_llm_call(self, seconds, usage=None):
+        """Record one LLM call against the current step."""
+        self.add('llm_s', seconds)
+        self.add('llm_calls', 1)
+        if usage is not None:
+            self.add('prompt_tokens', getattr(usage, 'prompt_tokens', 0) or 0)
+            self.add('completion_tokens', getattr(usage, 'completion_tokens', 0) or 0)
+
+    def end_step(self, **fields):
+        """Finish the current step, write it to the trace and return the record."""
+        with self._lock:
+            if self._step is None:
+                return None
+            record = self._step
+            record.update(fields)
+            record['wall_s'] = time.perf_counter() - self._step_t0
+            self._step = None
+
+        if self.trace_path:
+            with open(self.trace_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+        self.registry.record_step(self.run_id, record)
+        return record
+
+    def finish(self, status):
+        """Close any open step and mark the run finished in the registry."""
+        self.end_step()
+        self.registry.finish_run(self.run_id, status)
+
+
+class InstrumentedLLM:
+    """Wraps a browser-use chat model to time its calls and count tokens per step."""
+
+    def __init__(self, llm):
+        self._llm = llm
+
+    def __getattr__(self, name):
+        return getattr(self._llm, name)
+
+    async def ainvoke(self, messages, output_format=None, **kwargs):
+        start = time.perf_counter()
+        result = await self._llm.ainvoke(messages, output_format, **kwargs)
+        tracer = current_tracer()
+        if tracer is not None:
+            tracer.record_llm_call(time.perf_counter() - start, getattr(result, 'usage', None))
+        return result
+
+
+async def navigation_timing(browser_session):
+    """URL and duration in seconds of the current page's last navigation."""
+    cdp_session = await browser_session.get_or_create_cdp_session(focus=False)
+    result = await cdp_session.cdp_client.send.Runtime.evaluate(
+        params={'expression': NAVIGATION_TIMING_SCRIPT, 'returnByValue': True},
+        session_id=cdp_session.session_id
+    )
+    value = result.get('result', {}).get('value') or {}
+    duration = value.get('duration')
+    return value.get('url'), duration / 1000 if duration is not None else None
+
+
+class MetricsRegistry:
+    """In-process store of step records for recent runs."""
+
+    def __init__(self, max_runs=METRICS_HISTORY_RUNS):
+        self.max_runs = max_runs
+        self._runs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start_run(self, run_id):
+        with self._lock:
+            self._runs[run_id] = {'run_id': run_id, 'status': 'running', 'started_at': time.time(),
+                                  'finished_at': None, 'steps': []}
+            while len(self._runs) > self.max_runs:
+                self._runs.popitem(last=False)
+
+    def record_step(self, run_id, record):
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is not None:
+                run['steps'].append(record)
+
+    def finish_run(self, run_id, status):
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is not None:
+                run['status'] = status
+                run['finished_at'] = time.time()
+
+    def get_steps(self, run_id, trace_dir=TRACE_DIR):
+        """Step records of a run, read from its trace file if it ran in another process."""
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is not None:
+                return list(run['steps'])
+        return load_trace(run_id, trace_dir)
+
+    def slowest_steps(self, run_id=None, limit=5):
+        """The slowest steps of one run, or across all recent runs."""
+        if run_id is not None:
+            steps = self.get_steps(run_id)
+        else:
+            with self._lock:
+                steps = [step for run in self._runs.values() for step in run['steps']]
+        return sorted(steps, key=lambda step: step['wall_s'] or 0, reverse=True)[:limit]
+
+
+def load_trace(run_id, trace_dir=TRACE_DIR):
+    """Read a run's step records from its JSONL trace file."""
+    path = Path(trace_dir) / f"{run_id}.jsonl"
+    if not path.exists():
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize_steps(steps):
+    """Where the time went in a run: totals per component, tokens and peak browser memory."""
+    summary = {'steps': len(steps), 'wall_s': sum(step['wall_s'] or 0 for step in steps)}
+    for component in TIME_COMPONENTS:
+        summary[component] = sum(step.get(component) or 0 for step in steps)
+    summary['other_s'] = max(0.0, summary['wall_s'] - sum(summary[component] for component in TIME_COMPONENTS))
+    summary['prompt_tokens'] = sum(step.get('prompt_tokens') or 0 for step in steps)
+    summary['completion_tokens'] = sum(step.get('completion_tokens') or 0 for step in steps)
+    for counter in ('requests', 'requests_blocked', 'downscaled_bytes_saved'):
+        summary[counter] = sum(step.get(counter) or 0 for step in steps)
+    blocked_by_type = {}
+    for step in steps:
+        for resource_type, count in (step.get('requests_blocked_by_type') or {}).items():
+            blocked_by_type[resource_type] = blocked_by_type.get(resource_type, 0) + count
+    summary['requests_blocked_by_type'] = blocked_by_type
+    rss = [step['browser_rss_mb'] for step in steps if step.get('browser_rss_mb') is not None]
+    summary['peak_browser_rss_mb'] = max(rss) if rss else None
+    return summary
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics_registry():
+    """Get the process-wide metrics registry."""
+    global _registry
+
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+        return _registry
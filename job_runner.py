@@ -0,0 +1,223 @@
+# Background job runner for the Workflow Automator
+#
+# Workflows run as jobs on one persistent asyncio loop in a worker thread.
+# The Streamlit script thread only submits jobs and reads their status.
+
+import asyncio
+import threading
+import time
+import uuid
+
+from config import JOB_CONCURRENCY, JOB_QUEUE_SIZE, JOB_TIMEOUT, JOB_HISTORY_SIZE
+
+# Job states
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+JOB_TIMED_OUT = 'timed_out'
+
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED, JOB_TIMED_OUT)
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class Job:
+    """A unit of work submitted to the job runner."""
+
+    def __init__(self, job_id, name, coro_factory, timeout, on_finish):
+        self.id = job_id
+        self.name = name
+        self.coro_factory = coro_factory
+        self.timeout = timeout
+        self.on_finish = on_finish
+
+        self.status = JOB_QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self._task = None
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def to_dict(self):
+        """Status snapshot of this job."""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error,
+        }
+
+
+class JobRunner:
+    """Runs jobs on a persistent event loop with a bounded queue and concurrency limit."""
+
+    def __init__(self, concurrency=JOB_CONCURRENCY, max_queue=JOB_QUEUE_SIZE,
+                 default_timeout=JOB_TIMEOUT, history_size=JOB_HISTORY_SIZE):
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max_queue
+        self.default_timeout = default_timeout
+        self.history_size = history_size
+
+        self._jobs = {}
+        self._queued = 0
+        self._lock = threading.Lock()
+
+        self.loop = asyncio.new_event_loop()
+        self._queue = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name='job-runner', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        """Run the event loop with `concurrency` consumer tasks."""
+        asyncio.set_event_loop(self.loop)
+        self._queue = asyncio.Queue()
+        for i in range(self.concurrency):
+            self.loop.create_task(self._worker(), name=f'job-worker-{i}')
+        self.loop.call_soon(self._ready.set)
+        self.loop.run_forever()
+
+    def submit(self, coro_factory, name=None, timeout=None, job_id=None, on_finish=None):
+        """Queue a job and return its id.
+
+        `coro_factory` is called on the runner loop to create the coroutine.
+        `on_finish(job)` is called on the runner loop once the job finishes.
+        """
+        job = Job(job_id or uuid.uuid4().hex, name or 'job', coro_factory,
+                  timeout if timeout is not None else self.default_timeout, on_finish)
+
+        with self._lock:
+            if self._queued >= self.max_queue:
+                raise JobQueueFull(f"Job queue is full ({self.max_queue} waiting)")
+            self._queued += 1
+            self._jobs[job.id] = job
+            self._prune_history()
+
+        self.loop.call_soon_threadsafe(self._queue.put_nowait, job)
+        return job.id
+
+    def run_coroutine(self, coro):
+        """Schedule an ad-hoc coroutine on the runner loop, bypassing the queue."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def status(self, job_id):
+        """Get a job by id, or None if unknown."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def queue_position(self, job_id):
+        """1-based position of a queued job, or 0 if it is not waiting."""
+        with self._lock:
+            queued = [job for job in self._jobs.values() if job.status == JOB_QUEUED]
+        queued.sort(key=lambda job: job.created_at)
+        for position, job in enumerate(queued, 1):
+            if job.id == job_id:
+                return position
+        return 0
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job. Returns False if it already finished."""
+        job = self.status(job_id)
+        if job is None or job.finished:
+            return False
+
+        with self._lock:
+            if job.status == JOB_QUEUED:
+                self._queued -= 1
+                job.status = JOB_CANCELLED
+                job.finished_at = time.time()
+                self.loop.call_soon_threadsafe(self._notify_finished, job)
+                return True
+
+        # Runs on the loop after the worker has attached the job's task
+        self.loop.call_soon_threadsafe(self._cancel_running, job)
+        return True
+
+    def _cancel_running(self, job):
+        """Cancel a running job's task from the runner loop."""
+        if job._task is not None:
+            job._task.cancel()
+
+    def get_stats(self):
+        """Counts of jobs by state."""
+        with self._lock:
+            stats = {'concurrency': self.concurrency, 'max_queue': self.max_queue}
+            for job in self._jobs.values():
+                stats[job.status] = stats.get(job.status, 0) + 1
+            return stats
+
+    async def _worker(self):
+        """Consume jobs from the queue one at a time."""
+        while True:
+            job = await self._queue.get()
+            with self._lock:
+                if job.status != JOB_QUEUED:
+                    continue
+                self._queued -= 1
+                job.status = JOB_RUNNING
+                job.started_at = time.time()
+
+            try:
+                # A factory that raises fails the job like a coroutine that raises
+                job._task = asyncio.ensure_future(job.coro_factory())
+                job.result = await asyncio.wait_for(job._task, timeout=job.timeout)
+                job.status = JOB_SUCCEEDED
+            except asyncio.TimeoutError:
+                job.status = JOB_TIMED_OUT
+                job.error = f"Timed out after {job.timeout:.0f}s"
+            except asyncio.CancelledError:
+                job.status = JOB_CANCELLED
+                job.error = "Cancelled"
+            except Exception as e:
+                job.status = JOB_FAILED
+                job.error = str(e)
+            finally:
+                job.finished_at = time.time()
+                job._task = None
+                self._notify_finished(job)
+
+    def _notify_finished(self, job):
+        """Call a finished job's callback, logging any error it raises."""
+        if job.on_finish is None:
+            return
+        try:
+            job.on_finish(job)
+        except Exception as e:
+            print(f"⚠️ Job {job.id} finish callback failed: {e}")
+
+    def _prune_history(self):
+        """Forget the oldest finished jobs beyond the history size."""
+        finished = [job for job in self._jobs.values() if job.finished]
+        excess = len(finished) - self.history_size
+        if excess <= 0:
+            return
+        finished.sort(key=lambda job: job.finished_at or 0)
+        for job in finished[:excess]:
+            del self._jobs[job.id]
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+    """Get the process-wide job runner, starting it on first use."""
+    global _runner
+
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
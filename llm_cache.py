@@ -0,0 +1,162 @@
+# LLM response cache for the Workflow Automator
+#
+# Content-addressed cache of LLM responses in a local SQLite database.
+# Keys cover the model, the prompt template text and the normalized input,
+# so editing a template in prompts.py invalidates its old entries.
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+from config import LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access);
+"""
+
+
+def normalize_prompt(text):
+    """Normalize user input so trivially different requests share a cache entry."""
+    text = unicodedata.normalize('NFKC', text or '')
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def template_version(template):
+    """Short content hash identifying a prompt template."""
+    return hashlib.sha256(template.encode('utf-8')).hexdigest()[:12]
+
+
+class LLMCache:
+    """SQLite-backed LLM response cache with TTL expiry and LRU eviction."""
+
+    def __init__(self, db_path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES,
+                 enabled=LLM_CACHE_ENABLED):
+        self.db_path = str(db_path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0}
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+
+        if self.enabled:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = self._connect()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        """Per-thread connection in autocommit mode."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, stat):
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    @staticmethod
+    def make_key(namespace, model, template, payload):
+        """Cache key for a call: namespace, model, template version and normalized payload."""
+        material = json.dumps(
+            [namespace, model, template_version(template), payload],
+            sort_keys=True, ensure_ascii=False
+        )
+        return f"{namespace}:{hashlib.sha256(material.encode('utf-8')).hexdigest()}"
+
+    def get(self, key):
+        """Cached response text for a key, or None on a miss."""
+        if not self.enabled:
+            return None
+
+        conn = self._connect()
+        row = conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None:
+            self._count('misses')
+            return None
+        if now - row[1] > self.ttl:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._count('expired')
+            self._count('misses')
+            return None
+
+        conn.execute("UPDATE responses SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        self._count('hits')
+        return row[0]
+
+    def set(self, key, value):
+        """Store a response and evict the least recently used entries over the limit."""
+        if not self.enabled:
+            return
+
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, namespace, value, created_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, key.split(':', 1)[0], value, now, now)
+        )
+        excess = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                (excess,)
+            )
+            with self._stats_lock:
+                self.stats['evicted'] += excess
+
+    def clear(self):
+        """Remove every cached response."""
+        if self.enabled:
+            self._connect().execute("DELETE FROM responses")
+
+    def get_metrics(self):
+        """Hit-rate counters and the number of stored entries."""
+        with self._stats_lock:
+            metrics = dict(self.stats)
+        lookups = metrics['hits'] + metrics['misses']
+        metrics['hit_rate'] = metrics['hits'] / lookups if lookups else 0.0
+        metrics['entries'] = (
+            self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0] if self.enabled else 0
+        )
+        return metrics
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Get the process-wide LLM response cache."""
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
+
+
+def format_cache_metrics(metrics):
+    """Format LLM cache metrics as a short status line."""
+    return (
+        f"hits={metrics['hits']} misses={metrics['misses']} hit_rate={metrics['hit_rate']:.0%} "
+        f"entries={metrics['entries']} evicted={metrics['evicted']} expired={metrics['expired']}"
+    )
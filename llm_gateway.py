@@ -0,0 +1,399 @@
+# Shared LLM gateway for the Workflow Automator
+#
+# Every OpenAI call, from the step breakdown and combination (langchain) and
+# from the browser agent (browser-use), goes through one gateway: pooled HTTP
+# connections, a process-wide request and token budget sized to the OpenAI
+# tier, and retries with jittered exponential backoff on rate limits and
+# transient errors.
+
+import asyncio
+import random
+import statistics
+import threading
+import time
+from collections import deque
+
+from config import (
+    LLM_MODEL,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE,
+    LLM_REQUEST_TIMEOUT,
+    LLM_RPM_LIMIT,
+    LLM_TPM_LIMIT,
+    LLM_RATE_SHARE,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE,
+    LLM_BACKOFF_MAX,
+)
+
+# Token estimates used to reserve budget before a call's real usage is known
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 800
+COMPLETION_TOKENS = 500
+
+# Latency samples kept for the p50/p95 metrics
+LATENCY_SAMPLES = 500
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `per_minute` tokens a minute.
+
+    `reserve` takes the tokens right away and returns how long the caller must
+    wait for them, so concurrent callers queue up in order instead of polling.
+    """
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount):
+        """Take `amount` tokens; returns the seconds until they are available."""
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def refund(self, amount):
+        """Give back tokens reserved but not used; a negative amount takes more."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+def estimate_tokens(messages):
+    """Rough prompt size of a langchain prompt or a list of browser-use messages."""
+    if isinstance(messages, str):
+        return len(messages) // CHARS_PER_TOKEN
+
+    tokens = 0
+    for message in messages:
+        content = getattr(message, 'content', message)
+        if isinstance(content, str):
+            tokens += len(content) // CHARS_PER_TOKEN
+            continue
+        for part in content or []:
+            text = getattr(part, 'text', None)
+            tokens += len(text) // CHARS_PER_TOKEN if isinstance(text, str) else IMAGE_TOKENS
+    return tokens
+
+
+def _status_code(error):
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status
+
+
+def is_retryable(error):
+    """Whether a failed call may succeed if repeated: rate limits, timeouts and server errors."""
+    import openai
+
+    for cause in (error, error.__cause__):
+        if cause is None:
+            continue
+        # An exhausted quota is a 429 too, but waiting will not fix it
+        if getattr(cause, 'code', None) == 'insufficient_quota':
+            return False
+        if isinstance(cause, openai.APIConnectionError):
+            return True
+        status = _status_code(cause)
+        if status == 429 or (status is not None and status >= 500):
+            return True
+    return False
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait before retrying, or None."""
+    for cause in (error, error.__cause__):
+        headers = getattr(getattr(cause, 'response', None), 'headers', None)
+        if not headers:
+            continue
+        try:
+            if headers.get('retry-after-ms'):
+                return float(headers['retry-after-ms']) / 1000
+            if headers.get('retry-after'):
+                return float(headers['retry-after'])
+        except ValueError:
+            continue
+    return None
+
+
+class LLMGateway:
+    """Connection pools, rate limits, retries and metrics shared by every LLM call in the process."""
+
+    def __init__(self, rpm=LLM_RPM_LIMIT, tpm=LLM_TPM_LIMIT, share=LLM_RATE_SHARE, max_retries=LLM_MAX_RETRIES,
+                 backoff_base=LLM_BACKOFF_BASE, backoff_max=LLM_BACKOFF_MAX):
+        self.requests = TokenBucket(max(1, rpm * share))
+        self.tokens = TokenBucket(max(1, tpm * share))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = {
+            'calls': 0,
+            'retries': 0,
+            'failures': 0,
+            'throttled_s': 0.0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+        }
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._stats_lock = threading.Lock()
+        # httpx pools, and the models built on them, belong to the event loop that opened them.
+        # Their connections keep the loop alive, so they are dropped by `close_loop` or once the loop is closed
+        self._http_clients = {}
+        self._loop_models = {}
+        self._clients_lock = threading.Lock()
+
+    def _drop_closed_loops(self):
+        for loop in [loop for loop in self._http_clients.keys() | self._loop_models.keys() if loop.is_closed()]:
+            self._http_clients.pop(loop, None)
+            self._loop_models.pop(loop, None)
+
+    def http_client(self):
+        """Pooled HTTP client for the running event loop."""
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        with self._clients_lock:
+            client = self._http_clients.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_KEEPALIVE),
+                    timeout=LLM_REQUEST_TIMEOUT,
+                )
+                self._http_clients[loop] = client
+            return client
+
+    def loop_model(self, owner, build):
+        """The model `owner` built with `build(http_client)` for the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._clients_lock:
+            model = self._loop_models.get(loop, {}).get(owner)
+        if model is None:
+            with self._clients_lock:
+                self._drop_closed_loops()
+            model = build(self.http_client())
+            with self._clients_lock:
+                model = self._loop_models.setdefault(loop, {}).setdefault(owner, model)
+        return model
+
+    async def close_loop(self):
+        """Close the running event loop's pooled connections and drop its models."""
+        loop = asyncio.get_running_loop()
+        with self._clients_lock:
+            client = self._http_clients.pop(loop, None)
+            self._loop_models.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+    async def _throttle(self, tokens):
+        """Wait until the request and token budgets allow one more call."""
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if wait > 0:
+            with self._stats_lock:
+                self.stats['throttled_s'] += wait
+            await asyncio.sleep(wait)
+
+    def backoff_delay(self, attempt, server_delay=None):
+        """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(delay, server_delay or 0)
+
+    async def _retry_or_raise(self, error, attempt):
+        """Sleep before the next attempt, or re-raise if the error is final."""
+        if attempt >= self.max_retries or not is_retryable(error):
+            with self._stats_lock:
+                self.stats['failures'] += 1
+            raise error
+
+        delay = self.backoff_delay(attempt, retry_after(error))
+        with self._stats_lock:
+            self.stats['retries'] += 1
+        print(f"⚠️ LLM call failed ({error.__class__.__name__}), retry {attempt + 1} in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+    def _record(self, seconds, estimate, prompt_tokens, completion_tokens):
+        """Record a finished call and correct the token budget with its real usage."""
+        if prompt_tokens or completion_tokens:
+            self.tokens.refund(estimate - prompt_tokens - completion_tokens)
+        with self._stats_lock:
+            self.stats['calls'] += 1
+            self.stats['prompt_tokens'] += prompt_tokens
+            self.stats['completion_tokens'] += completion_tokens
+            self._latencies.append(seconds)
+
+    async def call(self, send, prompt_tokens, usage_of):
+        """Run `send()` within the rate limits, retrying transient failures.
+
+        `usage_of(result)` returns the call's (prompt_tokens, completion_tokens).
+        """
+        estimate = prompt_tokens + COMPLETION_TOKENS
+        for attempt in range(self.max_retries + 1):
+            await self._throttle(estimate)
+            start = time.perf_counter()
+            try:
+                result = await send()
+            except Exception as e:
+                await self._retry_or_raise(e, attempt)
+                continue
+            self._record(time.perf_counter() - start, estimate, *usage_of(result))
+            return result
+
+    async def stream(self, open_stream, prompt_tokens, usage_of):
+        """Yield chunks of `open_stream()` within the rate limits.
+
+        A stream is retried only if it fails before its first chunk.
+        """
+        estimate = prompt_tokens + COMPLETION_TOKENS
+        for attempt in range(self.max_retries + 1):
+            await self._throttle(estimate)
+            start = time.perf_counter()
+            usage = (0, 0)
+            started = False
+            try:
+                async for chunk in open_stream():
+                    started = True
+                    chunk_usage = usage_of(chunk)
+                    usage = (usage[0] + chunk_usage[0], usage[1] + chunk_usage[1])
+                    yield chunk
+            except Exception as e:
+                if started:
+                    with self._stats_lock:
+                        self.stats['failures'] += 1
+                    raise
+                await self._retry_or_raise(e, attempt)
+                continue
+            self._record(time.perf_counter() - start, estimate, *usage)
+            return
+
+    def get_metrics(self):
+        """Call, retry and token counters with p50/p95 call latency."""
+        with self._stats_lock:
+            metrics = dict(self.stats)
+            latencies = sorted(self._latencies)
+        metrics['p50_s'] = statistics.median(latencies) if latencies else None
+        metrics['p95_s'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None
+        return metrics
+
+
+class GatewayLLM:
+    """Chat model whose calls go through the LLM gateway.
+
+    Builds one underlying model per event loop from `build(http_client)`, so
+    each loop reuses its own pooled connections until the gateway closes them. Works for both the browser-use
+    `ChatOpenAI` (`ainvoke(messages, output_format)`) and the langchain
+    `ChatOpenAI` (`ainvoke(prompt)` and `astream(prompt)`).
+    """
+
+    def __init__(self, build, gateway=None, langchain=False):
+        self._build = build
+        self._gateway = gateway
+        self._langchain = langchain
+        self._template = None
+        self._lock = threading.Lock()
+
+    @property
+    def gateway(self):
+        return self._gateway or get_llm_gateway()
+
+    def __getattr__(self, name):
+        # Model metadata (model, provider, name...) comes from a model without a pool
+        if name.startswith('_'):
+            raise AttributeError(name)
+        with self._lock:
+            if self._template is None:
+                self._template = self._build(None)
+        return getattr(self._template, name)
+
+    def _model(self):
+        return self.gateway.loop_model(self, self._build)
+
+    async def ainvoke(self, messages, output_format=None, **kwargs):
+        model = self._model()
+        if self._langchain:
+            return await self.gateway.call(
+                lambda: model.ainvoke(messages, **kwargs), estimate_tokens(messages), _langchain_usage
+            )
+        return await self.gateway.call(
+            lambda: model.ainvoke(messages, output_format, **kwargs), estimate_tokens(messages), _browser_use_usage
+        )
+
+    async def astream(self, prompt, **kwargs):
+        model = self._model()
+        async for chunk in self.gateway.stream(
+            lambda: model.astream(prompt, **kwargs), estimate_tokens(prompt), _langchain_usage
+        ):
+            yield chunk
+
+
+def _langchain_usage(message):
+    usage = getattr(message, 'usage_metadata', None) or {}
+    return usage.get('input_tokens', 0), usage.get('output_tokens', 0)
+
+
+def _browser_use_usage(result):
+    usage = getattr(result, 'usage', None)
+    if usage is None:
+        return 0, 0
+    return usage.prompt_tokens or 0, usage.completion_tokens or 0
+
+
+def browser_use_chat_model(model=LLM_MODEL):
+    """A browser-use chat model for the agent, routed through the gateway."""
+    def build(http_client):
+        from browser_use.llm import ChatOpenAI
+        # The gateway retries, so the OpenAI client must not retry on its own
+        return ChatOpenAI(model=model, http_client=http_client, max_retries=0)
+    return GatewayLLM(build)
+
+
+def langchain_chat_model(model=LLM_MODEL):
+    """A langchain chat model for the step breakdown and combination, routed through the gateway."""
+    def build(http_client):
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(model=model, http_async_client=http_client, max_retries=0, stream_usage=True)
+    return GatewayLLM(build, langchain=True)
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway():
+    """Get the process-wide LLM gateway."""
+    global _gateway
+
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway()
+        return _gateway
+
+
+def run_sync(coro):
+    """Run a coroutine on a short-lived event loop, closing the loop's LLM connections before it ends."""
+    async def run():
+        try:
+            return await coro
+        finally:
+            await get_llm_gateway().close_loop()
+    return asyncio.run(run())
+
+
+def format_gateway_metrics(metrics):
+    """Format LLM gateway metrics as a short status line."""
+    latency = (
+        f"p50={metrics['p50_s']:.2f}s p95={metrics['p95_s']:.2f}s" if metrics['p50_s'] is not None else "p50=- p95=-"
+    )
+    return (
+        f"calls={metrics['calls']} retries={metrics['retries']} failures={metrics['failures']} "
+        f"throttled={metrics['throttled_s']:.1f}s tokens={metrics['prompt_tokens'] + metrics['completion_tokens']:,} "
+        f"{latency}"
+    )
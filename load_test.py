@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Load test for the worker fleet.
+
+Submits a batch of jobs to fleets of increasing size and reports throughput
+(jobs per minute) for each worker count.
+
+Usage:
+    python load_test.py --workers 1 2 4 --jobs 40
+    python load_test.py --kind workflow --query "..." --email ... --password ...
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from job_runner import FINISHED_STATES, JOB_SUCCEEDED
+from worker_fleet import WorkerFleet
+
+def run_load(workers, jobs, payload, kind, timeout):
+    """Run `jobs` jobs on a fresh fleet of `workers` processes and measure throughput."""
+    with tempfile.TemporaryDirectory() as tmp:
+        fleet = WorkerFleet(count=workers, db_path=Path(tmp) / 'queue.db', max_queue=jobs)
+        fleet.start()
+        try:
+            start = time.perf_counter()
+            job_ids = [fleet.submit(kind, payload, timeout=timeout) for _ in range(jobs)]
+
+            while True:
+                statuses = [fleet.status(job_id) for job_id in job_ids]
+                if all(status['status'] in FINISHED_STATES for status in statuses):
+                    break
+                time.sleep(0.1)
+            elapsed = time.perf_counter() - start
+        finally:
+            fleet.stop()
+
+    durations = [
+        status['finished_at'] - status['started_at']
+        for status in statuses if status['started_at'] and status['finished_at']
+    ]
+    succeeded = sum(1 for status in statuses if status['status'] == JOB_SUCCEEDED)
+    return {
+        'workers': workers,
+        'jobs': jobs,
+        'succeeded': succeeded,
+        'elapsed_s': round(elapsed, 2),
+        'jobs_per_minute': round(jobs / elapsed * 60, 1),
+        'job_median_s': round(statistics.median(durations), 3) if durations else None,
+    }
+
+def main():
+    """Run the load test for each worker count and print a summary."""
+    parser = argparse.ArgumentParser(description="Worker fleet load test")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='Worker counts to test')
+    parser.add_argument('--jobs', type=int, default=40, help='Jobs per worker count')
+    parser.add_argument('--kind', choices=['synthetic', 'workflow'], default='synthetic')
+    parser.add_argument('--cpu-seconds', type=float, default=0.2, help='CPU time per synthetic job')
+    parser.add_argument('--io-seconds', type=float, default=0.5, help='Simulated I/O wait per synthetic job')
+    parser.add_argument('--query', help='Workflow prompt for --kind workflow')
+    parser.add_argument('--email', help='Screener.in email for --kind workflow')
+    parser.add_argument('--password', help='Screener.in password for --kind workflow')
+    parser.add_argument('--timeout', type=float, default=900, help='Per-job timeout in seconds')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    if args.kind == 'workflow':
+        if not (args.query and args.email and args.password):
+            parser.error("--kind workflow requires --query, --email and --password")
+        payload = {'query': args.query, 'sensitive_data': {'email': args.email, 'password': args.password}}
+    else:
+        payload = {'cpu_seconds': args.cpu_seconds, 'io_seconds': args.io_seconds}
+
+    results = []
+    for workers in args.workers:
+        print(f"🔧 Running {args.jobs} {args.kind} jobs on {workers} worker(s)...")
+        result = run_load(workers, args.jobs, payload, args.kind, args.timeout)
+        results.append(result)
+        print(f"✅ {result['jobs_per_minute']} jobs/min ({result['succeeded']}/{result['jobs']} succeeded, "
+              f"{result['elapsed_s']}s)")
+
+    print("\n📊 Throughput by worker count:")
+    baseline = results[0]['jobs_per_minute']
+    for result in results:
+        speedup = result['jobs_per_minute'] / baseline if baseline else 0
+        print(f"  {result['workers']:>3} worker(s): {result['jobs_per_minute']:>8} jobs/min  (x{speedup:.2f})")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"ℹ️ Results written to {args.output}")
+
+    return all(result['succeeded'] == result['jobs'] for result in results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -16,18 +16,12 @@ from ui_components import UIComponents
 # Allow nested async loops
 nest_asyncio.apply()
 
-# Run browser setup for cloud deployment
+# Run browser setup for cloud deployment in the background; it runs once per
+# process and skips the install when the install manifest matches
 if platform.system() == 'Linux':
     try:
-        from setup_browsers import setup_environment, install_playwright_browsers, verify_installation
-        
-        # Setup environment
-        setup_environment()
-        
-        # Install browsers if not already installed
-        if not verify_installation():
-            print("Installing Playwright browsers...")
-            install_playwright_browsers()
+        from browser_setup import start_browser_setup
+        start_browser_setup()
     except Exception as e:
         st.error(f"Browser setup failed: {e}")
 
@@ -47,7 +41,7 @@ else:
         UIComponents.credentials_setup()
     else:
         # --------- Full Screen Step Breakdown View ---------
-        if st.session_state['workflow_steps'] and not st.session_state['workflow_approved']:
+        if (st.session_state['workflow_steps'] or st.session_state['breakdown_streaming']) and not st.session_state['workflow_approved']:
             UIComponents.step_breakdown_view()
         
         # --------- Workflow Execution View ---------
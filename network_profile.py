@@ -0,0 +1,322 @@
+# Network interception profile for the Workflow Automator
+#
+# Pauses the agent browser's requests through CDP Fetch and blocks the ones a
+# screener.in workflow never needs: fonts, media, analytics and ads. Large
+# images can optionally be downscaled before the page receives them.
+# Blocked requests never reach the network, so their size is unknown: they are
+# counted per resource type, and only downscaling is counted in bytes.
+# `python benchmark.py network` measures the bytes saved per page.
+
+import asyncio
+import base64
+import io
+from urllib.parse import urlparse
+
+from PIL import Image
+
+from config import (
+    NETWORK_PROFILE_ENABLED,
+    NETWORK_BLOCKED_RESOURCE_TYPES,
+    NETWORK_BLOCKED_DOMAINS,
+    NETWORK_ALLOWED_DOMAINS,
+    NETWORK_BLOCK_THIRD_PARTY,
+    NETWORK_IMAGE_MAX_WIDTH,
+)
+
+# Response headers that no longer match a re-encoded image body
+STALE_IMAGE_HEADERS = ('content-length', 'content-encoding', 'content-type', 'etag')
+
+
+def _host_matches(host, domains):
+    """Whether a host is one of `domains` or a subdomain of one."""
+    host = (host or '').lower()
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+
+def downscale_image(data, max_width):
+    """Re-encode an image no wider than `max_width`; None if it is already small or not smaller after."""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.width <= max_width or getattr(image, 'is_animated', False):
+                return None
+            image_format = image.format if image.format in ('JPEG', 'PNG', 'WEBP') else 'JPEG'
+            height = max(1, round(image.height * max_width / image.width))
+            resized = image.resize((max_width, height), Image.LANCZOS)
+            if image_format == 'JPEG' and resized.mode not in ('RGB', 'L'):
+                resized = resized.convert('RGB')
+
+            buffer = io.BytesIO()
+            resized.save(buffer, format=image_format, quality=70, optimize=True)
+    except Exception:
+        return None
+
+    out = buffer.getvalue()
+    return (out, f"image/{image_format.lower()}") if len(out) < len(data) else None
+
+
+class NetworkProfile:
+    """Allow and deny rules for the agent browser's requests."""
+
+    def __init__(self, blocked_types=NETWORK_BLOCKED_RESOURCE_TYPES, blocked_domains=NETWORK_BLOCKED_DOMAINS,
+                 allowed_domains=NETWORK_ALLOWED_DOMAINS, block_third_party=NETWORK_BLOCK_THIRD_PARTY,
+                 image_max_width=NETWORK_IMAGE_MAX_WIDTH):
+        self.blocked_types = set(blocked_types)
+        self.blocked_domains = tuple(blocked_domains)
+        self.allowed_domains = tuple(allowed_domains)
+        self.block_third_party = block_third_party
+        self.image_max_width = image_max_width
+
+    @classmethod
+    def allow_all(cls):
+        """A profile that blocks nothing."""
+        return cls(blocked_types=(), blocked_domains=(), block_third_party=False, image_max_width=0)
+
+    def block_reason(self, url, resource_type):
+        """Why a request should be blocked, or None to let it through."""
+        if resource_type == 'Document':
+            return None
+
+        host = urlparse(url).hostname
+        if _host_matches(host, self.blocked_domains):
+            return 'domain'
+        if resource_type in self.blocked_types:
+            return f"type:{resource_type}"
+        if self.block_third_party and host and not _host_matches(host, self.allowed_domains):
+            return 'third_party'
+        return None
+
+
+class NetworkInterceptor:
+    """Applies a NetworkProfile to a browser session through CDP Fetch and counts what it saved."""
+
+    def __init__(self, profile=None):
+        self.profile = profile or NetworkProfile()
+        self.browser_session = None
+        self.stats = {
+            'requests': 0,
+            'blocked': 0,
+            'blocked_by': {},
+            'blocked_by_type': {},
+            'images_downscaled': 0,
+            'downscaled_bytes_saved': 0,
+        }
+        self._client = None
+        self._sessions = set()
+        self._tasks = set()
+        self._step_base = {}
+
+    async def attach(self, browser_session):
+        """Start intercepting the session's requests."""
+        self.browser_session = browser_session
+        browser_session._network_interceptor = self
+        await self.enable_for_current_target()
+
+    def _register_handler(self):
+        """Route the CDP client's paused requests to the session's interceptor.
+
+        cdp_use keeps one handler per event, and a reconnect replaces the client
+        (and browser-use's proxy auth registers its own handler on the new one),
+        so the handler is registered once per client object. Proxy auth keeps
+        its own authRequired handler.
+        """
+        browser_session = self.browser_session
+        client = browser_session._cdp_client_root
+        if getattr(browser_session, '_network_handler_client', None) is not client:
+            client.register.Fetch.requestPaused(
+                lambda event, session_id: _dispatch_request_paused(browser_session, event, session_id)
+            )
+            browser_session._network_handler_client = client
+        if self._client is not client:
+            # Session ids of a replaced client are stale
+            self._client = client
+            self._sessions.clear()
+
+    async def enable_for_current_target(self):
+        """Enable interception on the agent's current tab, e.g. after it opened a new one or reconnected."""
+        if self.browser_session is None:
+            return
+        self._register_handler()
+        cdp_session = await self.browser_session.get_or_create_cdp_session(focus=False)
+        if cdp_session.session_id in self._sessions:
+            return
+
+        params = {'patterns': self._patterns()}
+        if _uses_proxy_auth(self.browser_session):
+            # Fetch.enable replaces the session's settings, so keep browser-use's proxy auth on
+            params['handleAuthRequests'] = True
+        await cdp_session.cdp_client.send.Fetch.enable(params=params, session_id=cdp_session.session_id)
+        self._sessions.add(cdp_session.session_id)
+
+    def _patterns(self):
+        """Fetch.enable patterns: every request, and image responses when downscaling."""
+        patterns = [{'urlPattern': '*', 'requestStage': 'Request'}]
+        if self.profile.image_max_width:
+            patterns.append({'urlPattern': '*', 'resourceType': 'Image', 'requestStage': 'Response'})
+        return patterns
+
+    async def detach(self):
+        """Stop intercepting so the pooled session goes back unmodified."""
+        if self.browser_session is None:
+            return
+        client = self.browser_session._cdp_client_root
+        proxy_auth = _uses_proxy_auth(self.browser_session)
+        for session_id in self._sessions if client is self._client else ():
+            try:
+                if proxy_auth:
+                    # Back to browser-use's proxy auth settings; the handler continues paused requests
+                    await client.send.Fetch.enable(params={'handleAuthRequests': True}, session_id=session_id)
+                else:
+                    await client.send.Fetch.disable(session_id=session_id)
+            except Exception:
+                # The tab may already be closed
+                continue
+        self._sessions.clear()
+        self._client = None
+        self.browser_session._network_interceptor = _DETACHED
+        self.browser_session = None
+
+    def on_request_paused(self, event, session_id):
+        """Handle a paused request on a task; awaiting CDP calls here would block the CDP reader."""
+        task = asyncio.ensure_future(self._handle_request(event, session_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _handle_request(self, event, session_id):
+        client = self.browser_session._cdp_client_root
+        request_id = event['requestId']
+        try:
+            if 'responseStatusCode' in event or 'responseErrorReason' in event:
+                await self._handle_response(client, event, session_id)
+                return
+
+            self.stats['requests'] += 1
+            reason = self.profile.block_reason(event['request']['url'], event.get('resourceType'))
+            if reason:
+                self.stats['blocked'] += 1
+                self.stats['blocked_by'][reason] = self.stats['blocked_by'].get(reason, 0) + 1
+                resource_type = event.get('resourceType') or 'Other'
+                self.stats['blocked_by_type'][resource_type] = self.stats['blocked_by_type'].get(resource_type, 0) + 1
+                await client.send.Fetch.failRequest(
+                    params={'requestId': request_id, 'errorReason': 'BlockedByClient'}, session_id=session_id
+                )
+            else:
+                await self._allow_request(client, event, session_id)
+        except Exception as e:
+            print(f"⚠️ Request interception failed: {e}")
+            try:
+                await self._fallback(client, request_id, session_id)
+            except Exception:
+                pass
+
+    async def _fallback(self, client, request_id, session_id):
+        """Release a request whose handling failed."""
+        await client.send.Fetch.continueRequest(params={'requestId': request_id}, session_id=session_id)
+
+    async def _allow_request(self, client, event, session_id):
+        """Let a request that passed the profile go to the network."""
+        await client.send.Fetch.continueRequest(params={'requestId': event['requestId']}, session_id=session_id)
+
+    async def _handle_response(self, client, event, session_id):
+        """Downscale a large image response, or pass it through unchanged."""
+        request_id = event['requestId']
+        status = event.get('responseStatusCode')
+        if status != 200:
+            await client.send.Fetch.continueRequest(params={'requestId': request_id}, session_id=session_id)
+            return
+
+        response = await client.send.Fetch.getResponseBody(params={'requestId': request_id}, session_id=session_id)
+        body = base64.b64decode(response['body']) if response.get('base64Encoded') else response['body'].encode()
+        downscaled = await asyncio.to_thread(downscale_image, body, self.profile.image_max_width)
+
+        headers = event.get('responseHeaders', [])
+        if downscaled:
+            data, content_type = downscaled
+            headers = [header for header in headers if header['name'].lower() not in STALE_IMAGE_HEADERS]
+            headers.append({'name': 'Content-Type', 'value': content_type})
+            self.stats['images_downscaled'] += 1
+            self.stats['downscaled_bytes_saved'] += len(body) - len(data)
+            body = data
+
+        await client.send.Fetch.fulfillRequest(
+            params={
+                'requestId': request_id,
+                'responseCode': status,
+                'responseHeaders': headers,
+                'body': base64.b64encode(body).decode('ascii'),
+            },
+            session_id=session_id
+        )
+
+    def take_step_counts(self):
+        """Requests, blocked requests per type and bytes saved by downscaling since the previous call, for a step."""
+        counts = {
+            'requests': self.stats['requests'],
+            'requests_blocked': self.stats['blocked'],
+            'downscaled_bytes_saved': self.stats['downscaled_bytes_saved'],
+        }
+        delta = {key: value - self._step_base.get(key, 0) for key, value in counts.items()}
+        by_type = dict(self.stats['blocked_by_type'])
+        base_by_type = self._step_base.get('requests_blocked_by_type', {})
+        delta['requests_blocked_by_type'] = {
+            resource_type: count - base_by_type.get(resource_type, 0) for resource_type, count in by_type.items()
+            if count > base_by_type.get(resource_type, 0)
+        }
+        self._step_base = dict(counts, requests_blocked_by_type=by_type)
+        return delta
+
+    def get_stats(self):
+        """Counters of requests seen, blocked and bytes saved by downscaling."""
+        stats = dict(self.stats)
+        stats['blocked_by'] = dict(self.stats['blocked_by'])
+        stats['blocked_by_type'] = dict(self.stats['blocked_by_type'])
+        return stats
+
+
+# Marks a session whose handler is registered but which has no active interceptor
+_DETACHED = object()
+
+
+def _uses_proxy_auth(browser_session):
+    """Whether browser-use answers proxy auth challenges for the session through CDP Fetch."""
+    proxy = getattr(browser_session.browser_profile, 'proxy', None)
+    return bool(proxy and proxy.username and proxy.password)
+
+
+def _dispatch_request_paused(browser_session, event, session_id):
+    """Route a paused request to the session's interceptor, or let it continue."""
+    interceptor = getattr(browser_session, '_network_interceptor', None)
+    if isinstance(interceptor, NetworkInterceptor):
+        interceptor.on_request_paused(event, session_id)
+        return
+
+    async def _continue():
+        try:
+            await browser_session._cdp_client_root.send.Fetch.continueRequest(
+                params={'requestId': event['requestId']}, session_id=session_id
+            )
+        except Exception:
+            pass
+    asyncio.ensure_future(_continue())
+
+
+def create_interceptor():
+    """A fresh interceptor with the configured profile, or None when the profile is off."""
+    return NetworkInterceptor() if NETWORK_PROFILE_ENABLED else None
+
+
+def format_blocked_by_type(blocked_by_type):
+    """Blocked request counts per resource type, most blocked first."""
+    return ', '.join(
+        f"{resource_type}={count}"
+        for resource_type, count in sorted(blocked_by_type.items(), key=lambda item: (-item[1], item[0]))
+    ) or 'none'
+
+
+def format_network_stats(stats):
+    """Format interception counters as a short status line."""
+    blocked_by = ', '.join(f"{reason}={count}" for reason, count in sorted(stats['blocked_by'].items()))
+    return (
+        f"requests={stats['requests']} blocked={stats['blocked']} ({blocked_by or 'none'}; "
+        f"by type: {format_blocked_by_type(stats['blocked_by_type'])}) images_downscaled={stats['images_downscaled']} "
+        f"downscaled_kb_saved={stats['downscaled_bytes_saved'] / 1024:.0f}"
+    )
@@ -0,0 +1,238 @@
+# Workflow plan library for the Workflow Automator
+#
+# Keeps approved workflow plans (the edited steps and the combined execution
+# prompt) in a local SQLite database, keyed by normalized prompt. A prompt
+# that matches a saved plan exactly, or closely enough by word overlap with
+# the same numbers and comparisons, can run that plan without the breakdown
+# and combination LLM calls. Plans are versioned by the prompt templates that
+# produced them and dropped when a template changes.
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from config import (
+    LLM_MODEL,
+    PLAN_LIBRARY_ENABLED,
+    PLAN_LIBRARY_PATH,
+    PLAN_LIBRARY_MAX_ENTRIES,
+    PLAN_MATCH_THRESHOLD,
+)
+from llm_cache import normalize_prompt, template_version
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    key TEXT PRIMARY KEY,
+    prompt TEXT NOT NULL,
+    version TEXT NOT NULL,
+    steps TEXT NOT NULL,
+    combined_prompt TEXT NOT NULL,
+    exact_terms TEXT NOT NULL,
+    token_count INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_plans_last_used ON plans (last_used);
+CREATE TABLE IF NOT EXISTS plan_tokens (
+    token TEXT NOT NULL,
+    key TEXT NOT NULL REFERENCES plans (key) ON DELETE CASCADE,
+    PRIMARY KEY (token, key)
+);
+CREATE INDEX IF NOT EXISTS idx_plan_tokens_key ON plan_tokens (key);
+"""
+
+# Words too common in screener prompts to tell two of them apart
+STOPWORDS = frozenset(
+    'a an and are as at be by for from find get give i in is it list me my of on or show than that the their them '
+    'then these this those to with stock stocks company companies screen screener'.split()
+)
+
+# Words that flip a filter's meaning; a fuzzy match must use exactly the same ones
+COMPARISON_WORDS = frozenset(
+    'above below over under less more greater lower higher least most max maximum min minimum not no without '
+    'exceeding between top bottom'.split()
+)
+
+TOKEN_PATTERN = re.compile(r"[a-z]+|\d+(?:\.\d+)?")
+
+
+def plan_key(prompt):
+    """Exact-match key of a prompt: normalized and case-folded."""
+    return normalize_prompt(prompt).casefold()
+
+
+def tokenize(prompt):
+    """Distinct words and numbers of a prompt, without stopwords."""
+    return {token for token in TOKEN_PATTERN.findall(plan_key(prompt)) if token not in STOPWORDS}
+
+
+def exact_terms(tokens):
+    """The numbers and comparison words of a prompt; a fuzzy match must have exactly the same ones."""
+    return sorted(token for token in tokens if token[0].isdigit() or token in COMPARISON_WORDS)
+
+
+def plans_version(model=LLM_MODEL):
+    """Version of the templates a plan was made with; plans from other versions are dropped."""
+    from prompts import STEP_BREAKDOWN_PROMPT, STEP_COMBINATION_PROMPT, COMBINED_PROMPT_TEMPLATE
+    return template_version('\0'.join([model, STEP_BREAKDOWN_PROMPT, STEP_COMBINATION_PROMPT, COMBINED_PROMPT_TEMPLATE]))
+
+
+class PlanLibrary:
+    """SQLite store of approved plans with exact and fuzzy lookup and LRU eviction."""
+
+    def __init__(self, db_path=PLAN_LIBRARY_PATH, max_entries=PLAN_LIBRARY_MAX_ENTRIES,
+                 threshold=PLAN_MATCH_THRESHOLD, enabled=PLAN_LIBRARY_ENABLED, version=None):
+        self.db_path = str(db_path)
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.enabled = enabled
+        self.version = version or plans_version()
+        self.stats = {'exact_hits': 0, 'fuzzy_hits': 0, 'misses': 0, 'saved': 0, 'evicted': 0, 'invalidated': 0}
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+
+        if self.enabled:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = self._connect()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            removed = conn.execute("DELETE FROM plans WHERE version != ?", (self.version,)).rowcount
+            if removed:
+                self.stats['invalidated'] = removed
+                print(f"ℹ️  Plan library: dropped {removed} plans made with older prompt templates")
+
+    def _connect(self):
+        """Per-thread connection in autocommit mode."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, stat, amount=1):
+        with self._stats_lock:
+            self.stats[stat] += amount
+
+    def save(self, prompt, steps, combined_prompt):
+        """Store an approved plan, replacing any plan for the same prompt."""
+        if not self.enabled:
+            return
+
+        key = plan_key(prompt)
+        tokens = tokenize(prompt)
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM plans WHERE key = ?", (key,))
+            conn.execute(
+                "INSERT INTO plans (key, prompt, version, steps, combined_prompt, exact_terms, token_count, "
+                "created_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, prompt, self.version, json.dumps(list(steps)), combined_prompt,
+                 json.dumps(exact_terms(tokens)), len(tokens), now, now)
+            )
+            conn.executemany("INSERT INTO plan_tokens (token, key) VALUES (?, ?)", [(token, key) for token in tokens])
+            excess = conn.execute("SELECT COUNT(*) FROM plans").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM plans WHERE key IN (SELECT key FROM plans ORDER BY last_used LIMIT ?)", (excess,)
+                )
+        self._count('saved')
+        if excess > 0:
+            self._count('evicted', excess)
+
+    def lookup(self, prompt):
+        """The saved plan for a prompt, or the most similar one above the threshold, or None.
+
+        Returns a dict with the plan's `prompt`, `steps`, `combined_prompt`,
+        `score` (1.0 for an exact match) and `exact`.
+        """
+        if not self.enabled:
+            return None
+
+        conn = self._connect()
+        key = plan_key(prompt)
+        match = self._fetch(conn, key, 1.0)
+        if match is None:
+            match = self._fuzzy_match(conn, tokenize(prompt))
+
+        if match is None:
+            self._count('misses')
+            return None
+        conn.execute("UPDATE plans SET last_used = ?, uses = uses + 1 WHERE key = ?", (time.time(), match['key']))
+        self._count('exact_hits' if match['exact'] else 'fuzzy_hits')
+        return match
+
+    def _fetch(self, conn, key, score):
+        row = conn.execute("SELECT prompt, steps, combined_prompt FROM plans WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return {'key': key, 'prompt': row[0], 'steps': json.loads(row[1]), 'combined_prompt': row[2],
+                'score': score, 'exact': score == 1.0}
+
+    def _fuzzy_match(self, conn, tokens):
+        """Best plan by Jaccard similarity of prompt tokens, among plans with the same exact terms."""
+        if not tokens:
+            return None
+
+        placeholders = ', '.join('?' * len(tokens))
+        rows = conn.execute(
+            f"SELECT p.key, p.token_count, p.exact_terms, COUNT(*) FROM plan_tokens t JOIN plans p ON p.key = t.key "
+            f"WHERE t.token IN ({placeholders}) GROUP BY p.key",
+            list(tokens)
+        ).fetchall()
+
+        terms = exact_terms(tokens)
+        best_key, best_score = None, 0.0
+        for key, token_count, plan_terms, shared in rows:
+            if json.loads(plan_terms) != terms:
+                continue
+            score = shared / (len(tokens) + token_count - shared)
+            if score >= self.threshold and score > best_score:
+                best_key, best_score = key, score
+        # Just under 1.0 so a fuzzy match is never taken for an exact one
+        return self._fetch(conn, best_key, min(best_score, 0.999)) if best_key else None
+
+    def clear(self):
+        """Remove every saved plan."""
+        if self.enabled:
+            self._connect().execute("DELETE FROM plans")
+
+    def get_metrics(self):
+        """Hit counters and the number of saved plans."""
+        with self._stats_lock:
+            metrics = dict(self.stats)
+        lookups = metrics['exact_hits'] + metrics['fuzzy_hits'] + metrics['misses']
+        metrics['hit_rate'] = (metrics['exact_hits'] + metrics['fuzzy_hits']) / lookups if lookups else 0.0
+        metrics['entries'] = (
+            self._connect().execute("SELECT COUNT(*) FROM plans").fetchone()[0] if self.enabled else 0
+        )
+        return metrics
+
+
+_library = None
+_library_lock = threading.Lock()
+
+
+def get_plan_library():
+    """Get the process-wide plan library."""
+    global _library
+
+    with _library_lock:
+        if _library is None:
+            _library = PlanLibrary()
+        return _library
+
+
+def format_plan_metrics(metrics):
+    """Format plan library metrics as a short status line."""
+    return (
+        f"exact={metrics['exact_hits']} fuzzy={metrics['fuzzy_hits']} misses={metrics['misses']} "
+        f"hit_rate={metrics['hit_rate']:.0%} plans={metrics['entries']} evicted={metrics['evicted']}"
+    )
@@ -0,0 +1,246 @@
+# Token-budget prompt compaction for the Workflow Automator
+#
+# The execution prompt becomes the browser agent's task, which browser-use
+# sends again with every step, so each of its tokens is paid for once per
+# step. Before a run the prompt is measured with a local tokenizer and
+# compacted: whitespace, markdown emphasis and filler phrases are removed and
+# repeated instructions dropped. If it is still over PROMPT_TOKEN_BUDGET,
+# low-value sentences (waits, checks, reminders) go, last ones first.
+# Sentences that carry a number or a screener.in metric are only dropped as
+# word-for-word repeats.
+
+import re
+import threading
+
+from config import (
+    LLM_MODEL, PROMPT_COMPACTION_ENABLED, PROMPT_TOKEN_BUDGET, PROMPT_TOKENIZER, PROMPT_INPUT_COST_PER_MTOK,
+)
+from llm_gateway import estimate_tokens
+from prompts import METRIC_PATTERN
+
+# Phrases that add length but no instruction, and what they shorten to
+FILLER_PATTERNS = [
+    (re.compile(pattern, re.IGNORECASE), replacement) for pattern, replacement in (
+        (r'\*\*|__', ''),
+        (r'\bplease\s+', ''),
+        (r'\b(?:make sure|be sure|remember|don\'t forget) to\s+', ''),
+        (r'\byou (?:will )?(?:need|have|must) to\s+', ''),
+        (r'\byou should\s+(?!not\b)', ''),
+        (r'\bit is (?:important|necessary|essential) (?:that you |to )', ''),
+        (r'\b(?:carefully|properly|successfully|accurately)\s+', ''),
+        (r'\bin order to\b', 'to'),
+        (r'\b(?:at this point|once (?:this|that) is done|after that|next up),?\s*', ''),
+        (r'\bwith the (?:provided|given) credentials\b', 'with the credentials'),
+    )
+]
+
+# Sentences that can go when the prompt is over budget
+LOW_VALUE_PATTERN = re.compile(
+    r'\b(?:wait|verify|double-check|check that|(?:make sure|ensure) that|take note|note that|keep in mind|'
+    r'if (?:needed|necessary|required)|loads?|loaded)\b',
+    re.IGNORECASE
+)
+
+# Sentences at least this similar (word overlap) to an earlier one, with the same numbers, are repeats
+DUPLICATE_SIMILARITY = 0.8
+# Sentences of at least this many words are also repeats when an earlier one contains all their words
+SUBSET_MIN_WORDS = 4
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"(])')
+STEP_NUMBER = re.compile(r'^(\s*)(\d+)([.)]\s+)')
+NUMBER_TOKEN = re.compile(r'\d+(?:\.\d+)?')
+WORD = re.compile(r'[a-z0-9/<>=%]+(?:\.\d+)?')
+
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+
+def get_tokenizer():
+    """The process-wide token counter, as (name, count); tiktoken when available, else an estimate."""
+    global _tokenizer
+
+    with _tokenizer_lock:
+        if _tokenizer is None:
+            _tokenizer = ('estimate', estimate_tokens)
+            if PROMPT_TOKENIZER == 'tiktoken':
+                try:
+                    import tiktoken
+                    try:
+                        encoding = tiktoken.encoding_for_model(LLM_MODEL)
+                    except KeyError:
+                        encoding = tiktoken.get_encoding('o200k_base')
+                    _tokenizer = (encoding.name, lambda text: len(encoding.encode(text, disallowed_special=())))
+                except Exception as e:
+                    # Not installed, or the encoding cannot be downloaded
+                    print(f"⚠️ tiktoken unavailable, estimating prompt tokens: {e}")
+        return _tokenizer
+
+
+def count_tokens(text):
+    """Token count of `text` with the process-wide tokenizer."""
+    return get_tokenizer()[1](text)
+
+
+def _sentence_words(sentence):
+    return set(WORD.findall(sentence.lower()))
+
+
+def _is_repeat(sentence, seen):
+    """Whether an earlier sentence already says what `sentence` says.
+
+    Sentences with values or metrics only repeat an earlier one word for word,
+    since filter steps differ in as little as one word ("ROE"/"ROCE",
+    "minimum"/"maximum").
+    """
+    words = _sentence_words(sentence)
+    if not words:
+        return False
+    key = ' '.join(WORD.findall(sentence.lower()))
+    numbers = sorted(NUMBER_TOKEN.findall(sentence))
+    protected = _is_protected(sentence)
+    for earlier_key, earlier_words, earlier_numbers in seen:
+        if key == earlier_key:
+            return True
+        if protected or numbers != earlier_numbers:
+            continue
+        if len(words & earlier_words) / len(words | earlier_words) >= DUPLICATE_SIMILARITY:
+            return True
+        if len(words) >= SUBSET_MIN_WORDS and words <= earlier_words:
+            return True
+    seen.append((key, words, numbers))
+    return False
+
+
+def _is_protected(sentence):
+    """Sentences with values or screener.in metrics carry the workflow and are always kept."""
+    return bool(NUMBER_TOKEN.search(sentence) or METRIC_PATTERN.search(sentence.lower()))
+
+
+def strip_filler(sentence):
+    """A sentence without filler phrases, its first letter kept in its original case."""
+    shortened = sentence
+    for pattern, replacement in FILLER_PATTERNS:
+        shortened = pattern.sub(replacement, shortened)
+    shortened = re.sub(r'[ \t]{2,}', ' ', shortened).strip()
+    if shortened and sentence[:1].isupper():
+        shortened = shortened[0].upper() + shortened[1:]
+    return shortened
+
+
+def split_lines(text):
+    """The prompt as (step number prefix, sentences) lines; blank lines have no sentences."""
+    lines = []
+    for line in text.splitlines():
+        line = re.sub(r'[ \t]+', ' ', line).strip()
+        step = STEP_NUMBER.match(line)
+        prefix = step.group(3) if step else None
+        body = line[step.end():] if step else line
+        lines.append((prefix, [sentence for sentence in SENTENCE_SPLIT.split(body) if sentence] if body else []))
+    return lines
+
+
+def join_lines(lines):
+    """Rebuild the prompt, renumbering steps and collapsing blank runs; lines that lost every sentence go."""
+    output = []
+    step = 0
+    for prefix, sentences in lines:
+        sentences = [sentence for sentence in sentences if sentence]
+        if not sentences:
+            if prefix is None and output and output[-1]:
+                output.append('')
+            continue
+        line = ' '.join(sentences)
+        if prefix is not None:
+            step += 1
+            line = f"{step}{prefix}{line}"
+        output.append(line)
+    return '\n'.join(output).strip()
+
+
+class CompactionResult:
+    """A compacted prompt and its token counts before and after."""
+
+    def __init__(self, original, text, tokens_before, tokens_after, budget, tokenizer, dropped=()):
+        self.original = original
+        self.text = text
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+        self.budget = budget
+        self.tokenizer = tokenizer
+        self.dropped = list(dropped)
+
+    @property
+    def saved_tokens(self):
+        return self.tokens_before - self.tokens_after
+
+    @property
+    def over_budget(self):
+        return bool(self.budget) and self.tokens_after > self.budget
+
+    def savings(self, agent_steps, cost_per_mtok=PROMPT_INPUT_COST_PER_MTOK):
+        """Estimated tokens and input cost saved by a run that sent the prompt in `agent_steps` steps."""
+        tokens_saved = self.saved_tokens * (agent_steps or 0)
+        return {
+            'prompt_tokens_before': self.tokens_before,
+            'prompt_tokens_after': self.tokens_after,
+            'prompt_tokens_saved': tokens_saved,
+            'prompt_cost_saved_usd': tokens_saved * cost_per_mtok / 1_000_000,
+        }
+
+
+def compact_prompt(text, budget=PROMPT_TOKEN_BUDGET, enabled=PROMPT_COMPACTION_ENABLED):
+    """Compact an execution prompt and fit it into `budget` tokens where that only drops low-value sentences."""
+    tokenizer, count = get_tokenizer()
+    tokens_before = count(text)
+    if not enabled:
+        return CompactionResult(text, text, tokens_before, tokens_before, budget, tokenizer)
+
+    # Shorten every sentence, then drop the ones an earlier sentence already covers
+    seen = []
+    dropped = []
+    lines = []
+    for prefix, sentences in split_lines(text):
+        kept = []
+        for sentence in sentences:
+            shortened = strip_filler(sentence)
+            if not shortened or _is_repeat(shortened, seen):
+                dropped.append(sentence)
+            else:
+                kept.append(shortened)
+        # A blank line stays a paragraph break; a line of repeats goes
+        if kept or not sentences:
+            lines.append((prefix, kept))
+    compacted = join_lines(lines)
+    tokens_after = count(compacted)
+
+    # Over budget: drop low-value sentences, last ones first
+    if budget and tokens_after > budget:
+        candidates = [
+            (i, j) for i, (_, sentences) in enumerate(lines) for j, sentence in enumerate(sentences)
+            if LOW_VALUE_PATTERN.search(sentence) and not _is_protected(sentence)
+        ]
+        for i, j in reversed(candidates):
+            dropped.append(lines[i][1][j])
+            lines[i][1][j] = None
+            compacted = join_lines(lines)
+            tokens_after = count(compacted)
+            if tokens_after <= budget:
+                break
+
+    return CompactionResult(text, compacted, tokens_before, tokens_after, budget, tokenizer, dropped)
+
+
+def format_compaction(result, agent_steps=None):
+    """Format a compaction result as a short status line."""
+    line = (
+        f"{result.tokens_before} -> {result.tokens_after} tokens ({result.tokenizer}, budget {result.budget}), "
+        f"{len(result.dropped)} sentences dropped"
+    )
+    if agent_steps:
+        savings = result.savings(agent_steps)
+        line += (f", ~{savings['prompt_tokens_saved']:,} tokens / ${savings['prompt_cost_saved_usd']:.4f} saved "
+                 f"over {agent_steps} steps")
+    if result.over_budget:
+        line += " (still over budget)"
+    return line
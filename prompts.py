@@ -1,5 +1,7 @@
 # Centralized prompts for the Workflow Automator
 
+import re
+
 # --------- Step Breakdown Prompt ---------
 STEP_BREAKDOWN_PROMPT = """
 You are a screener.in automation agent specialized in stock market analysis and financial data extraction. 
@@ -47,6 +49,15 @@ IMPORTANT:
 Combined Prompt:
 """
 
+# --------- Combined Prompt Template ---------
+# Used instead of STEP_COMBINATION_PROMPT when the generated steps were approved unchanged
+COMBINED_PROMPT_TEMPLATE = """Objective: {original_request}
+
+On screener.in, carry out the following steps in order:
+{approved_steps}
+
+Perform every step directly on the website without asking for confirmation, then report the filtered results."""
+
 # --------- Browser Automation Prompt ---------
 BROWSER_AUTOMATION_PROMPT = """
 You are a screener.in automation agent. Take the following prompt and execute it.
@@ -55,6 +66,11 @@ Prompt: {prompt}
 
 Execute the prompt and give the results.
 """
+
+# Appended to the browser automation prompt when a saved screener.in login was restored
+AUTH_STATE_HINT = """
+The browser may already be logged in to screener.in from a previous session. Check whether you are logged in before entering credentials, and only log in if needed.
+"""
 # --------- Authentication Messages ---------
 LOGIN_WELCOME = "🔐 Welcome to Screener.in Workflow Automator"
 LOGIN_INSTRUCTIONS = "Please log in to access the stock screening automation system."
@@ -91,6 +107,27 @@ APPROVE_RUN_BUTTON = "✅ Approve & Run"
 REJECT_MODIFY_BUTTON = "❌ Reject & Modify"
 EXECUTE_WORKFLOW_BUTTON = "🚀 Execute Workflow"
 AGENT_THOUGHTS_HEADER = "Agent's Thoughts"
+USE_SAVED_PLAN_BUTTON = "♻️ Use Saved Plan"
+NEW_BREAKDOWN_BUTTON = "📋 Break Down Anew"
+PLAN_MATCH_FOUND = "A saved plan is a {score}% match for your prompt: \"{prompt}\""
+PLAN_MATCH_STEPS = "Saved plan steps"
+BATCH_HEADER = "📦 Batch Run"
+BATCH_DESCRIPTION = "Upload a CSV with a `prompt` column, or a JSONL file of prompts, to run them all. Uploading the same file again resumes it."
+BATCH_UPLOAD_LABEL = "Batch file"
+START_BATCH_BUTTON = "🚀 Run Batch"
+CANCEL_BATCH_BUTTON = "🛑 Cancel Batch"
+DOWNLOAD_BATCH_BUTTON = "⬇️ Download Results"
+DOWNLOAD_CSV_BUTTON = "⬇️ Download CSV"
+DOWNLOAD_PARQUET_BUTTON = "⬇️ Download Parquet"
+RUN_HISTORY_HEADER = "🕘 Run History"
+RUN_HISTORY_SEARCH_LABEL = "Search past runs"
+RUN_HISTORY_SEARCH_PLACEHOLDER = "e.g., P/E market cap"
+RUN_HISTORY_SELECT_LABEL = "Run"
+RUN_HISTORY_STEP_LOG = "Step log"
+RUN_AGAIN_BUTTON = "🔁 Run Again"
+REFRESH_RESULT_BUTTON = "🔄 Refresh Now"
+RESULT_FRESHNESS_LABEL = "Reuse results from an identical run within"
+RESULT_FRESHNESS_HELP = "If the same workflow succeeded within this window, its result is shown instead of running the browser again."
 BROWSER_SCREENSHOT_HEADER = "Browser Screenshot"
 
 # --------- Status Messages ---------
@@ -99,12 +136,31 @@ AGENT_COMPLETED = "✅ Agent execution completed successfully!"
 AGENT_FAILED = "❌ Agent execution failed"
 BROWSER_KEEP_OPEN = "The browser will remain open so you can review the results. Close it manually when done."
 WORKFLOW_STARTING = "🚀 Starting workflow execution..."
+BREAKDOWN_STREAMING = "Breaking down your request into steps..."
 EXECUTION_PROMPT_TITLE = "📋 Execution Prompt (Generated from Steps)"
 EXECUTION_PROMPT_DESCRIPTION = "This is the comprehensive prompt that will be sent to the browser automation agent."
+EXECUTION_PROMPT_TOKENS = "{before} tokens, {after} after compaction (budget {budget}). A browser agent run sends the compacted prompt at every step."
 FINAL_RESULTS_TITLE = "📊 Final Results"
 FINAL_RESULTS_HEADER = "Agent's Final Output"
 FINAL_SCREENSHOT_CAPTION = "Final State"
+SCREENSHOT_UNAVAILABLE = "This screenshot is no longer available; it was removed from the screenshot cache."
 VIEW_FINAL_RESULTS = "View Final Results"
+RESULT_TABLE_TITLE = "📋 Results Table"
+RESULT_TABLE_COUNT = "{rows} rows, {columns} columns. Click a column header to sort."
+RUN_METRICS_TITLE = "⏱️ Run Instrumentation"
+SLOWEST_STEPS_HEADER = "Slowest Steps"
+RUN_QUEUED = "⏳ Waiting for a free worker... (position {position} in queue)"
+THOUGHT_LOG_PAGE_LABEL = "Page (1 = latest, {pages} pages)"
+THOUGHT_LOG_COUNT = "{count} entries logged"
+RUN_CANCELLED = "Workflow run cancelled."
+RUN_LEFT = "Stopped following the workflow run. It keeps running for the other sessions following it."
+BATCH_PROGRESS = "{succeeded} succeeded, {failed} failed, {remaining} remaining of {total}"
+RUN_HISTORY_EMPTY = "No runs found."
+RUN_HISTORY_SUMMARY = "{status} in {duration}, {steps} steps ({mode})"
+RUN_MODE_DIRECT = "direct screen query"
+RUN_MODE_AGENT = "browser agent"
+RESULT_FROM_CACHE = "Served from an identical run {minutes} minutes ago."
+BATCH_FINISHED = "✅ Batch finished: {succeeded} succeeded, {failed} failed."
 
 # --------- Error Messages ---------
 ERROR_BREAKDOWN = "Error breaking down prompt: {error}"
@@ -115,8 +171,13 @@ ERROR_CRITICAL = "Critical error in agent execution: {error}"
 ERROR_START_WORKFLOW = "Failed to start workflow: {error}"
 ERROR_RUN_AGENT = "Failed to run agent: {error}"
 ERROR_SCREENSHOT = "Screenshot capture failed: {error}"
+ERROR_RESULT_TABLE = "Could not load the results table: {error}"
 ERROR_UPDATE_THOUGHTS = "Error updating thoughts: {error}"
 ERROR_DISPLAY_THOUGHTS = "Error displaying final thoughts: {error}"
+ERROR_QUEUE_FULL = "Too many workflows are queued right now. Please try again in a moment."
+ERROR_BATCH_FILE = "Could not read the batch file: {error}"
+ERROR_BATCH_EMPTY = "The batch file has no prompts."
+ERROR_BATCH_START = "Could not start the batch: {error}"
 
 # --------- Debug Messages ---------
 DEBUG_TITLE = "🔍 Debug Information"
@@ -140,6 +201,33 @@ EDIT_STEP_TITLE = "✏️ Edit Step"
 SAVE_BUTTON = "💾 Save"
 CANCEL_BUTTON = "❌ Cancel"
 RESET_ERROR_STATE = "🔄 Reset Error State"
+CANCEL_RUN_BUTTON = "⏹️ Cancel Run"
 
 # --------- Agent Configuration ---------
-AGENT_TASK_PREFIX = "Execute the following stock screening task: {task}. Steps: {steps}" 
\ No newline at end of file
+AGENT_TASK_PREFIX = "Execute the following stock screening task: {task}. Steps: {steps}" 
+
+# --------- Screener.in Metric Names ---------
+# Ratio names on screener.in and the ways prompts refer to them
+METRIC_SYNONYMS = {
+    'Price to earning': ['p/e', 'pe', 'p/e ratio', 'pe ratio', 'price to earnings?', 'price/earnings?',
+                         'price earnings? ratio'],
+    'Market Capitalization': ['market cap', 'market capitali[sz]ation', 'mcap', 'm-cap'],
+    'Return on equity': ['roe', 'return on equity'],
+    'Return on capital employed': ['roce', 'return on capital employed'],
+    'Debt to equity': ['debt to equity', 'debt/equity', 'd/e', 'debt to equity ratio'],
+    'Dividend yield': ['dividend yield'],
+    'Price to book value': ['p/b', 'pb', 'p/b ratio', 'pb ratio', 'price to book', 'price to book value'],
+    'Current price': ['current price', 'share price', 'stock price'],
+    'PEG Ratio': ['peg', 'peg ratio'],
+    'Sales growth 3Years': ['sales growth', 'revenue growth'],
+    'Profit growth 3Years': ['profit growth', 'earnings growth'],
+    'Promoter holding': ['promoter holding', 'promoter stake'],
+    'Current ratio': ['current ratio'],
+    'EPS': ['eps', 'earnings per share'],
+}
+# Longest synonyms first, so "p/e ratio" wins over "p/e" and "peg" over "pe"
+METRIC_PATTERN = re.compile(
+    r'(?<![\w/])(?:' + '|'.join(
+        sorted((s for synonyms in METRIC_SYNONYMS.values() for s in synonyms), key=len, reverse=True)
+    ) + r')(?![\w/])'
+)
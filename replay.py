@@ -0,0 +1,431 @@
+# HTTP and LLM record/replay for the Workflow Automator
+#
+# A cassette holds what one workflow run received from the outside world: the
+# HTTP responses served to the agent's browser, as a HAR file, and the LLM
+# responses, as JSONL. A run recorded once against live screener.in and OpenAI
+# can then be replayed offline and deterministically, which makes agent step
+# latency, memory and throughput measurable without the network.
+#
+# Cassettes never contain credentials: request bodies are stored as digests,
+# cookies are dropped and LLM prompts are stored as digests only.
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
+
+from config import REPLAY_MODE, REPLAY_DIR, REPLAY_CASSETTE, LLM_MODEL, NETWORK_PROFILE_ENABLED
+from network_profile import NetworkInterceptor, NetworkProfile
+
+MODE_RECORD = 'record'
+MODE_REPLAY = 'replay'
+
+HAR_FILE = 'http.har'
+LLM_FILE = 'llm.jsonl'
+META_FILE = 'meta.json'
+
+# Response headers that are not recorded: body framing no longer matches the
+# stored body, and cookies would put a logged-in session on disk
+DROPPED_RESPONSE_HEADERS = ('content-length', 'content-encoding', 'transfer-encoding', 'set-cookie', 'connection',
+                            'keep-alive')
+
+# Call kinds in an LLM recording
+CALL_AGENT = 'agent'          # browser-use chat model: ainvoke(messages, output_format)
+CALL_INVOKE = 'invoke'        # langchain chat model: ainvoke(prompt)
+CALL_STREAM = 'stream'        # langchain chat model: astream(prompt)
+
+
+class ReplayMiss(LookupError):
+    """A replayed run asked for something the cassette does not contain."""
+
+
+def _digest(text):
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+
+
+def _strip_query(url):
+    scheme, netloc, path, _, _ = urlsplit(url)
+    return urlunsplit((scheme, netloc, path, '', ''))
+
+
+class HttpArchive:
+    """Recorded HTTP responses in HAR 1.2 form, looked up by method, URL and request body."""
+
+    def __init__(self, entries=None):
+        self.entries = []
+        self._index = {}
+        self._served = {}
+        for entry in entries or []:
+            self._add_entry(entry)
+
+    @staticmethod
+    def _keys(method, url, body_digest):
+        # Most to least specific: the body digest tells apart form posts, and the
+        # query is dropped last so cache-busting parameters still match
+        return [(method, url, body_digest), (method, url), (method, _strip_query(url))]
+
+    def _add_entry(self, entry):
+        self.entries.append(entry)
+        request = entry['request']
+        for key in self._keys(request['method'], request['url'], request.get('_bodyDigest', '')):
+            self._index.setdefault(key, []).append(entry)
+
+    def add(self, method, url, post_data, status, status_text, headers, body, mime_type=''):
+        """Record one response."""
+        self._add_entry({
+            'startedDateTime': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime()),
+            'time': 0,
+            'request': {
+                'method': method, 'url': url, 'httpVersion': 'HTTP/1.1', 'headers': [], 'queryString': [],
+                'cookies': [], 'headersSize': -1, 'bodySize': len(post_data or ''),
+                '_bodyDigest': _digest(post_data),
+            },
+            'response': {
+                'status': status, 'statusText': status_text, 'httpVersion': 'HTTP/1.1',
+                'headers': [header for header in headers if header['name'].lower() not in DROPPED_RESPONSE_HEADERS],
+                'cookies': [], 'redirectURL': '', 'headersSize': -1, 'bodySize': len(body),
+                'content': {
+                    'size': len(body), 'mimeType': mime_type,
+                    'text': base64.b64encode(body).decode('ascii'), 'encoding': 'base64',
+                },
+            },
+            'cache': {},
+            'timings': {'send': 0, 'wait': 0, 'receive': 0},
+        })
+
+    def lookup(self, method, url, post_data=None):
+        """The response to serve for a request, or None.
+
+        Repeated requests for the same key are served the recorded responses in
+        order, then the last one again.
+        """
+        for key in self._keys(method, url, _digest(post_data)):
+            entries = self._index.get(key)
+            if entries:
+                served = self._served.get(key, 0)
+                self._served[key] = served + 1
+                return entries[min(served, len(entries) - 1)]
+        return None
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f)['log']['entries'])
+
+    def save(self, path):
+        har = {'log': {'version': '1.2', 'creator': {'name': 'workflow-automator', 'version': '1'},
+                       'entries': self.entries}}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(har, f)
+
+
+class RecordingInterceptor(NetworkInterceptor):
+    """Applies the network profile and records every response that reaches the browser."""
+
+    def __init__(self, archive, profile=None):
+        super().__init__(profile)
+        self.archive = archive
+
+    def _patterns(self):
+        return [{'urlPattern': '*', 'requestStage': 'Request'}, {'urlPattern': '*', 'requestStage': 'Response'}]
+
+    async def _handle_response(self, client, event, session_id):
+        request_id = event['requestId']
+        status = event.get('responseStatusCode')
+        if status is not None:
+            try:
+                response = await client.send.Fetch.getResponseBody(
+                    params={'requestId': request_id}, session_id=session_id
+                )
+                body = base64.b64decode(response['body']) if response.get('base64Encoded') else response['body'].encode()
+            except Exception:
+                # Redirects and empty responses have no body
+                body = b''
+            headers = event.get('responseHeaders', [])
+            mime_type = next((header['value'] for header in headers if header['name'].lower() == 'content-type'), '')
+            request = event['request']
+            self.archive.add(request['method'], request['url'], request.get('postData'), status,
+                             event.get('responseStatusText', ''), headers, body, mime_type)
+        await client.send.Fetch.continueRequest(params={'requestId': request_id}, session_id=session_id)
+
+
+class ReplayInterceptor(NetworkInterceptor):
+    """Applies the network profile and serves every request from a recorded archive, never the network."""
+
+    def __init__(self, archive, profile=None):
+        super().__init__(profile)
+        self.archive = archive
+        self.stats['replay_misses'] = 0
+
+    def _patterns(self):
+        return [{'urlPattern': '*', 'requestStage': 'Request'}]
+
+    async def _allow_request(self, client, event, session_id):
+        request = event['request']
+        entry = self.archive.lookup(request['method'], request['url'], request.get('postData'))
+        if entry is None:
+            self.stats['replay_misses'] += 1
+            await self._fallback(client, event['requestId'], session_id)
+            return
+
+        response = entry['response']
+        await client.send.Fetch.fulfillRequest(
+            params={
+                'requestId': event['requestId'],
+                'responseCode': response['status'],
+                'responseHeaders': response['headers'],
+                'body': response['content']['text'],
+            },
+            session_id=session_id
+        )
+
+    async def _fallback(self, client, request_id, session_id):
+        await client.send.Fetch.failRequest(
+            params={'requestId': request_id, 'errorReason': 'InternetDisconnected'}, session_id=session_id
+        )
+
+
+def _prompt_digest(messages):
+    """Digest of a prompt string or a list of chat messages, ignoring images."""
+    if isinstance(messages, str):
+        return _digest(messages)
+    parts = []
+    for message in messages:
+        text = getattr(message, 'text', None)
+        parts.append(text if isinstance(text, str) else str(getattr(message, 'content', message)))
+    return _digest('\n'.join(parts))
+
+
+class LLMRecording:
+    """Recorded LLM calls, replayed by prompt digest or else in recorded order."""
+
+    def __init__(self, calls=None):
+        self.calls = list(calls or [])
+        self._used = set()
+        self._cursor = {}
+
+    def add(self, kind, messages, completion, completion_format='text', usage=None):
+        self.calls.append({'kind': kind, 'key': _prompt_digest(messages), 'completion': completion,
+                           'format': completion_format, 'usage': usage})
+
+    def take(self, kind, messages):
+        """The next unused recorded call of this kind, preferring one with the same prompt."""
+        key = _prompt_digest(messages)
+        for i, call in enumerate(self.calls):
+            if i not in self._used and call['kind'] == kind and call['key'] == key:
+                self._used.add(i)
+                return call
+
+        # Agent prompts carry timestamps and step state, so replay falls back to call order
+        for i in range(self._cursor.get(kind, 0), len(self.calls)):
+            if i not in self._used and self.calls[i]['kind'] == kind:
+                self._used.add(i)
+                self._cursor[kind] = i + 1
+                return self.calls[i]
+        raise ReplayMiss(f"No recorded {kind} LLM call left")
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.loads(line) for line in f if line.strip())
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for call in self.calls:
+                f.write(json.dumps(call) + '\n')
+
+
+class RecordingLLM:
+    """Wraps a chat model and records its responses.
+
+    Works for both the browser-use `ChatOpenAI` (`ainvoke(messages, output_format)`)
+    and the langchain `ChatOpenAI` (`ainvoke(prompt)` and `astream(prompt)`).
+    """
+
+    def __init__(self, llm, recording, langchain=False):
+        self._llm = llm
+        self._recording = recording
+        self._langchain = langchain
+
+    def __getattr__(self, name):
+        return getattr(self._llm, name)
+
+    async def ainvoke(self, messages, output_format=None, **kwargs):
+        if self._langchain:
+            result = await self._llm.ainvoke(messages, **kwargs)
+            self._recording.add(CALL_INVOKE, messages, result.content)
+            return result
+
+        result = await self._llm.ainvoke(messages, output_format, **kwargs)
+        completion = result.completion
+        if isinstance(completion, str):
+            self._recording.add(CALL_AGENT, messages, completion, usage=_usage_dict(result.usage))
+        else:
+            self._recording.add(CALL_AGENT, messages, completion.model_dump_json(exclude_unset=True), 'json',
+                                usage=_usage_dict(result.usage))
+        return result
+
+    async def astream(self, prompt, **kwargs):
+        text = ''
+        async for chunk in self._llm.astream(prompt, **kwargs):
+            text += chunk.content
+            yield chunk
+        self._recording.add(CALL_STREAM, prompt, text)
+
+
+def _usage_dict(usage):
+    return usage.model_dump() if usage is not None else None
+
+
+class ReplayLLM:
+    """Chat model stand-in that answers from an LLM recording, never the API."""
+
+    _verified_api_keys = True
+
+    def __init__(self, recording, model=LLM_MODEL, langchain=False):
+        self._recording = recording
+        self.model = model
+        self._langchain = langchain
+
+    @property
+    def provider(self):
+        return 'replay'
+
+    @property
+    def name(self):
+        return self.model
+
+    @property
+    def model_name(self):
+        return self.model
+
+    async def ainvoke(self, messages, output_format=None, **kwargs):
+        if self._langchain:
+            from langchain_core.messages import AIMessage
+            return AIMessage(content=self._recording.take(CALL_INVOKE, messages)['completion'])
+
+        from browser_use.llm.views import ChatInvokeCompletion, ChatInvokeUsage
+
+        call = self._recording.take(CALL_AGENT, messages)
+        completion = call['completion']
+        if call['format'] == 'json':
+            if output_format is None:
+                raise ReplayMiss("Recorded a structured LLM call, replayed as plain text")
+            completion = output_format.model_validate_json(completion)
+        usage = ChatInvokeUsage(**call['usage']) if call.get('usage') else None
+        return ChatInvokeCompletion(completion=completion, usage=usage)
+
+    async def astream(self, prompt, **kwargs):
+        from langchain_core.messages import AIMessageChunk
+
+        # Line by line, so streaming consumers see the same shape as live output
+        for line in self._recording.take(CALL_STREAM, prompt)['completion'].splitlines(keepends=True):
+            yield AIMessageChunk(content=line)
+
+
+class Cassette:
+    """One recorded run on disk: its HTTP archive, LLM calls and metadata."""
+
+    def __init__(self, name, mode, directory=REPLAY_DIR):
+        if mode not in (MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"Unknown replay mode '{mode}'")
+        self.name = name
+        self.mode = mode
+        self.path = Path(directory) / name
+        self.meta = {}
+        if mode == MODE_REPLAY:
+            if not (self.path / HAR_FILE).exists():
+                raise FileNotFoundError(f"No cassette recorded at {self.path}")
+            self.archive = HttpArchive.load(self.path / HAR_FILE)
+            self.llm_calls = LLMRecording.load(self.path / LLM_FILE)
+            self.meta = json.loads((self.path / META_FILE).read_text(encoding='utf-8'))
+        else:
+            self.archive = HttpArchive()
+            self.llm_calls = LLMRecording()
+
+    @property
+    def replaying(self):
+        return self.mode == MODE_REPLAY
+
+    def interceptor(self, profile=None):
+        """Network interceptor that records to or replays from this cassette."""
+        if profile is None:
+            profile = NetworkProfile() if NETWORK_PROFILE_ENABLED else NetworkProfile.allow_all()
+        if self.replaying:
+            return ReplayInterceptor(self.archive, profile)
+        return RecordingInterceptor(self.archive, profile)
+
+    def wrap_llm(self, llm, langchain=False):
+        """Chat model that records `llm`'s responses, or replays them without calling it."""
+        if self.replaying:
+            return ReplayLLM(self.llm_calls, model=self.meta.get('model', LLM_MODEL), langchain=langchain)
+        return RecordingLLM(llm, self.llm_calls, langchain=langchain)
+
+    def save(self, **meta):
+        """Write a recorded cassette to disk."""
+        if self.replaying:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.archive.save(self.path / HAR_FILE)
+        self.llm_calls.save(self.path / LLM_FILE)
+        self.meta = {'model': LLM_MODEL, 'recorded_at': time.time(), **meta}
+        (self.path / META_FILE).write_text(json.dumps(self.meta, indent=2), encoding='utf-8')
+        print(f"✅ Recorded cassette '{self.name}': {len(self.archive.entries)} responses, "
+              f"{len(self.llm_calls.calls)} LLM calls")
+
+
+def configured_cassette():
+    """The cassette selected by REPLAY_MODE, or None for live runs."""
+    if not REPLAY_MODE:
+        return None
+    return Cassette(REPLAY_CASSETTE, REPLAY_MODE)
+
+
+# Placeholder credentials for replayed runs; the recorded login response is served regardless
+REPLAY_CREDENTIALS = {'email': 'replay@example.com', 'password': 'replay'}
+
+
+async def run_cassette(cassette, query=None, sensitive_data=None):
+    """Run execute_workflow once against a cassette; returns the agent history and run id."""
+    from browser import execute_workflow
+    from event_channel import EventChannel
+    from screenshot_store import ScreenshotStore
+    import uuid
+
+    query = query or cassette.meta['query']
+    channel = EventChannel(f"{cassette.mode}-{uuid.uuid4().hex[:8]}")
+    result = await execute_workflow(query, sensitive_data or REPLAY_CREDENTIALS, channel, ScreenshotStore(),
+                                    cassette=cassette)
+    return result, channel.run_id
+
+
+def main():
+    """Record a live run to a cassette, or replay one offline."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('mode', choices=[MODE_RECORD, MODE_REPLAY])
+    parser.add_argument('--name', default=REPLAY_CASSETTE, help='Cassette name')
+    parser.add_argument('--query', help='Workflow to record (defaults to the recorded one when replaying)')
+    args = parser.parse_args()
+
+    if args.mode == MODE_RECORD:
+        if not args.query:
+            parser.error("--query is required when recording")
+        sensitive_data = {'email': os.environ['SCREENER_EMAIL'], 'password': os.environ['SCREENER_PASSWORD']}
+    else:
+        # The model clients are built at import; replay never calls them
+        os.environ.setdefault('OPENAI_API_KEY', 'replay')
+        sensitive_data = None
+
+    cassette = Cassette(args.name, args.mode)
+    print(f"🚀 {args.mode.capitalize()}ing cassette '{args.name}'...")
+    result, _ = asyncio.run(run_cassette(cassette, args.query, sensitive_data))
+    print(f"📊 {result.number_of_steps()} steps, done={result.is_done()}: {result.final_result()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# Execution result cache for the Workflow Automator
+#
+# Identical workflows (the same execution prompt, up to whitespace, run by
+# the same app user with the same screener.in credentials) are served from the
+# run history when a recent enough run succeeded, instead of driving the
+# browser again. How recent is up to the user: each request carries its own
+# freshness window. Identical requests that arrive while one is queued or
+# running join that run rather than starting another (single flight).
+
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from pathlib import Path
+
+from config import RESULT_CACHE_ENABLED, RESULT_CACHE_SECRET_PATH
+from llm_cache import normalize_prompt
+from run_store import get_run_store
+
+
+_secret = None
+_secret_lock = threading.Lock()
+
+
+def scope_secret(path=RESULT_CACHE_SECRET_PATH):
+    """Key for credential scopes, created on first use and shared by the app and its workers."""
+    global _secret
+
+    with _secret_lock:
+        if _secret is None:
+            path = Path(path)
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                    with os.fdopen(fd, 'wb') as f:
+                        f.write(secrets.token_bytes(32))
+                except FileExistsError:
+                    # Another process created it first
+                    pass
+            _secret = path.read_bytes()
+        return _secret
+
+
+def credential_scope(sensitive_data, app_user=None):
+    """Opaque id of the app user and the screener.in credentials a run uses.
+
+    The password is part of it, so typing another person's email never matches
+    their runs; it is keyed with `scope_secret` so the run history holds no
+    password hash that could be attacked offline.
+    """
+    sensitive_data = sensitive_data or {}
+    material = '\0'.join([
+        app_user or '', sensitive_data.get('email', '').strip().casefold(), sensitive_data.get('password', '')
+    ])
+    return hmac.new(scope_secret(), material.encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+
+
+def result_cache_key(combined_prompt, sensitive_data, app_user=None):
+    """Cache key of an execution: the normalized execution prompt and the user's credential scope."""
+    material = f"{credential_scope(sensitive_data, app_user)}\0{normalize_prompt(combined_prompt)}"
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """Serves recent successful runs from the run store and deduplicates in-flight runs."""
+
+    def __init__(self, store=None, enabled=RESULT_CACHE_ENABLED):
+        self.store = store if store is not None else get_run_store()
+        self.enabled = enabled
+        self.stats = {'hits': 0, 'misses': 0, 'joined': 0, 'refreshes': 0}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def lookup(self, key, max_age):
+        """The latest successful run for `key` that finished within `max_age` seconds, or None."""
+        if not self.enabled or not max_age or max_age <= 0:
+            return None
+        run = self.store.latest_result(key, time.time() - max_age)
+        self._count('hits' if run else 'misses')
+        return run
+
+    def single_flight(self, key, is_active, submit, force_refresh=False):
+        """Join the queued or running run for `key`, or start one with `submit()`.
+
+        Returns `(run_id, joined)`. `is_active(run_id)` tells whether a
+        tracked run is still queued or running. A forced refresh still joins
+        an in-flight run, since its result will be the freshest available.
+        """
+        with self._lock:
+            run_id = self._inflight.get(key) if self.enabled else None
+            if run_id is not None and is_active(run_id):
+                self.stats['joined'] += 1
+                return run_id, True
+            if force_refresh:
+                self.stats['refreshes'] += 1
+            run_id = submit()
+            self._inflight[key] = run_id
+            return run_id, False
+
+    def release(self, key, run_id):
+        """Stop tracking a finished run."""
+        with self._lock:
+            if self._inflight.get(key) == run_id:
+                del self._inflight[key]
+
+    def get_metrics(self):
+        with self._lock:
+            metrics = dict(self.stats)
+            metrics['inflight'] = len(self._inflight)
+        lookups = metrics['hits'] + metrics['misses']
+        metrics['hit_rate'] = metrics['hits'] / lookups if lookups else 0.0
+        return metrics
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Get the process-wide result cache."""
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
+
+
+def format_freshness(seconds):
+    """Label of a freshness window, e.g. "15 minutes"."""
+    if not seconds:
+        return "Always run fresh"
+    for unit, size in (('day', 86400), ('hour', 3600), ('minute', 60)):
+        if seconds >= size and seconds % size == 0:
+            count = seconds // size
+            return f"{count} {unit}{'s' if count != 1 else ''}"
+    return f"{seconds} seconds"
+
+
+def format_result_cache_metrics(metrics):
+    """Format result cache metrics as a short status line."""
+    return (
+        f"hits={metrics['hits']} misses={metrics['misses']} hit_rate={metrics['hit_rate']:.0%} "
+        f"joined={metrics['joined']} refreshes={metrics['refreshes']} inflight={metrics['inflight']}"
+    )
@@ -0,0 +1,146 @@
+# Result tables for the Workflow Automator
+#
+# Rows read from screener.in results tables in the DOM, kept as Arrow record
+# batches as each page arrives and typed once the last page is in: columns
+# whose cells all read as numbers ("1,234.5", "12%") become float columns,
+# the rest stay text. A run's table is saved as Parquet next to the other run
+# data, so the UI and worker processes share it without sending rows through
+# the event channel or the LLM.
+
+import io
+import re
+import time
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from config import RESULT_TABLE_DIR, RESULT_TABLE_RETENTION
+
+NUMBER_PATTERN = re.compile(r'^[+-]?(?:\d[\d,]*)?(?:\.\d*)?%?$')
+# Cells screener.in uses for a missing value
+EMPTY_CELLS = frozenset(['', '-', '--', '—', 'NA', 'N/A'])
+
+
+def parse_number(text):
+    """Value of a numeric cell, None for an empty one; raises ValueError for text."""
+    text = text.strip()
+    if text in EMPTY_CELLS:
+        return None
+    if not NUMBER_PATTERN.match(text) or not any(c.isdigit() for c in text):
+        raise ValueError(text)
+    return float(text.replace(',', '').rstrip('%'))
+
+
+def clean_headers(headers):
+    """Single-line column names, made unique."""
+    names = []
+    for i, header in enumerate(headers):
+        name = ' '.join(str(header).split()) or f"Column {i + 1}"
+        base, n = name, 2
+        while name in names:
+            name, n = f"{base} ({n})", n + 1
+        names.append(name)
+    return names
+
+
+class ResultTable:
+    """Rows of a results table, collected page by page."""
+
+    def __init__(self):
+        self.columns = None
+        self.batches = []
+        self.pages = 0
+
+    @property
+    def num_rows(self):
+        return sum(batch.num_rows for batch in self.batches)
+
+    def add_page(self, headers, rows):
+        """Append one page of rows; later pages are aligned to the first page's columns."""
+        if self.columns is None:
+            width = len(headers) or max((len(row) for row in rows), default=0)
+            self.columns = clean_headers(headers or [''] * width)
+        width = len(self.columns)
+        rows = [[str(cell) for cell in row[:width]] + [''] * (width - len(row)) for row in rows]
+        arrays = [pa.array([row[i] for row in rows], pa.string()) for i in range(width)]
+        self.batches.append(pa.RecordBatch.from_arrays(arrays, names=self.columns))
+        self.pages += 1
+        return len(rows)
+
+    def to_arrow(self):
+        """The rows as an Arrow table with numeric columns typed as floats."""
+        if not self.columns:
+            return pa.table({})
+        table = pa.Table.from_batches(self.batches, schema=pa.schema([(name, pa.string()) for name in self.columns]))
+        for i, name in enumerate(self.columns):
+            cells = table.column(i).to_pylist()
+            try:
+                values = [parse_number(cell) for cell in cells]
+            except ValueError:
+                continue
+            if any(value is not None for value in values):
+                table = table.set_column(i, name, pa.array(values, pa.float64()))
+        return table
+
+    def to_pandas(self):
+        return self.to_arrow().to_pandas()
+
+    def save(self, path):
+        """Write the table as Parquet; returns the path."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(self.to_arrow(), path)
+        return str(path)
+
+    def markdown(self, max_rows=25):
+        """The first `max_rows` rows as a markdown table."""
+        table = self.to_arrow().slice(0, max_rows)
+        escape = lambda cell: '' if cell is None else str(cell).replace('|', '\\|').replace('\n', ' ')
+        lines = ['| ' + ' | '.join(escape(name) for name in table.column_names) + ' |',
+                 '|' + '---|' * table.num_columns]
+        for row in zip(*(column.to_pylist() for column in table.columns)):
+            lines.append('| ' + ' | '.join(escape(_format_cell(cell)) for cell in row) + ' |')
+        return '\n'.join(lines)
+
+
+def _format_cell(cell):
+    if isinstance(cell, float):
+        return str(int(cell)) if cell.is_integer() else f"{cell:g}"
+    return cell
+
+
+def result_table_path(run_id, directory=RESULT_TABLE_DIR):
+    """Where a run's result table is saved."""
+    return Path(directory) / f"{run_id}.parquet"
+
+
+def load_result_table(path):
+    """A saved result table as a pandas DataFrame."""
+    return pq.read_table(path).to_pandas()
+
+
+def table_to_csv(path):
+    """A saved result table as CSV bytes."""
+    buffer = io.BytesIO()
+    pa_csv.write_csv(pq.read_table(path), buffer)
+    return buffer.getvalue()
+
+
+def prune_result_tables(directory=RESULT_TABLE_DIR, max_age=RESULT_TABLE_RETENTION):
+    """Delete result tables of runs older than `max_age` seconds."""
+    directory = Path(directory)
+    if not directory.exists():
+        return 0
+
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in directory.glob('*.parquet'):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except OSError:
+            continue
+    return removed
@@ -0,0 +1,235 @@
+# Run history for the Workflow Automator
+#
+# Every workflow run, whether started from the app, a batch or a worker
+# process, is recorded in a local SQLite database: the user's prompt, the
+# approved steps, the execution prompt, timings, the result text, the results
+# table and screenshot references, and one entry per step. Runs are indexed by
+# user, time and normalized prompt, with full-text search over prompts, steps
+# and results, so past results can be looked up instead of run again.
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from config import RUN_STORE_ENABLED, RUN_STORE_PATH, RUN_STORE_RETENTION
+from event_channel import EVENT_STEP_START, EVENT_STEP_END, EVENT_SCREENSHOT
+from plan_library import plan_key
+
+# Run outcomes, as recorded by the run tracer
+RUN_RUNNING = 'running'
+RUN_SUCCEEDED = 'succeeded'
+RUN_FAILED = 'failed'
+RUN_CANCELLED = 'cancelled'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    app_user TEXT NOT NULL DEFAULT '',
+    prompt TEXT NOT NULL,
+    prompt_key TEXT NOT NULL,
+    combined_prompt TEXT,
+    cache_key TEXT,
+    steps TEXT NOT NULL DEFAULT '[]',
+    status TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    duration_s REAL,
+    agent_steps INTEGER,
+    direct INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    table_path TEXT,
+    thoughts TEXT NOT NULL DEFAULT '[]',
+    screenshots TEXT NOT NULL DEFAULT '[]',
+    metrics TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_runs_user_started ON runs (app_user, started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs (started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_prompt_key ON runs (prompt_key, started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_cache_key ON runs (cache_key, finished_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS runs_fts USING fts5(
+    prompt, steps, result, content='runs', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS runs_fts_insert AFTER INSERT ON runs BEGIN
+    INSERT INTO runs_fts (rowid, prompt, steps, result) VALUES (new.rowid, new.prompt, new.steps, new.result);
+END;
+CREATE TRIGGER IF NOT EXISTS runs_fts_delete AFTER DELETE ON runs BEGIN
+    INSERT INTO runs_fts (runs_fts, rowid, prompt, steps, result)
+    VALUES ('delete', old.rowid, old.prompt, old.steps, old.result);
+END;
+CREATE TRIGGER IF NOT EXISTS runs_fts_update AFTER UPDATE OF prompt, steps, result ON runs BEGIN
+    INSERT INTO runs_fts (runs_fts, rowid, prompt, steps, result)
+    VALUES ('delete', old.rowid, old.prompt, old.steps, old.result);
+    INSERT INTO runs_fts (rowid, prompt, steps, result) VALUES (new.rowid, new.prompt, new.steps, new.result);
+END;
+"""
+
+# Columns of a run summary; the full record adds the step log, screenshots and metrics
+SUMMARY_COLUMNS = (
+    'run_id', 'app_user', 'prompt', 'status', 'started_at', 'finished_at', 'duration_s', 'agent_steps', 'direct',
+    'error', 'table_path',
+)
+JSON_COLUMNS = ('steps', 'thoughts', 'screenshots', 'metrics')
+
+
+def fts_query(text):
+    """An FTS5 query matching every word of `text`, the last one as a prefix."""
+    words = [word.replace('"', '""') for word in text.split()]
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def summarize_events(events):
+    """The step log and screenshot references of a run, from its channel events."""
+    steps = {}
+    screenshots = []
+    for event in events:
+        if event.kind == EVENT_STEP_START:
+            steps[event.data['step']] = {'step': event.data['step'], 'goal': event.data.get('goal'),
+                                         'started_at': event.ts, 'action': None, 'result': None}
+        elif event.kind == EVENT_STEP_END and event.data['step'] in steps:
+            steps[event.data['step']].update(action=event.data.get('action'), result=event.data.get('result'))
+        elif event.kind == EVENT_SCREENSHOT:
+            screenshots.append(event.data['frame'])
+    return list(steps.values()), screenshots
+
+
+class RunStore:
+    """SQLite store of workflow runs with indexed lookups and full-text search."""
+
+    def __init__(self, db_path=RUN_STORE_PATH, retention=RUN_STORE_RETENTION, enabled=RUN_STORE_ENABLED):
+        self.db_path = str(db_path)
+        self.retention = retention
+        self.enabled = enabled
+        self._local = threading.local()
+
+        if self.enabled:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = self._connect()
+            conn.execute("PRAGMA journal_mode=WAL")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(runs)")}
+            if columns and 'cache_key' not in columns:
+                # Run stores created before the result cache
+                conn.execute("ALTER TABLE runs ADD COLUMN cache_key TEXT")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        """Per-thread connection in autocommit mode."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def start_run(self, run_id, prompt, app_user=None, combined_prompt=None, steps=None, cache_key=None):
+        """Record a run as started, and drop runs older than the retention period."""
+        if not self.enabled:
+            return
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO runs (run_id, app_user, prompt, prompt_key, combined_prompt, cache_key, steps, "
+            "status, started_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (run_id, app_user or '', prompt, plan_key(prompt), combined_prompt, cache_key,
+             json.dumps(list(steps or [])), RUN_RUNNING, now)
+        )
+        if self.retention:
+            conn.execute("DELETE FROM runs WHERE started_at < ?", (now - self.retention,))
+
+    def finish_run(self, run_id, status, result=None, error=None, agent_steps=None, direct=False, table_path=None,
+                   events=(), metrics=None):
+        """Record a run's outcome, with its step log and screenshots taken from its channel events."""
+        if not self.enabled:
+            return
+        thoughts, screenshots = summarize_events(events)
+        now = time.time()
+        self._connect().execute(
+            "UPDATE runs SET status = ?, finished_at = ?, duration_s = ? - started_at, agent_steps = ?, direct = ?, "
+            "result = ?, error = ?, table_path = ?, thoughts = ?, screenshots = ?, metrics = ? WHERE run_id = ?",
+            (status, now, now, agent_steps, int(bool(direct)), result, error, table_path, json.dumps(thoughts),
+             json.dumps(screenshots), json.dumps(metrics or {}), run_id)
+        )
+
+    def _summaries(self, where, params, order='r.started_at DESC', limit=20, join=''):
+        columns = ', '.join(f"r.{column}" for column in SUMMARY_COLUMNS)
+        rows = self._connect().execute(
+            f"SELECT {columns}, substr(r.result, 1, 200) AS result_preview FROM runs r {join} "
+            f"WHERE {where} ORDER BY {order} LIMIT ?",
+            (*params, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def recent(self, app_user=None, limit=20):
+        """A user's latest runs, newest first."""
+        if not self.enabled:
+            return []
+        return self._summaries("r.app_user = ?", (app_user or '',), limit=limit)
+
+    def search(self, text, app_user=None, limit=20):
+        """A user's runs whose prompt, steps or result contain every word of `text`, best matches first."""
+        query = fts_query(text)
+        if not self.enabled or query is None:
+            return []
+        return self._summaries(
+            "runs_fts MATCH ? AND r.app_user = ?", (query, app_user or ''),
+            order='bm25(runs_fts), r.started_at DESC', limit=limit, join="JOIN runs_fts ON runs_fts.rowid = r.rowid"
+        )
+
+    def runs_for_prompt(self, prompt, app_user=None, status=None, limit=20):
+        """A user's runs of the same prompt (up to whitespace and case), newest first."""
+        if not self.enabled:
+            return []
+        where, params = "r.prompt_key = ? AND r.app_user = ?", [plan_key(prompt), app_user or '']
+        if status:
+            where += " AND r.status = ?"
+            params.append(status)
+        return self._summaries(where, params, limit=limit)
+
+    def latest_result(self, cache_key, since):
+        """Full record of the latest run for `cache_key` that succeeded with a result after `since`, or None."""
+        if not self.enabled:
+            return None
+        row = self._connect().execute(
+            "SELECT run_id FROM runs WHERE cache_key = ? AND finished_at >= ? AND status = ? "
+            "AND result IS NOT NULL AND error IS NULL ORDER BY finished_at DESC LIMIT 1",
+            (cache_key, since, RUN_SUCCEEDED)
+        ).fetchone()
+        return self.get_run(row[0]) if row else None
+
+    def get_run(self, run_id):
+        """The full record of a run, or None."""
+        if not self.enabled:
+            return None
+        row = self._connect().execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        for column in JSON_COLUMNS:
+            record[column] = json.loads(record[column]) if record[column] else None
+        return record
+
+    def count(self):
+        if not self.enabled:
+            return 0
+        return self._connect().execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_run_store():
+    """Get the process-wide run store."""
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            _store = RunStore()
+        return _store
@@ -0,0 +1,316 @@
+# Direct screen queries for the Workflow Automator
+#
+# Compiles approved workflow steps such as "Set P/E ratio filter to less than
+# 15" into a screener.in screen query ("Price to earning < 15 AND ...") and
+# runs it by opening the query's results pages and reading their tables from
+# the DOM, with no LLM calls.
+# Compilation is conservative: a step with any word it cannot account for
+# (a sector, a sort order, an export, ...) fails it, and the workflow runs
+# with the browser agent instead.
+
+import asyncio
+import json
+import math
+import re
+import time
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+from config import DIRECT_QUERY_URL, DIRECT_QUERY_TIMEOUT, DIRECT_QUERY_RESULT_LIMIT, RESULT_TABLE_MAX_PAGES
+from prompts import METRIC_SYNONYMS, METRIC_PATTERN
+from result_table import ResultTable
+
+
+class ScreenCompileError(ValueError):
+    """The steps cannot be expressed as a screen query."""
+
+
+class ScreenQueryError(RuntimeError):
+    """Running a compiled screen query in the browser failed."""
+
+
+_METRIC_PATTERNS = {
+    field: re.compile('|'.join(synonyms)) for field, synonyms in METRIC_SYNONYMS.items()
+}
+
+NUMBER = r'(-?\d[\d,]*(?:\.\d+)?)\s*(lakh crores?|lakh cr|lac crores?|lac cr|thousand crores?|crores?|cr|%|percent)?'
+LESS_THAN = r'less than|lower than|smaller than|below|under|<'
+GREATER_THAN = r'greater than|more than|higher than|above|over|exceeding|>'
+BETWEEN_PATTERN = re.compile(r'\bbetween\s+' + NUMBER + r'\s+(?:and|to|-)\s+' + NUMBER)
+COMPARISON_PATTERN = re.compile(r'(' + LESS_THAN + '|' + GREATER_THAN + r')\s*' + NUMBER)
+UNIT_MULTIPLIERS = {'lakh': 100000, 'lac': 100000, 'thousand': 1000}
+
+# Words a step may use around its filters; anything else means the step asks
+# for something a screen query cannot do
+PROCEDURAL_WORDS = frozenset(
+    'a an the to and with of for on in at from by into as then also all any its it them these those that this '
+    'is are be should has have having than value values ratio filter filters set setting enter type input add '
+    'field box condition conditions criteria criterion navigate go open visit website site page www com screener '
+    'log login sign using use credentials provided email password account click button apply applied run '
+    'execute submit query screen screens create new custom search results result filtered give show display '
+    'return list view extract table matching match stocks stock companies company wait load loaded until '
+    'appear appears finally next first please your their '.split()
+)
+
+
+def _number(text, unit):
+    """Value of a number in screener.in units: crores for amounts, plain numbers for percentages."""
+    value = float(text.replace(',', ''))
+    if unit:
+        value *= UNIT_MULTIPLIERS.get(unit.split()[0], 1)
+    return value
+
+
+def _format_number(value):
+    return str(int(value)) if value == int(value) else f"{value:.4f}".rstrip('0')
+
+
+def _operator(word):
+    return '<' if re.fullmatch(LESS_THAN, word) else '>'
+
+
+class ScreenQuery:
+    """A compiled screen query: its conditions, query text and results URL."""
+
+    def __init__(self, conditions, base_url=DIRECT_QUERY_URL, limit=DIRECT_QUERY_RESULT_LIMIT):
+        self.conditions = conditions
+        self.query = ' AND\n'.join(f"{field} {op} {_format_number(value)}" for field, op, value in conditions)
+        params = {'sort': '', 'order': '', 'source_id': '', 'query': self.query}
+        if limit:
+            params['limit'] = limit
+        self.url = f"{base_url}?{urlencode(params)}"
+
+    def describe(self):
+        """The query on one line, for logs and the thought log."""
+        return self.query.replace(' AND\n', ' AND ')
+
+
+def _parse_comparisons(segment):
+    """Comparisons in the text after a metric, with the spans they cover."""
+    clauses, spans = [], []
+    for match in BETWEEN_PATTERN.finditer(segment):
+        low, high = sorted([_number(match.group(1), match.group(2)), _number(match.group(3), match.group(4))])
+        clauses += [('>', low), ('<', high)]
+        spans.append(match.span())
+    for match in COMPARISON_PATTERN.finditer(segment):
+        if any(start <= match.start() < end for start, end in spans):
+            continue
+        clauses.append((_operator(match.group(1)), _number(match.group(2), match.group(3))))
+        spans.append(match.span())
+    return clauses, spans
+
+
+def compile_steps(steps):
+    """Compile workflow steps into a ScreenQuery.
+
+    Raises ScreenCompileError when a step uses anything other than numeric
+    filters on known metrics and navigation around them.
+    """
+    found = {}
+    mentioned = set()
+    for step in steps:
+        text = step.lower()
+        covered = []
+        mentions = list(METRIC_PATTERN.finditer(text))
+        for i, mention in enumerate(mentions):
+            field = next(f for f, pattern in _METRIC_PATTERNS.items() if pattern.fullmatch(mention.group(0)))
+            end = mentions[i + 1].start() if i + 1 < len(mentions) else len(text)
+            clauses, spans = _parse_comparisons(text[mention.end():end])
+            covered.append(mention.span())
+            covered += [(mention.end() + start, mention.end() + stop) for start, stop in spans]
+            mentioned.add(field)
+            for op, value in clauses:
+                if found.setdefault((field, op), value) != value:
+                    raise ScreenCompileError(f"Conflicting filters on {field}")
+
+        rest = list(text)
+        for start, stop in covered:
+            rest[start:stop] = ' ' * (stop - start)
+        rest = ''.join(rest)
+        if re.search(r'\d|<|>', rest):
+            raise ScreenCompileError(f"Unrecognised filter in step: {step}")
+        unknown = sorted(set(re.findall(r'[a-z]+', rest)) - PROCEDURAL_WORDS)
+        if unknown:
+            raise ScreenCompileError(f"Step needs the browser agent ({', '.join(unknown)}): {step}")
+
+    if not found:
+        raise ScreenCompileError("No filters found in the steps")
+    unfiltered = sorted(field for field in mentioned if not any(f == field for f, _ in found))
+    if unfiltered:
+        raise ScreenCompileError(f"No value given for {', '.join(unfiltered)}")
+    for field in {f for f, _ in found}:
+        if (field, '>') in found and (field, '<') in found and found[(field, '>')] >= found[(field, '<')]:
+            raise ScreenCompileError(f"Filters on {field} exclude every stock")
+
+    conditions = [(field, op, value) for (field, op), value in found.items()]
+    return ScreenQuery(conditions)
+
+
+# --------- Browser Execution ---------
+LOGIN_SCRIPT = """
+(() => {{
+    const username = document.querySelector('input[name="username"], #id_username');
+    const password = document.querySelector('input[name="password"], #id_password');
+    // The page has other forms (search), so submit the one the username field belongs to
+    const form = username && username.form;
+    if (!form || !password || password.form !== form) return false;
+    username.value = {email};
+    password.value = {password};
+    form.submit();
+    return true;
+}})()
+"""
+
+RESULTS_SCRIPT = """
+(() => {
+    const table = document.querySelector('table.data-table');
+    const match = document.body.innerText.match(/([\\d,]+)\\s+results? found/i);
+    const total = match ? parseInt(match[1].replace(/,/g, ''), 10) : null;
+    const pageNumbers = Array.from(document.querySelectorAll('.pagination a, .pagination span'))
+        .map(link => parseInt(link.innerText.trim(), 10))
+        .filter(n => !isNaN(n));
+    const pages = pageNumbers.length ? Math.max(...pageNumbers) : 1;
+    if (!table) return {headers: [], rows: [], total: total, pages: pages, found: false};
+    const cells = row => Array.from(row.children).map(cell => cell.innerText.trim());
+    const rows = Array.from(table.querySelectorAll('tr'));
+    const header = rows.find(row => row.querySelector('th'));
+    // Screener repeats the header every few rows and ends with a median row
+    const body = rows
+        .filter(row => !row.querySelector('th'))
+        .map(cells)
+        .filter(row => row.length && !/^median/i.test(row.join(' ').trim()));
+    return {headers: header ? cells(header) : [], rows: body, total: total, pages: pages, found: true};
+})()
+"""
+
+
+async def evaluate(browser_session, expression):
+    """Evaluate a script in the current page and return its value."""
+    cdp_session = await browser_session.get_or_create_cdp_session(focus=False)
+    result = await cdp_session.cdp_client.send.Runtime.evaluate(
+        params={'expression': expression, 'returnByValue': True},
+        session_id=cdp_session.session_id
+    )
+    if result.get('exceptionDetails'):
+        raise ScreenQueryError(f"Script failed: {result['exceptionDetails'].get('text')}")
+    return result.get('result', {}).get('value')
+
+
+async def wait_for_load(browser_session, timeout=DIRECT_QUERY_TIMEOUT, leave_path=None):
+    """Wait for the page to finish loading, and to leave `leave_path` if given; returns its URL."""
+    deadline = time.monotonic() + timeout
+    while True:
+        state = await evaluate(browser_session, "({url: location.href, ready: document.readyState})") or {}
+        url = state.get('url') or ''
+        if state.get('ready') == 'complete' and not (leave_path and urlparse(url).path.startswith(leave_path)):
+            return url
+        if time.monotonic() >= deadline:
+            raise ScreenQueryError(f"Page did not load within {timeout:.0f}s: {url}")
+        await asyncio.sleep(0.2)
+
+
+async def open_screen(browser_session, screen, sensitive_data):
+    """Open a screen's results page, logging in first if screener.in asks for it."""
+    await browser_session.navigate_to(screen.url)
+    url = await wait_for_load(browser_session)
+    if '/login' not in urlparse(url).path:
+        return False
+
+    script = LOGIN_SCRIPT.format(email=json.dumps(sensitive_data['email']),
+                                 password=json.dumps(sensitive_data['password']))
+    if not await evaluate(browser_session, script):
+        raise ScreenQueryError("Login form not found")
+    url = await wait_for_load(browser_session, leave_path='/login')
+    # The login redirects back to the screen; go there directly if it did not
+    if urlparse(url).path != urlparse(screen.url).path:
+        await browser_session.navigate_to(screen.url)
+        await wait_for_load(browser_session)
+    return True
+
+
+async def extract_results(browser_session):
+    """The results table of the current screen page."""
+    data = await evaluate(browser_session, RESULTS_SCRIPT) or {}
+    if not data.get('found') and data.get('total') != 0:
+        raise ScreenQueryError("No results table on the screen page")
+    return data
+
+
+def page_url(url, page):
+    """`url` with its `page` query parameter set."""
+    parts = urlparse(url)
+    params = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != 'page']
+    if page > 1:
+        params.append(('page', str(page)))
+    return parts._replace(query=urlencode(params)).geturl()
+
+
+def page_count(data, max_pages=RESULT_TABLE_MAX_PAGES):
+    """Number of results pages to read, from the pagination links or the result count."""
+    pages = data.get('pages') or 1
+    if data.get('total') and data.get('rows'):
+        pages = max(pages, math.ceil(data['total'] / len(data['rows'])))
+    return min(pages, max_pages)
+
+
+async def read_results_page(browser_session, url, page):
+    """Extract page `page` of a results listing; page 1 is the one already open."""
+    if page > 1:
+        await browser_session.navigate_to(page_url(url, page))
+        await wait_for_load(browser_session)
+    return await extract_results(browser_session)
+
+
+def is_results_page(url):
+    """Whether a URL is a screen's results listing (company pages have data tables too)."""
+    return urlparse(url).path.startswith(('/screen/', '/screens/'))
+
+
+async def extract_result_table(browser_session, max_pages=RESULT_TABLE_MAX_PAGES):
+    """Read the results table of the page an agent run ended on, and the pages after it.
+
+    Returns a ResultTable, or None when the page is not a screen's results.
+    """
+    url = await browser_session.get_current_page_url()
+    if not is_results_page(url):
+        return None
+
+    table = ResultTable()
+    page, pages = 1, 1
+    while page <= pages:
+        data = await read_results_page(browser_session, url, page)
+        if not data['rows']:
+            break
+        table.add_page(data['headers'], data['rows'])
+        pages = page_count(data, max_pages) if page == 1 else pages
+        page += 1
+    return table if table.num_rows else None
+
+
+class ScreenResult:
+    """Outcome of a direct screen query, answering like an agent run's history."""
+
+    def __init__(self, screen, table, total=None, steps=2):
+        self.screen = screen
+        self.table = table
+        self.total = total if total is not None else table.num_rows
+        self.steps = steps
+
+    def is_done(self):
+        return True
+
+    def number_of_steps(self):
+        return self.steps
+
+    def final_result(self, max_rows=25):
+        """A summary of the results, with the first `max_rows` rows as a markdown table."""
+        lines = [f"Screen query: `{self.screen.describe()}`", ""]
+        if not self.table.num_rows:
+            lines.append("No stocks match these filters.")
+            return '\n'.join(lines)
+
+        rows = self.table.num_rows
+        lines.append(f"{self.total} stocks found" + (f", {rows} read." if rows < self.total else "."))
+        if rows > max_rows:
+            lines.append(f"The first {max_rows} are below; the results table has all of them.")
+        lines += ["", self.table.markdown(max_rows)]
+        return '\n'.join(lines)
@@ -0,0 +1,274 @@
+# Screenshot storage for the Workflow Automator
+#
+# Keeps small thumbnails in memory and spills full-resolution frames to a
+# content-addressed cache on disk, so long runs do not hold megabytes of PNG
+# data per step in session state. Pruning the disk cache never deletes frames
+# a live store in this process still references, and reading a frame touches
+# it, so frames in use by other processes stay the most recently used.
+
+import hashlib
+import io
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+
+from PIL import Image
+
+from config import (
+    SCREENSHOT_CACHE_DIR,
+    SCREENSHOT_THUMBNAIL_WIDTH,
+    SCREENSHOT_THUMBNAIL_FORMAT,
+    SCREENSHOT_THUMBNAIL_QUALITY,
+    SCREENSHOT_MEMORY_BUDGET_MB,
+    SCREENSHOT_DISK_BUDGET_MB,
+    SCREENSHOT_DEDUP_DISTANCE,
+)
+
+
+class ScreenshotFrame:
+    """Metadata for one captured frame; pixels live on disk and in the thumbnail cache."""
+
+    def __init__(self, digest, path, step, label, phash, size):
+        self.digest = digest
+        self.path = path
+        self.step = step
+        self.label = label
+        self.phash = phash
+        self.size = size
+
+    def to_dict(self):
+        """Serializable reference to this frame."""
+        return {
+            'digest': self.digest,
+            'path': str(self.path),
+            'step': self.step,
+            'label': self.label,
+            'phash': self.phash,
+            'size': self.size,
+        }
+
+
+# Stores of this process whose frames the disk cache must keep
+_live_stores = weakref.WeakSet()
+_live_stores_lock = threading.Lock()
+
+
+def _touch(path):
+    """Mark a cached frame as recently used; False if it is gone."""
+    try:
+        os.utime(path)
+        return True
+    except OSError:
+        return False
+
+
+def live_frame_paths():
+    """Paths of the frames referenced by this process's live stores."""
+    with _live_stores_lock:
+        stores = list(_live_stores)
+    return {Path(frame.path) for store in stores for frame in store}
+
+
+class ScreenshotStore:
+    """Per-session screenshot store with deduplication and a thumbnail memory budget."""
+
+    def __init__(self, cache_dir=SCREENSHOT_CACHE_DIR, budget_bytes=SCREENSHOT_MEMORY_BUDGET_MB * 1024 * 1024,
+                 thumbnail_width=SCREENSHOT_THUMBNAIL_WIDTH, dedup_distance=SCREENSHOT_DEDUP_DISTANCE):
+        self.cache_dir = Path(cache_dir)
+        self.budget_bytes = budget_bytes
+        self.thumbnail_width = thumbnail_width
+        self.dedup_distance = dedup_distance
+
+        self.frames = []
+        self._thumbnails = OrderedDict()
+        self._thumbnail_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'added': 0, 'duplicates': 0, 'evictions': 0, 'bytes_captured': 0}
+        with _live_stores_lock:
+            _live_stores.add(self)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __iter__(self):
+        return iter(list(self.frames))
+
+    def __getitem__(self, index):
+        return self.frames[index]
+
+    def add(self, image_bytes, step=None, label=None):
+        """Store a captured frame; returns None when it duplicates the previous frame."""
+        image = Image.open(io.BytesIO(image_bytes))
+        image.load()
+        phash = perceptual_hash(image)
+
+        with self._lock:
+            self.stats['bytes_captured'] += len(image_bytes)
+            if self.frames and hamming_distance(self.frames[-1].phash, phash) <= self.dedup_distance:
+                self.stats['duplicates'] += 1
+                return None
+
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        path = self._write_frame(digest, image_bytes)
+        thumbnail = self._make_thumbnail(image)
+
+        frame = ScreenshotFrame(digest, path, step, label, phash, len(image_bytes))
+        with self._lock:
+            self.frames.append(frame)
+            self.stats['added'] += 1
+            self._remember_thumbnail(digest, thumbnail)
+        return frame
+
+    def add_existing(self, frame_ref, step=None, label=None):
+        """Register a frame another process already wrote to the disk cache."""
+        with self._lock:
+            for frame in self.frames:
+                if frame.digest == frame_ref['digest']:
+                    return frame
+
+        _touch(frame_ref['path'])
+        frame = ScreenshotFrame(
+            frame_ref['digest'], Path(frame_ref['path']),
+            frame_ref.get('step', step), frame_ref.get('label', label),
+            frame_ref['phash'], frame_ref['size']
+        )
+        with self._lock:
+            self.frames.append(frame)
+            self.stats['added'] += 1
+        return frame
+
+    def thumbnail(self, frame):
+        """Thumbnail bytes for a frame, regenerated from disk if it was evicted; None if the file is gone too."""
+        with self._lock:
+            thumbnail = self._thumbnails.get(frame.digest)
+            if thumbnail is not None:
+                self._thumbnails.move_to_end(frame.digest)
+                return thumbnail
+
+        try:
+            with Image.open(frame.path) as image:
+                thumbnail = self._make_thumbnail(image)
+        except FileNotFoundError:
+            return None
+        _touch(frame.path)
+        with self._lock:
+            self._remember_thumbnail(frame.digest, thumbnail)
+        return thumbnail
+
+    def full_image(self, frame):
+        """Full-resolution frame bytes from the disk cache, or None if the file was pruned."""
+        try:
+            data = Path(frame.path).read_bytes()
+        except FileNotFoundError:
+            return None
+        _touch(frame.path)
+        return data
+
+    def latest(self):
+        """Most recent frame, or None."""
+        return self.frames[-1] if self.frames else None
+
+    def memory_bytes(self):
+        """Bytes of thumbnail data currently held in memory."""
+        return self._thumbnail_bytes
+
+    def clear(self):
+        """Forget all frames; files stay in the shared disk cache."""
+        with self._lock:
+            self.frames = []
+            self._thumbnails.clear()
+            self._thumbnail_bytes = 0
+
+    def _write_frame(self, digest, image_bytes):
+        """Write a frame to the content-addressed cache unless it is already there."""
+        path = self.cache_dir / digest[:2] / f"{digest}.png"
+        if path.exists():
+            os.utime(path)
+            return path
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(image_bytes)
+        os.replace(tmp_path, path)
+        return path
+
+    def _make_thumbnail(self, image):
+        """Downscale and re-encode a frame for in-memory display."""
+        thumbnail = image.convert('RGB')
+        if thumbnail.width > self.thumbnail_width:
+            height = max(1, round(thumbnail.height * self.thumbnail_width / thumbnail.width))
+            thumbnail = thumbnail.resize((self.thumbnail_width, height), Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        thumbnail.save(buffer, format=SCREENSHOT_THUMBNAIL_FORMAT, quality=SCREENSHOT_THUMBNAIL_QUALITY)
+        return buffer.getvalue()
+
+    def _remember_thumbnail(self, digest, thumbnail):
+        """Add a thumbnail to the LRU cache and evict the oldest ones over budget."""
+        previous = self._thumbnails.pop(digest, None)
+        if previous is not None:
+            self._thumbnail_bytes -= len(previous)
+
+        self._thumbnails[digest] = thumbnail
+        self._thumbnail_bytes += len(thumbnail)
+
+        while self._thumbnail_bytes > self.budget_bytes and len(self._thumbnails) > 1:
+            _, evicted = self._thumbnails.popitem(last=False)
+            self._thumbnail_bytes -= len(evicted)
+            self.stats['evictions'] += 1
+
+
+def perceptual_hash(image, hash_size=8):
+    """Difference hash (dHash) of an image as a 64-bit integer."""
+    small = image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+    # Mode 'L' is one byte per pixel
+    pixels = small.tobytes()
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | int(pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(first, second):
+    """Number of differing bits between two perceptual hashes."""
+    return bin(first ^ second).count('1')
+
+
+def prune_disk_cache(cache_dir=SCREENSHOT_CACHE_DIR, max_bytes=SCREENSHOT_DISK_BUDGET_MB * 1024 * 1024,
+                     keep=None):
+    """Delete the least recently used frames until the disk cache fits its budget.
+
+    Frames in `keep` (default: those of this process's live stores) are never deleted.
+    """
+    cache_dir = Path(cache_dir)
+    if not cache_dir.exists():
+        return 0
+    keep = {Path(path).resolve() for path in (live_frame_paths() if keep is None else keep)}
+
+    files = []
+    for path in cache_dir.glob('*/*.png'):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        if path.resolve() in keep:
+            continue
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
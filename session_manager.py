@@ -2,6 +2,10 @@
 
 import streamlit as st
 from config import SESSION_KEYS
+from event_channel import (
+    get_channel, EVENT_STEP_START, EVENT_STEP_END, EVENT_SCREENSHOT, EVENT_COMPLETED, EVENT_ERROR,
+)
+from thought_log import ThoughtLog, ENTRY_COMPLETED, ENTRY_ERROR, prune_spill_files
 
 class SessionManager:
     """Manages Streamlit session state initialization and operations."""
@@ -19,7 +23,9 @@ class SessionManager:
         workflow_keys = [
             'workflow_steps', 'workflow_approved', 'current_prompt',
             'show_workflow_view', 'editing_step', 'edited_steps',
-            'agent_ran', 'latest_thoughts', 'agent_error', 'combined_prompt'
+            'agent_ran', 'thought_log', 'thought_page', 'agent_error', 'combined_prompt', 'prompt_compaction',
+            'run_id', 'event_cursor', 'breakdown_streaming', 'plan_match', 'result_table',
+            'result_cached_at'
         ]
         
         for key in workflow_keys:
@@ -29,12 +35,66 @@ class SessionManager:
     @staticmethod
     def reset_agent_state():
         """Reset agent-related session state."""
-        agent_keys = ['agent_ran', 'latest_thoughts', 'agent_error']
+        agent_keys = [
+            'agent_ran', 'thought_log', 'thought_page', 'agent_error', 'run_id', 'event_cursor', 'result_table',
+            'result_cached_at'
+        ]
         
         for key in agent_keys:
             if key in st.session_state:
                 st.session_state[key] = SESSION_KEYS.get(key, False)
     
+    @staticmethod
+    def get_thought_log():
+        """Get the active run's thought log, starting a new one when the run changes."""
+        thought_log = st.session_state.get('thought_log')
+        run_id = st.session_state.get('run_id')
+        if not isinstance(thought_log, ThoughtLog) or thought_log.run_id != run_id:
+            if isinstance(thought_log, ThoughtLog):
+                thought_log.clear()
+            prune_spill_files()
+            thought_log = ThoughtLog(run_id)
+            st.session_state['thought_log'] = thought_log
+            st.session_state['thought_page'] = 1
+        return thought_log
+    
+    @staticmethod
+    def apply_run_events():
+        """Fold new events from the active run's channel into session state."""
+        run_id = st.session_state.get('run_id')
+        channel = get_channel(run_id) if run_id else None
+        if channel is None:
+            return []
+        
+        events = channel.read_since(st.session_state.get('event_cursor', 0))
+        thought_log = SessionManager.get_thought_log()
+        for event in events:
+            if event.kind == EVENT_STEP_START:
+                st.session_state['step_counter'] = {'n': event.data['step']}
+                thought_log.start_step(event.data['step'], event.data['goal'], event.ts)
+            elif event.kind == EVENT_STEP_END:
+                thought_log.end_step(event.data['step'], event.ts, event.data.get('action'), event.data.get('result'))
+            elif event.kind == EVENT_SCREENSHOT and 'screenshots' in st.session_state:
+                # Frames captured in a worker process are only known by reference
+                st.session_state['screenshots'].add_existing(event.data['frame'])
+            elif event.kind == EVENT_COMPLETED:
+                thought_log.add_note(ENTRY_COMPLETED, None, event.ts)
+                st.session_state['agent_completed'] = True
+                st.session_state['start_realtime_updates'] = False
+                st.session_state['final_result'] = event.data['result']
+                st.session_state['result_table'] = event.data.get('table')
+                st.session_state['result_cached_at'] = event.data.get('cached_at')
+            elif event.kind == EVENT_ERROR:
+                thought_log.add_note(ENTRY_ERROR, event.data['error'], event.ts)
+                st.session_state['agent_error'] = True
+                st.session_state['agent_completed'] = True
+                st.session_state['start_realtime_updates'] = False
+                st.session_state['final_result'] = f"Error: {event.data['error']}"
+        
+        st.session_state['event_cursor'] = st.session_state.get('event_cursor', 0) + len(events)
+        channel.record_render(events)
+        return events
+    
     @staticmethod
     def reset_credentials():
         """Reset credentials-related session state."""
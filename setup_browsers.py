@@ -80,8 +80,10 @@ def main():
     # Setup environment
     setup_environment()
     
-    # Install browsers
-    if not install_playwright_browsers():
+    # Install browsers unless the install manifest says they are present
+    from browser_setup import ensure_playwright_browsers
+    installed = install_playwright_browsers() if '--force' in sys.argv else ensure_playwright_browsers()
+    if not installed:
         print("❌ Failed to install browsers")
         sys.exit(1)
     
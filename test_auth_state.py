@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the encrypted auth state store.
+"""
+
+import sys
+import tempfile
+
+from auth_state import AuthStateStore
+
+CREDENTIALS = {'email': 'user@example.com', 'password': 'secret'}
+STATE = {
+    'cookies': [
+        {'name': 'sessionid', 'value': 'abc', 'domain': 'www.screener.in', 'path': '/', 'expires': -1, 'size': 12},
+        {'name': 'tracker', 'value': 'x', 'domain': '.ads.example.com', 'path': '/'},
+    ],
+    'origins': [
+        {'origin': 'https://www.screener.in', 'localStorage': [{'name': 'theme', 'value': 'dark'}]},
+    ],
+}
+
+def make_store(directory):
+    """Store with a low KDF cost so the test runs fast."""
+    return AuthStateStore(directory, secret='test', max_age=3600, iterations=1000, enabled=True)
+
+def test_round_trip():
+    """Test that a saved state loads back encrypted and filtered to screener.in."""
+    print("🔧 Testing save and load...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        assert store.save('alice', CREDENTIALS, STATE)
+
+        raw = store._path('alice', CREDENTIALS['email']).read_bytes()
+        assert b'sessionid' not in raw
+
+        state = store.load('alice', CREDENTIALS)
+        assert [cookie['name'] for cookie in state['cookies']] == ['sessionid']
+        assert 'size' not in state['cookies'][0]
+        assert state['origins'][0]['localStorage'][0]['value'] == 'dark'
+        assert store.load('bob', CREDENTIALS) is None
+
+    print("✅ Save and load test passed")
+
+def test_invalidation():
+    """Test that changed credentials invalidate the saved state."""
+    print("🔧 Testing invalidation...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        store.save('alice', CREDENTIALS, STATE)
+
+        # Same account, new password: the old state cannot be decrypted and is dropped
+        assert store.load('alice', {'email': CREDENTIALS['email'], 'password': 'changed'}) is None
+        assert store.load('alice', CREDENTIALS) is None
+
+        store.save('alice', CREDENTIALS, STATE)
+        assert store.invalidate('alice', keep_email=CREDENTIALS['email']) == 0
+        assert store.invalidate('alice', keep_email='other@example.com') == 1
+        assert store.load('alice', CREDENTIALS) is None
+
+    print("✅ Invalidation test passed")
+
+def main():
+    """Run all tests."""
+    print("🚀 Running auth state tests...")
+
+    tests = [
+        ("Save and Load", test_round_trip),
+        ("Invalidation", test_invalidation),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n--- {test_name} ---")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_name} failed: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test script to verify batch file parsing and resuming from a results file.
+"""
+
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import batch as batch_module
+from result_cache import credential_scope
+from batch import BatchRun, batch_id_for, parse_prompts, job_id_for, start_batch, JOB_SUCCEEDED, JOB_FAILED
+
+def test_parse_prompts():
+    """Test that CSV and JSONL batch files give one job per distinct prompt."""
+    print("🔧 Testing batch file parsing...")
+
+    jobs = parse_prompts("prompt,id\nFind low P/E stocks,pe\nFind  low P/E stocks,pe\n,\nMarket cap above 1000cr,\n", 'csv')
+    assert [job['id'] for job in jobs] == ['pe', job_id_for("Market cap above 1000cr")]
+
+    jobs = parse_prompts('"Find low P/E stocks"\n\n{"prompt": "Market cap above 1000cr", "id": "mcap"}\n', 'jsonl')
+    assert jobs == [
+        {'id': job_id_for("Find low P/E stocks"), 'prompt': "Find low P/E stocks"},
+        {'id': 'mcap', 'prompt': "Market cap above 1000cr"},
+    ]
+    assert job_id_for("Find  low P/E stocks ") == job_id_for("Find low P/E stocks")
+
+    for text, fmt in (("query\nFind stocks\n", 'csv'), ("not json\n", 'jsonl'), ("", 'xlsx')):
+        try:
+            parse_prompts(text, fmt)
+            assert False, f"{fmt} input should be rejected"
+        except ValueError:
+            pass
+
+    print("✅ Batch file parsing test passed")
+
+def test_resume():
+    """Test that succeeded jobs are skipped and failed ones rerun."""
+    print("🔧 Testing resume from results file...")
+
+    jobs = [{'id': name, 'prompt': f"Screen {name}"} for name in ('a', 'b', 'c')]
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / 'results.jsonl'
+        earlier = time.time() - 60
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'id': 'a', 'status': JOB_SUCCEEDED, 'finished_at': earlier}) + '\n')
+            f.write(json.dumps({'id': 'b', 'status': JOB_FAILED, 'finished_at': earlier}) + '\n')
+            f.write('{"id": "c", "sta')
+
+        batch = BatchRun(jobs, {'email': 'user@example.com', 'password': 'x'}, output)
+        assert [job['id'] for job in batch.pending] == ['b', 'c']
+        assert batch.progress() == {'total': 3, 'succeeded': 1, 'failed': 0, 'remaining': 2, 'finished': False}
+
+        batch._write({'id': 'b', 'status': JOB_FAILED, 'finished_at': time.time()})
+        assert batch.progress()['failed'] == 1
+        assert batch.progress()['remaining'] == 1
+
+    print("✅ Resume test passed")
+
+class FakeFleet:
+    """Worker fleet whose jobs finish on their second status check."""
+
+    def __init__(self, status='succeeded', error=None):
+        self.final_status = status
+        self.error = error
+        self.jobs = {}
+
+    def submit(self, kind, payload, job_id=None, timeout=None):
+        self.jobs[job_id] = {'kind': kind, 'payload': payload, 'timeout': timeout, 'checks': 0}
+        return job_id
+
+    def status(self, job_id):
+        job = self.jobs[job_id]
+        job['checks'] += 1
+        if job['checks'] < 2:
+            return {'status': 'queued', 'result': None, 'error': None}
+        result = {'final_result': "12 stocks", 'is_done': True, 'agent_steps': 7}
+        return {'status': self.final_status, 'result': result if self.final_status == 'succeeded' else None,
+                'error': self.error}
+
+def test_fleet_execution():
+    """Test that batch workflows can be queued for the worker fleet instead of taking interactive browsers."""
+    print("🔧 Testing fleet execution...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fleet = FakeFleet()
+        batch = BatchRun([], {'email': 'user@example.com', 'password': 'x'}, Path(tmp) / 'results.jsonl',
+                         fleet=fleet, timeout=30)
+        assert asyncio.run(batch._execute('run-1', "Execute: P/E below 15", ["Set P/E"], "P/E below 15")) == \
+            (True, 7, "12 stocks")
+        job = fleet.jobs['run-1']
+        assert job['kind'] == 'workflow' and job['timeout'] == 30 and job['checks'] == 2
+        assert job['payload']['query'] == "Execute: P/E below 15" and job['payload']['steps'] == ["Set P/E"]
+
+        batch.fleet = FakeFleet(status='timed_out', error="Timed out after 30s")
+        try:
+            asyncio.run(batch._execute('run-2', "Execute", [], "P/E"))
+            assert False, "a timed-out fleet job should fail the batch job"
+        except RuntimeError as e:
+            assert str(e) == "Timed out after 30s"
+
+    print("✅ Fleet execution test passed")
+
+def test_batch_scope():
+    """Test that the same upload by another user or login is a different batch and never joins a running one."""
+    print("🔧 Testing batch scope...")
+
+    data = b"prompt\nFind low P/E stocks\n"
+    alice = {'email': 'alice@example.com', 'password': 'a'}
+    bob = {'email': 'bob@example.com', 'password': 'b'}
+    batch_id = batch_id_for(data, alice, 'alice')
+    assert batch_id == batch_id_for(data, alice, 'alice')
+    assert batch_id != batch_id_for(data, bob, 'bob')
+    assert batch_id != batch_id_for(data, alice, 'bob')
+    assert batch_id != batch_id_for(b"prompt\nMarket cap above 1000cr\n", alice, 'alice')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        running = BatchRun([], alice, Path(tmp) / 'results.jsonl', app_user='alice')
+        running.scope = credential_scope(alice, 'alice')
+        batch_module._batches[batch_id] = running
+        try:
+            assert start_batch(batch_id, [], alice, 'alice') is running
+            try:
+                start_batch(batch_id, [], bob, 'bob')
+                assert False, "another user's running batch should not be handed out"
+            except ValueError:
+                pass
+        finally:
+            batch_module._batches.pop(batch_id, None)
+
+    print("✅ Batch scope test passed")
+
+def main():
+    """Run all tests."""
+    print("🚀 Running batch tests...")
+
+    tests = [
+        ("Batch File Parsing", test_parse_prompts),
+        ("Resume", test_resume),
+        ("Fleet Execution", test_fleet_execution),
+        ("Batch Scope", test_batch_scope),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n--- {test_name} ---")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_name} failed: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the browser pool's event loop binding.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import browser_pool
+from browser_pool import BrowserPool, BrowserPoolTimeout, PooledSession, browser_rss_mb, browser_cpu_seconds
+
+class StubProfile:
+    def model_copy(self, update=None):
+        return self
+
+class StubPool(BrowserPool):
+    """Pool whose sessions are stubs with a fake browser pid."""
+
+    launched = 0
+
+    async def _launch(self):
+        StubPool.launched += 1
+        return PooledSession(SimpleNamespace(_local_browser_watchdog=SimpleNamespace(browser_pid=StubPool.launched)))
+
+    async def _reset_session(self, session):
+        pass
+
+def test_loop_binding():
+    """Test that moving to a new loop kills the old loop's browsers, and a live loop is never taken over."""
+    print("🔧 Testing event loop binding...")
+
+    killed = []
+    kill = browser_pool.kill_browser_process
+    browser_pool.kill_browser_process = lambda session: killed.append(session._local_browser_watchdog.browser_pid)
+    try:
+        pool = StubPool(StubProfile(), size=2, max_rss_mb=0)
+
+        async def lease_one():
+            async with pool.lease():
+                pass
+
+        asyncio.run(pool.warm())
+        asyncio.run(lease_one())
+        assert sorted(killed) == [1, 2], killed
+        assert pool.get_metrics()['idle'] == 1 and pool.get_metrics()['total'] == 1
+
+        # A session still leased when its loop closed is killed too
+        async def leave_leased():
+            await pool._acquire()
+
+        asyncio.run(leave_leased())
+        assert sorted(killed) == [1, 2, 3], killed
+        asyncio.run(lease_one())
+        assert sorted(killed) == [1, 2, 3, 4], killed
+
+        # Another loop cannot use the pool while its loop is open
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(lease_one())
+            try:
+                asyncio.run(lease_one())
+                assert False, "a second open loop should be refused"
+            except RuntimeError:
+                pass
+        finally:
+            loop.close()
+    finally:
+        browser_pool.kill_browser_process = kill
+
+    print("✅ Event loop binding test passed")
+
+def test_lease_timeout():
+    """Test that the lease timeout bounds the whole wait, even when the waiter keeps being woken."""
+    print("🔧 Testing lease timeout...")
+
+    pool = StubPool(StubProfile(), size=1, max_rss_mb=0, lease_timeout=0.3)
+
+    async def wait_behind_busy_pool():
+        async with pool.lease():
+            async def wake_waiters():
+                while True:
+                    await asyncio.sleep(0.05)
+                    async with pool._condition:
+                        pool._condition.notify_all()
+
+            waker = asyncio.ensure_future(wake_waiters())
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(pool._acquire(), timeout=2)
+                assert False, "the lease should time out"
+            except BrowserPoolTimeout as e:
+                assert "within 0.3s" in str(e), str(e)
+            finally:
+                waker.cancel()
+            return time.perf_counter() - started
+
+    waited = asyncio.run(wait_behind_busy_pool())
+    assert 0.25 < waited < 1.0, waited
+
+    print("✅ Lease timeout test passed")
+
+def test_process_metrics():
+    """Test memory and CPU readings of a browser process tree, and unknown or exited browsers."""
+    print("🔧 Testing browser process metrics...")
+
+    session = SimpleNamespace(_local_browser_watchdog=SimpleNamespace(browser_pid=os.getpid()))
+    assert browser_rss_mb(session) > 1
+    assert browser_cpu_seconds(session) > 0
+
+    exited = SimpleNamespace(_local_browser_watchdog=SimpleNamespace(browser_pid=2 ** 22 + 1))
+    for missing in (SimpleNamespace(), exited):
+        assert browser_rss_mb(missing) is None and browser_cpu_seconds(missing) is None
+        assert browser_pool.kill_browser_process(missing) is False
+
+    print("✅ Browser process metrics test passed")
+
+def main():
+    """Run all tests."""
+    print("🚀 Running browser pool tests...")
+
+    tests = [
+        ("Event Loop Binding", test_loop_binding),
+        ("Lease Timeout", test_lease_timeout),
+        ("Process Metrics", test_process_metrics),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n--- {test_name} ---")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_name} failed: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
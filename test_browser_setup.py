@@ -64,6 +64,33 @@ def test_browser_use_import():
         print(f"❌ browser-use import test failed: {e}")
         return False
 
+def test_install_manifest():
+    """Test that only a manifest for this Playwright version and Chromium revision skips the install."""
+    print("🔧 Testing install manifest...")
+
+    import tempfile
+    from browser_setup import manifest_matches, write_install_manifest, read_install_manifest
+
+    key = {'playwright_version': '1.40.0', 'chromium_revision': '1091'}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['WORKFLOW_INSTALL_MANIFEST'] = str(Path(tmp) / 'install.json')
+        try:
+            if manifest_matches(key):
+                print("❌ A missing manifest should not match")
+                return False
+            write_install_manifest(key)
+            if not manifest_matches(key) or read_install_manifest()['chromium_revision'] != '1091':
+                print("❌ The written manifest should match")
+                return False
+            if manifest_matches(dict(key, chromium_revision='1092')):
+                print("❌ A manifest for another revision should not match")
+                return False
+        finally:
+            del os.environ['WORKFLOW_INSTALL_MANIFEST']
+
+    print("✅ Install manifest test passed")
+    return True
+
 def main():
     """Run all tests."""
     print("🚀 Running browser setup tests...")
@@ -71,7 +98,8 @@ def main():
     tests = [
         ("Environment Setup", test_environment_setup),
         ("Browser Installation", test_browser_installation),
-        ("Browser-Use Import", test_browser_use_import)
+        ("Browser-Use Import", test_browser_use_import),
+        ("Install Manifest", test_install_manifest)
     ]
     
     passed = 0
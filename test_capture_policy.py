@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the screenshot capture policy.
+"""
+
+import asyncio
+import sys
+
+from capture_policy import CapturePolicy, dom_change, POLICY_ADAPTIVE
+
+SCREEN_URL = 'https://www.screener.in/screen/raw/'
+
+class StubBrowserSession:
+    """Browser session stand-in whose page summary the test sets; None makes the DOM read fail."""
+
+    def __init__(self, url=SCREEN_URL, nodes=1000, height=2000):
+        self.page = {'url': url, 'nodes': nodes, 'height': height}
+        self.session_id = 'stub'
+        self.cdp_client = self.send = self.Runtime = self
+
+    async def get_or_create_cdp_session(self, focus=True):
+        return self
+
+    async def evaluate(self, params=None, session_id=None):
+        if self.page is None:
+            raise RuntimeError("Target closed")
+        return {'result': {'value': dict(self.page)}}
+
+def test_capture_at():
+    """Test which points of a step capture a screenshot."""
+    print("🔧 Testing capture points...")
+
+    both = CapturePolicy(policy='viewport', capture_at='both')
+    assert both.should_capture('start') and both.should_capture('end')
+    end = CapturePolicy(policy='viewport', capture_at='end')
+    assert not end.should_capture('start') and end.should_capture('end')
+
+    print("✅ Capture points test passed")
+
+def test_fixed_policies():
+    """Test that the full-page and viewport policies never look at the page."""
+    print("🔧 Testing fixed policies...")
+
+    session = StubBrowserSession()
+    session.page = None
+    assert asyncio.run(CapturePolicy(policy='full_page').full_page(session))
+    assert not asyncio.run(CapturePolicy(policy='viewport').full_page(session, is_final=True))
+    assert CapturePolicy(policy='sometimes').policy == POLICY_ADAPTIVE
+
+    print("✅ Fixed policies test passed")
+
+def test_adaptive_full_page():
+    """Test that the adaptive policy renders the full page on new pages, large DOM changes and the final step."""
+    print("🔧 Testing adaptive full-page captures...")
+
+    async def run():
+        session = StubBrowserSession()
+        policy = CapturePolicy(policy='adaptive', dom_change_threshold=0.3)
+        decisions = [await policy.full_page(session)]
+
+        # Small changes stay viewport-only; they are measured from the last full-page capture
+        session.page['nodes'] = 1200
+        decisions.append(await policy.full_page(session))
+        session.page['nodes'] = 1400
+        decisions.append(await policy.full_page(session))
+        decisions.append(await policy.full_page(session))
+
+        session.page['url'] = 'https://www.screener.in/company/TCS/'
+        decisions.append(await policy.full_page(session))
+        decisions.append(await policy.full_page(session, is_final=True))
+
+        # Without a page summary only the final capture renders the full page
+        session.page = None
+        decisions.append(await policy.full_page(session))
+        decisions.append(await policy.full_page(session, is_final=True))
+        return decisions
+
+    assert asyncio.run(run()) == [True, False, True, False, True, True, False, True]
+
+    previous = {'url': SCREEN_URL, 'nodes': 1000, 'height': 2000}
+    assert dom_change(None, previous) == 1.0
+    assert dom_change(previous, dict(previous, height=3000)) == 0.5
+
+    print("✅ Adaptive full-page captures test passed")
+
+def main():
+    """Run all tests."""
+    print("🚀 Running capture policy tests...")
+
+    tests = [
+        ("Capture Points", test_capture_at),
+        ("Fixed Policies", test_fixed_policies),
+        ("Adaptive Full Page", test_adaptive_full_page),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n--- {test_name} ---")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_name} failed: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test script to verify run instrumentation: step records, trace files and summaries.
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+
+from instrumentation import (
+    RunTracer, MetricsRegistry, InstrumentedLLM, current_tracer, load_trace, summarize_steps
+)
+
+class Usage:
+    prompt_tokens = 100
+    completion_tokens = 20
+
+class FakeResult:
+    usage = Usage()
+
+class FakeLLM:
+    async def ainvoke(self, messages, output_format=None, **kwargs):
+        return FakeResult()
+
+def test_step_bookkeeping():
+    """Test that a step collects its metrics between start and end, and nothing outside a step."""
+    print("🔧 Testing step bookkeeping...")
+
+    with tempfile.TemporaryDirectory() as trace_dir:
+        registry = MetricsRegistry()
+        tracer = RunTracer('run-1', trace_dir=trace_dir, registry=registry, enabled=False)
+        assert tracer.trace_path is None
+
+        # Between steps metrics are dropped
+        tracer.add('llm_s', 1.0)
+        assert tracer.end_step() is None
+
+        tracer.start_step(1, goal='open screen')
+        tracer.annotate(url='https://www.screener.in/screen/raw/')
+        tracer.add('screenshot_bytes', 500)
+        tracer.add('screenshot_bytes', None)
+        tracer.record_llm_call(0.5, Usage())
+        tracer.record_llm_call(0.25)
+        time.sleep(0.01)
+        record = tracer.end_step(browser_rss_mb=300.0)
+
+        assert record['step'] == 1 and record['goal'] == 'open screen'
+        assert record['url'] == 'https://www.screener.in/screen/raw/'
+        assert record['llm_calls'] == 2 and record['llm_s'] == 0.75
+        assert record['prompt_tokens'] == 100 and record['completion_tokens'] == 20
+        assert record['screenshot_bytes'] == 500 and record['browser_rss_mb'] == 300.0
+        assert record['wall_s'] >= 0.01
+
+        tracer.start_step(2)
+        tracer.finish('completed')
+        run = registry._runs['run-1']
+        assert run['status'] == 'completed' and run['finished_at'] is not None
+        assert [step['step'] for step in registry.get_steps('run-1')] == [1, 2]
+
+    print("✅ Step bookkeeping test passed")
+
+def test_llm_calls():
+    """Test that wrapped LLM calls are recorded against the active tracer only."""
+    print("🔧 Testing LLM call recording...")
+
+    tracer = RunTracer('run-llm', registry=MetricsRegistry(), enabled=False)
+    llm = InstrumentedLLM(FakeLLM())
+
+    async def call():
+        await llm.ainvoke([])
+
+    tracer.start_step(1)
+    asyncio.run(call())
+    tracer.activate()
+    assert current_tracer() is tracer
+    asyncio.run(call())
+    tracer.deactivate()
+    assert current_tracer() is None
+
+    record = tracer.end_step()
+    assert record['llm_calls'] == 1 and record['prompt_tokens'] == 100
+
+    print("✅ LLM call recording test passed")
+
+def test_trace_file():
+    """Test that each step is appended to the run's JSONL trace and read back from it."""
+    print("🔧 Testing trace file...")
+
+    with tempfile.TemporaryDirectory() as trace_dir:
+        tracer = RunTracer('run-2', trace_dir=trace_dir, registry=MetricsRegistry(), enabled=True)
+        for step in (1, 2):
+            tracer.start_step(step)
+            tracer.add('requests', 10)
+            tracer.end_step()
+
+        lines = tracer.trace_path.read_text(encoding='utf-8').splitlines()
+        assert len(lines) == 2
+        steps = load_trace('run-2', trace_dir)
+        assert [step['step'] for step in steps] == [1, 2]
+        assert all(step['run_id'] == 'run-2' and step['requests'] == 10 for step in steps)
+
+        # A run this process does not know about is read from its trace file
+        assert MetricsRegistry().get_steps('run-2', trace_dir=trace_dir) == steps
+        assert load_trace('missing', trace_dir) == []
+
+    print("✅ Trace file test passed")
+
+def test_summarize_steps():
+    """Test the totals, other time and peak memory of a run summary."""
+    print("🔧 Testing step summary...")
+
+    steps = [
+        {'wall_s': 4.0, 'llm_s': 2.0, 'screenshot_capture_s': 0.5, 'screenshot_decode_s': 0.1,
+         'navigation_s': None, 'prompt_tokens': 100, 'completion_tokens': 10,
+         'requests': 20, 'requests_blocked': 5, 'requests_blocked_by_type': {'Font': 3, 'Script': 2},
+         'downscaled_bytes_saved': 1000, 'browser_rss_mb': 250.0},
+        {'wall_s': 2.0, 'llm_s': 1.0, 'navigation_s': 0.4, 'prompt_tokens': 50,
+         'requests_blocked_by_type': {'Font': 1}, 'browser_rss_mb': None},
+        {'wall_s': None, 'llm_s': 3.0},
+    ]
+    summary = summarize_steps(steps)
+    assert summary['steps'] == 3 and summary['wall_s'] == 6.0
+    assert summary['llm_s'] == 6.0 and summary['navigation_s'] == 0.4
+    assert summary['other_s'] == 0.0
+    assert summary['prompt_tokens'] == 150 and summary['completion_tokens'] == 10
+    assert summary['requests'] == 20 and summary['requests_blocked'] == 5
+    assert summary['downscaled_bytes_saved'] == 1000
+    assert summary['requests_blocked_by_type'] == {'Font': 4, 'Script': 2}
+    assert summary['peak_browser_rss_mb'] == 250.0
+
+    summary = summarize_steps(steps[:1])
+    assert abs(summary['other_s'] - 1.4) < 1e-9
+
+    empty = summarize_steps([])
+    assert empty['steps'] == 0 and empty['other_s'] == 0.0 and empty['peak_browser_rss_mb'] is None
+
+    print("✅ Step summary test passed")
+
+def main():
+    """Run all tests."""
+    print("🚀 Running instrumentation tests...")
+
+    tests = [
+        ("Step Bookkeeping", test_step_bookkeeping),
+        ("LLM Calls", test_llm_calls),
+        ("Trace File", test_trace_file),
+        ("Step Summary", test_summarize_steps),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n--- {test_name} ---")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_name} failed: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
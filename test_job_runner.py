@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the background job runner.
+"""
+
+import asyncio
+import sys
+import time
+
+from job_runner import (
+    JobRunner, JobQueueFull,
+    JOB_SUCCEEDED, JOB_TIMED_OUT, JOB_CANCELLED, JOB_FAILED,
+)
+
+async def sleep_and_return(seconds, value=None):
+    """Job body that sleeps and returns a value."""
+    await asyncio.sleep(seconds)
+    return value
+
+async def fail():
+    """Job body that raises."""
+    raise RuntimeError("boom")
+
+def wait_until_finished(runner, job_ids, timeout=5):
+    """Poll until all jobs have finished."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if all(runner.status(job_id).finished for job_id in job_ids):
+            return
+        time.sleep(0.02)
+    raise AssertionError("jobs did not finish in time")
+
+def test_job_states():
+    """Test success, failure, timeout and cancellation."""
+    print("🔧 Testing job states...")
+
+    runner = JobRunner(concurrency=2, max_queue=10, default_timeout=5)
+    finished = []
+
+    ok = runner.submit(lambda: sleep_and_return(0.05, 'done'), on_finish=finished.append)
+    failed = runner.submit(fail)
+    # A factory that raises before returning a coroutine
+    broken = runner.submit(lambda: 1 / 0, on_finish=finished.append)
+    timed_out = runner.submit(lambda: sleep_and_return(2), timeout=0.1)
+    cancelled = runner.submit(lambda: sleep_and_return(2))
+    time.sleep(0.05)
+    assert runner.cancel(cancelled)
+
+    wait_until_finished(runner, [ok, failed, broken, timed_out, cancelled])
+    assert runner.status(ok).status == JOB_SUCCEEDED
+    assert runner.status(ok).result == 'done'
+    assert runner.status(failed).status == JOB_FAILED
+    assert runner.status(broken).status == JOB_FAILED and runner.status(broken).error == "division by zero"
+    assert runner.status(timed_out).status == JOB_TIMED_OUT
+    assert runner.status(cancelled).status == JOB_CANCELLED
+    assert sorted(job.id for job in finished) == sorted([ok, broken])
+
+    print("✅ Job states test passed")
+
+def test_bounded_queue():
+    """Test the concurrency limit and queue bound."""
+    print("🔧 Testing bounded queue...")
+
+    runner = JobRunner(concurrency=1, max_queue=2, default_timeout=5)
+    first = runner.submit(lambda: sleep_and_return(0.3))
+    time.sleep(0.05)
+    second = runner.submit(lambda: sleep_and_return(0.01))
+    third = runner.submit(lambda: sleep_and_return(0.01))
+
+    assert runner.queue_position(second) == 1
+    assert runner.queue_position(third) == 2
+    try:
+        runner.submit(lambda: sleep_and_return(0.01))
+        raise AssertionError("expected JobQueueFull")
+    except JobQueueFull:
+        pass
+
+    wait_until_finished(runner, [first, second, third])
+    assert runner.status(second).started_at >= runner.status(first).finished_at
+
+    print("✅ Bounded queue test passed")
+
+def main():
+    """Run all tests."""
+    print("🚀 Running job runner tests...")
+
+    tests = [
+        ("Job States", test_job_states),
+        ("Bounded Queue", test_bounded_queue),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n--- {test_name} ---")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_name} failed: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
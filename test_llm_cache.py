@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the LLM response cache.
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from llm_cache import LLMCache, normalize_prompt
+
+TEMPLATE = "Break down: {user_request}"
+
+def test_cache_keys():
+    """Test that keys ignore whitespace but track model and template changes."""
+    print("🔧 Testing cache keys...")
+
+    key = LLMCache.make_key('breakdown', 'gpt-4o', TEMPLATE, normalize_prompt("Find  stocks\n with ROE > 20"))
+    assert key == LLMCache.make_key('breakdown', 'gpt-4o', TEMPLATE, normalize_prompt(" Find stocks with ROE > 20 "))
+    assert key != LLMCache.make_key('breakdown', 'gpt-4o-mini', TEMPLATE, normalize_prompt("Find stocks with ROE > 20"))
+    assert key != LLMCache.make_key('breakdown', 'gpt-4o', TEMPLATE + "!", normalize_prompt("Find stocks with ROE > 20"))
+
+    print("✅ Cache keys test passed")
+
+def test_ttl_and_lru():
+    """Test hits, TTL expiry and LRU eviction."""
+    print("🔧 Testing TTL and LRU eviction...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMCache(Path(tmp) / 'cache.db', ttl=60, max_entries=2, enabled=True)
+        cache.set('a:1', 'one')
+        cache.set('a:2', 'two')
+        assert cache.get('a:1') == 'one'
+        cache.set('a:3', 'three')
+        assert cache.get('a:2') is None  # least recently used
+        assert cache.get('a:1') == 'one'
+
+        cache.ttl = 0
+        time.sleep(0.01)
+        assert cache.get('a:3') is None
+
+        metrics = cache.get_metrics()
+        assert metrics['hits'] == 2
+        assert metrics['evicted'] == 1
+        assert metrics['expired'] == 1
+
+    print("✅ TTL and LRU eviction test passed")
+
+def main():
+    """Run all tests."""
+    print("🚀 Running LLM cache tests...")
+
+    tests = [
+        ("Cache Keys", test_cache_keys),
+        ("TTL and LRU", test_ttl_and_lru),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n--- {test_name} ---")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_name} failed: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
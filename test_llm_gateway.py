@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the LLM gateway's rate limiting and retries.
+"""
+
+import asyncio
+import sys
+import time
+
+from llm_gateway import LLMGateway, GatewayLLM, TokenBucket
+
+class RateLimited(Exception):
+    """Stand-in for a 429 from the OpenAI API."""
+    status_code = 429
+
+class BadRequest(Exception):
+    """Stand-in for a 400 from the OpenAI API."""
+    status_code = 400
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+        self.usage_metadata = {'input_tokens': 10, 'output_tokens': 5}
+
+class FakeModel:
+    """Langchain-style model that fails its first `failures` calls."""
+
+    def __init__(self, failures=0, error=RateLimited):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error("failed")
+        return FakeMessage(f"answer to {prompt}")
+
+def _gateway(**kwargs):
+    gateway = LLMGateway(**{'rpm': 6000, 'tpm': 10 ** 7, 'share': 1, 'max_retries': 3,
+                            'backoff_base': 0.01, 'backoff_max': 0.05, **kwargs})
+    # Calls go to the fake model, never over HTTP
+    gateway.http_client = lambda: None
+    return gateway
+
+def test_token_bucket():
+    """Test that reservations beyond the bucket's capacity have to wait."""
+    print("🔧 Testing token bucket...")
+
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.reserve(60) == 0.0
+    wait = bucket.reserve(3)
+    assert 2.9 < wait <= 3.0
+    bucket.refund(3)
+    assert bucket.reserve(1) < 1.01
+
+    print("✅ Token bucket test passed")
+
+def test_retries():
+    """Test that rate limits are retried and other errors are not."""
+    print("🔧 Testing retries...")
+
+    gateway = _gateway()
+    model = FakeModel(failures=2)
+    llm = GatewayLLM(lambda http_client: model, gateway, langchain=True)
+    result = asyncio.run(llm.ainvoke("prompt"))
+    assert result.content == "answer to prompt"
+    assert model.calls == 3
+    metrics = gateway.get_metrics()
+    assert metrics['calls'] == 1 and metrics['retries'] == 2
+    assert metrics['prompt_tokens'] == 10 and metrics['completion_tokens'] == 5
+
+    model = FakeModel(failures=1, error=BadRequest)
+    llm = GatewayLLM(lambda http_client: model, gateway, langchain=True)
+    try:
+        asyncio.run(llm.ainvoke("prompt"))
+        assert False, "BadRequest should not be retried"
+    except BadRequest:
+        pass
+    assert model.calls == 1
+
+    model = FakeModel(failures=10)
+    llm = GatewayLLM(lambda http_client: model, gateway, langchain=True)
+    try:
+        asyncio.run(llm.ainvoke("prompt"))
+        assert False, "Retries should run out"
+    except RateLimited:
+        pass
+    assert model.calls == 4
+    assert gateway.get_metrics()['failures'] == 2
+
+    print("✅ Retries test passed")
+
+def test_request_limit():
+    """Test that concurrent calls are spread out to stay within the request limit."""
+    print("🔧 Testing request limit...")
+
+    # 600 requests a minute: a burst of 10, then one every 0.1s
+    gateway = _gateway(rpm=600)
+    gateway.requests = TokenBucket(per_minute=600, capacity=10)
+    model = FakeModel()
+    llm = GatewayLLM(lambda http_client: model, gateway, langchain=True)
+
+    async def burst():
+        await asyncio.gather(*[llm.ainvoke(str(i)) for i in range(15)])
+
+    start = time.perf_counter()
+    asyncio.run(burst())
+    elapsed = time.perf_counter() - start
+    assert model.calls == 15
+    assert 0.45 < elapsed < 1.0, elapsed
+    assert gateway.get_metrics()['throttled_s'] > 0
+
+    print("✅ Request limit test passed")
+
+class ClosingClient:
+    def __init__(self):
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+def test_loop_clients():
+    """Test that a short-lived loop's client and models are closed and dropped, and a new loop builds its own."""
+    print("🔧 Testing per-loop clients...")
+
+    gateway = _gateway()
+    clients = []
+
+    def http_client():
+        loop = asyncio.get_running_loop()
+        if loop not in gateway._http_clients:
+            gateway._http_clients[loop] = ClosingClient()
+            clients.append(gateway._http_clients[loop])
+        return gateway._http_clients[loop]
+
+    gateway.http_client = http_client
+    built = []
+    llm = GatewayLLM(lambda client: built.append(client) or FakeModel(), gateway, langchain=True)
+
+    async def two_calls():
+        try:
+            await llm.ainvoke("one")
+            await llm.ainvoke("two")
+        finally:
+            await gateway.close_loop()
+
+    asyncio.run(two_calls())
+    assert built == clients and len(clients) == 1 and clients[0].closed
+    assert not gateway._http_clients and not gateway._loop_models
+
+    # A loop closed without `close_loop` is dropped when the next loop opens a client
+    asyncio.run(llm.ainvoke("three"))
+    assert len(gateway._loop_models) == 1
+    asyncio.run(two_calls())
+    assert len(clients) == 3 and not gateway._loop_models
+
+    print("✅ Per-loop clients test passed")
+
+def main():
+    """Run all tests."""
+    print("🚀 Running LLM gateway tests...")
+
+    tests = [
+        ("Token Bucket", test_token_bucket),
+        ("Retries", test_retries),
+        ("Request Limit", test_request_limit),
+        ("Per-Loop Clients", test_loop_clients),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n--- {test_name} ---")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_name} failed: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
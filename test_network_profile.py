@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the network interception profile rules.
+"""
+
+import asyncio
+import io
+import sys
+from types import SimpleNamespace
+
+from PIL import Image
+
+from network_profile import NetworkProfile, NetworkInterceptor, downscale_image, format_network_stats
+
+def test_block_rules():
+    """Test that trackers and blocked types are blocked and documents never are."""
+    print("🔧 Testing block rules...")
+
+    profile = NetworkProfile(blocked_types=('Font', 'Media'), blocked_domains=('google-analytics.com',),
+                             allowed_domains=('screener.in',), block_third_party=False)
+    assert profile.block_reason('https://www.google-analytics.com/analytics.js', 'Script') == 'domain'
+    assert profile.block_reason('https://www.screener.in/static/font.woff2', 'Font') == 'type:Font'
+    assert profile.block_reason('https://www.screener.in/static/app.js', 'Script') is None
+    assert profile.block_reason('https://cdn.example.com/lib.js', 'Script') is None
+    assert profile.block_reason('https://www.google-analytics.com/', 'Document') is None
+
+    profile.block_third_party = True
+    assert profile.block_reason('https://cdn.example.com/lib.js', 'Script') == 'third_party'
+    assert profile.block_reason('https://cdn-static.screener.in/lib.js', 'Script') is None
+
+    print("✅ Block rules test passed")
+
+def test_image_downscaling():
+    """Test that wide images are re-encoded smaller and small ones are left alone."""
+    print("🔧 Testing image downscaling...")
+
+    buffer = io.BytesIO()
+    Image.effect_noise((1600, 1200), 64).convert('RGB').save(buffer, format='JPEG')
+    data = buffer.getvalue()
+
+    downscaled, content_type = downscale_image(data, 400)
+    assert content_type == 'image/jpeg'
+    assert len(downscaled) < len(data)
+    assert Image.open(io.BytesIO(downscaled)).width == 400
+    assert downscale_image(data, 2000) is None
+    assert downscale_image(b'not an image', 400) is None
+
+    print("✅ Image downscaling test passed")
+
+def test_step_counts():
+    """Test that step counts are deltas since the previous step."""
+    print("🔧 Testing step counts...")
+
+    interceptor = NetworkInterceptor(NetworkProfile())
+    interceptor.stats.update(requests=10, blocked=4, blocked_by_type={'Font': 3, 'Script': 1})
+    assert interceptor.take_step_counts() == {
+        'requests': 10, 'requests_blocked': 4, 'downscaled_bytes_saved': 0,
+        'requests_blocked_by_type': {'Font': 3, 'Script': 1},
+    }
+    interceptor.stats.update(requests=12, blocked=5, blocked_by_type={'Font': 4, 'Script': 1})
+    assert interceptor.take_step_counts() == {
+        'requests': 2, 'requests_blocked': 1, 'downscaled_bytes_saved': 0, 'requests_blocked_by_type': {'Font': 1},
+    }
+
+    print("✅ Step counts test passed")
+
+class FakeFetch:
+    """Records CDP Fetch calls and handler registrations of one client."""
+
+    def __init__(self):
+        self.calls = []
+        self.handler = None
+
+    def requestPaused(self, handler):
+        self.handler = handler
+
+    async def enable(self, params, session_id=None):
+        self.calls.append(('enable', params, session_id))
+
+    async def disable(self, session_id=None):
+        self.calls.append(('disable', None, session_id))
+
+    async def failRequest(self, params, session_id=None):
+        self.calls.append(('failRequest', params, session_id))
+
+    async def continueRequest(self, params, session_id=None):
+        self.calls.append(('continueRequest', params, session_id))
+
+class FakeClient:
+    def __init__(self):
+        self.fetch = FakeFetch()
+        self.send = self.register = SimpleNamespace(Fetch=self.fetch)
+
+class FakeSession:
+    """Browser session with one tab whose CDP client can be replaced, as on a reconnect."""
+
+    def __init__(self, proxy=None):
+        self.browser_profile = SimpleNamespace(proxy=proxy)
+        self._cdp_client_root = FakeClient()
+        self.session_id = 's1'
+
+    async def get_or_create_cdp_session(self, focus=False):
+        return SimpleNamespace(session_id=self.session_id, cdp_client=self._cdp_client_root)
+
+def test_handler_registration():
+    """Test that the paused-request handler follows a reconnect and keeps proxy auth working."""
+    print("🔧 Testing handler registration...")
+
+    async def run():
+        session = FakeSession(proxy=SimpleNamespace(username='user', password='secret'))
+        first = session._cdp_client_root
+        interceptor = NetworkInterceptor(NetworkProfile(image_max_width=0))
+        await interceptor.attach(session)
+        assert first.fetch.handler is not None
+        assert first.fetch.calls == [('enable', {'patterns': interceptor._patterns(), 'handleAuthRequests': True}, 's1')]
+
+        # A reconnect replaces the client and its sessions; the next step registers and enables again
+        session._cdp_client_root = FakeClient()
+        session.session_id = 's2'
+        await interceptor.enable_for_current_target()
+        assert session._cdp_client_root.fetch.handler is not None
+        assert [call[2] for call in session._cdp_client_root.fetch.calls] == ['s2']
+
+        # Detaching restores browser-use's proxy auth settings instead of turning Fetch off
+        await interceptor.detach()
+        assert session._cdp_client_root.fetch.calls[-1] == ('enable', {'handleAuthRequests': True}, 's2')
+
+        # Without proxy auth the handler is registered once per client and Fetch is disabled on detach
+        session = FakeSession()
+        for _ in range(2):
+            interceptor = NetworkInterceptor(NetworkProfile(image_max_width=0))
+            await interceptor.attach(session)
+            handler = session._cdp_client_root.fetch.handler
+            await interceptor.detach()
+        session._cdp_client_root.fetch.handler = None
+        await NetworkInterceptor(NetworkProfile(image_max_width=0)).attach(session)
+        assert session._cdp_client_root.fetch.handler is None and handler is not None
+        assert ('disable', None, 's1') in session._cdp_client_root.fetch.calls
+
+    asyncio.run(run())
+
+    print("✅ Handler registration test passed")
+
+def test_blocked_by_type():
+    """Test that blocked requests are counted per resource type and reported that way."""
+    print("🔧 Testing blocked counts by type...")
+
+    async def run():
+        session = FakeSession()
+        interceptor = NetworkInterceptor(NetworkProfile(blocked_types=('Font',), blocked_domains=('doubleclick.net',),
+                                                        block_third_party=False, image_max_width=0))
+        await interceptor.attach(session)
+        requests = [
+            ('https://www.screener.in/static/a.woff2', 'Font'),
+            ('https://www.screener.in/static/b.woff2', 'Font'),
+            ('https://ad.doubleclick.net/pixel', 'Image'),
+            ('https://www.screener.in/static/app.js', 'Script'),
+        ]
+        for number, (url, resource_type) in enumerate(requests):
+            event = {'requestId': str(number), 'request': {'url': url}, 'resourceType': resource_type}
+            await interceptor._handle_request(event, 's1')
+        return interceptor
+
+    interceptor = asyncio.run(run())
+    stats = interceptor.get_stats()
+    assert stats['requests'] == 4 and stats['blocked'] == 3
+    assert stats['blocked_by_type'] == {'Font': 2, 'Image': 1}
+    assert "by type: Font=2, Image=1" in format_network_stats(stats)
+    assert interceptor.take_step_counts()['requests_blocked_by_type'] == {'Font': 2, 'Image': 1}
+
+    print("✅ Blocked counts by type test passed")
+
+def main():
+    """Run all tests."""
+    print("🚀 Running network profile tests...")
+
+    tests = [
+        ("Block Rules", test_block_rules),
+        ("Image Downscaling", test_image_downscaling),
+        ("Step Counts", test_step_counts),
+        ("Handler Registration", test_handler_registration),
+        ("Blocked By Type", test_blocked_by_type),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n--- {test_name} ---")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_name} failed: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
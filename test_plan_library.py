@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the workflow plan library.
+"""
+
+import asyncio
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+from agent_manager import combine_steps_into_prompt, fallback_combined_prompt
+from plan_library import PlanLibrary
+
+PROMPT = "Find stocks with P/E ratio less than 15 and market cap above 1000cr and ROE above 20"
+STEPS = ["Open the screener query page", "Enter the P/E, market cap and ROE filters", "Run the query"]
+
+def test_exact_and_fuzzy_lookup():
+    """Test exact matches, near matches and prompts that must not match."""
+    print("🔧 Testing exact and fuzzy lookup...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        library = PlanLibrary(Path(tmp) / 'plans.db', threshold=0.8, enabled=True, version='v1')
+        library.save(PROMPT, STEPS, "combined prompt")
+
+        plan = library.lookup("  find stocks with P/E ratio LESS than 15 and market cap above 1000cr and ROE above 20 ")
+        assert plan['exact'] and plan['steps'] == STEPS and plan['combined_prompt'] == "combined prompt"
+
+        plan = library.lookup("Show me companies with P/E ratio less than 15, market cap above 1000cr, ROE above 20")
+        assert plan is not None and not plan['exact']
+        assert 0.8 <= plan['score'] < 1.0
+
+        # Different numbers or comparisons are different screens
+        assert library.lookup("Find stocks with P/E ratio less than 12 and market cap above 1000cr and ROE above 20") is None
+        assert library.lookup("Find stocks with P/E ratio more than 15 and market cap above 1000cr and ROE above 20") is None
+        assert library.lookup("Find stocks with low debt") is None
+
+        metrics = library.get_metrics()
+        assert metrics['exact_hits'] == 1 and metrics['fuzzy_hits'] == 1 and metrics['misses'] == 3
+
+    print("✅ Exact and fuzzy lookup test passed")
+
+def test_versions_and_eviction():
+    """Test that template changes drop old plans and the least recently used plans are evicted."""
+    print("🔧 Testing versions and eviction...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'plans.db'
+        library = PlanLibrary(path, max_entries=2, enabled=True, version='v1')
+        library.save("ROE above 20", STEPS, "a")
+        library.save("Debt to equity below 0.5", STEPS, "b")
+        assert library.lookup("ROE above 20") is not None
+        library.save("Dividend yield above 3", STEPS, "c")
+        assert library.lookup("Debt to equity below 0.5") is None
+        assert library.get_metrics()['entries'] == 2
+
+        # Reopening with the same templates keeps the plans; new templates drop them
+        assert PlanLibrary(path, enabled=True, version='v1').get_metrics()['entries'] == 2
+        library = PlanLibrary(path, enabled=True, version='v2')
+        assert library.get_metrics()['entries'] == 0
+        assert library.get_metrics()['invalidated'] == 2
+        assert library.lookup("ROE above 20") is None
+
+    print("✅ Versions and eviction test passed")
+
+class FailingLLM:
+    async def ainvoke(self, prompt):
+        raise RuntimeError("rate limited")
+
+def test_combine_failure():
+    """Test that a failed combination can be told apart from a real one, so it is never saved as a plan."""
+    print("🔧 Testing combination failures...")
+
+    # Edited steps, unique per run so no cached combination answers them
+    steps = STEPS[:-1] + [f"Run the query {uuid.uuid4().hex}"]
+    try:
+        asyncio.run(combine_steps_into_prompt(PROMPT, steps, generated_steps=STEPS, model=FailingLLM(), fallback=False))
+        assert False, "combination should have failed"
+    except RuntimeError:
+        pass
+
+    fallback = asyncio.run(combine_steps_into_prompt(PROMPT, steps, generated_steps=STEPS, model=FailingLLM()))
+    assert fallback == fallback_combined_prompt(PROMPT, steps)
+
+    print("✅ Combination failures test passed")
+
+def main():
+    """Run all tests."""
+    print("🚀 Running plan library tests...")
+
+    tests = [
+        ("Exact and Fuzzy Lookup", test_exact_and_fuzzy_lookup),
+        ("Versions and Eviction", test_versions_and_eviction),
+        ("Combination Failures", test_combine_failure),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n--- {test_name} ---")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_name} failed: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script to verify token-budget compaction of execution prompts.
+"""
+
+import sys
+
+from agent_manager import build_combined_prompt
+from prompt_compaction import compact_prompt, count_tokens, format_compaction
+
+VERBOSE_PROMPT = """**Objective:** Find undervalued small-cap stocks on screener.in.
+
+Please make sure to carefully follow these steps in order to complete the task:
+
+1. Navigate to screener.in and log in with the provided credentials. Wait for the page to load completely.
+2. Verify that you are logged in.
+3. Set the P/E ratio filter to less than 15. Please wait for the page to load completely.
+4. Apply the filters and run the query.
+5. Give the filtered results, including company names and P/E.
+
+Perform every step directly on the website without asking for confirmation. Please make sure to log in with the provided credentials."""
+
+def test_shorten_and_dedupe():
+    """Test that filler and repeated instructions are removed and nothing else changes."""
+    print("🔧 Testing filler and repeat removal...")
+
+    result = compact_prompt(VERBOSE_PROMPT, budget=0)
+    lines = result.text.splitlines()
+    assert lines[0] == "Objective: Find undervalued small-cap stocks on screener.in."
+    assert lines[2] == "Follow these steps to complete the task:"
+    assert lines[4] == "1. Navigate to screener.in and log in with the credentials. Wait for the page to load completely."
+    assert lines[6] == "3. Set the P/E ratio filter to less than 15."
+    assert "without asking for confirmation" in result.text
+    assert result.dropped == ["Please wait for the page to load completely.",
+                              "Please make sure to log in with the provided credentials."]
+    assert result.tokens_after == count_tokens(result.text) < result.tokens_before
+
+    # Steps differing only in their values are not repeats
+    steps = ["Set P/E ratio filter to less than 15", "Set P/E ratio filter to less than 12"]
+    assert compact_prompt('\n'.join(steps), budget=0).text == '\n'.join(steps)
+
+    # Nor are filter steps differing in one word, but a word-for-word repeat is
+    steps = [
+        "1. Click on the ROE field, type ROE greater than 15 and press enter.",
+        "2. Click on the ROCE field, type ROCE greater than 15 and press enter.",
+        "3. Set the minimum value of Price to Earnings to 15.",
+        "4. Set the maximum value of Price to Earnings to 15.",
+    ]
+    assert compact_prompt('\n'.join(steps), budget=0).text == '\n'.join(steps)
+    repeated = compact_prompt('\n'.join(steps + ["5. Set the maximum value of price to earnings to 15"]), budget=0)
+    assert repeated.text == '\n'.join(steps)
+
+    # The template prompt is already compact
+    template = build_combined_prompt("Find stocks with P/E below 15", ["Set P/E ratio filter to less than 15"])
+    assert compact_prompt(template, budget=0).text == template
+
+    print("✅ Filler and repeat removal test passed")
+
+def test_budget():
+    """Test that an over-budget prompt loses low-value sentences, renumbers its steps and keeps its values."""
+    print("🔧 Testing token budget...")
+
+    result = compact_prompt(VERBOSE_PROMPT, budget=1)
+    assert result.over_budget
+    assert "Wait for the page" not in result.text and "Verify" not in result.text
+    assert "2. Set the P/E ratio filter to less than 15." in result.text
+    assert "4. Give the filtered results, including company names and P/E." in result.text
+    assert "without asking for confirmation" in result.text
+
+    # Sentences are dropped last ones first, only until the prompt fits
+    full = compact_prompt(VERBOSE_PROMPT, budget=0)
+    fitted = compact_prompt(VERBOSE_PROMPT, budget=full.tokens_after - 1)
+    assert not fitted.over_budget
+    assert "Verify" not in fitted.text and "Wait for the page to load completely." in fitted.text
+
+    disabled = compact_prompt(VERBOSE_PROMPT, budget=1, enabled=False)
+    assert disabled.text == VERBOSE_PROMPT and disabled.saved_tokens == 0
+
+    print("✅ Token budget test passed")
+
+def test_savings():
+    """Test the per-run token and cost estimates."""
+    print("🔧 Testing savings estimates...")
+
+    result = compact_prompt(VERBOSE_PROMPT, budget=0)
+    savings = result.savings(10, cost_per_mtok=2.5)
+    assert savings['prompt_tokens_saved'] == result.saved_tokens * 10
+    assert abs(savings['prompt_cost_saved_usd'] - result.saved_tokens * 10 * 2.5 / 1_000_000) < 1e-12
+    assert result.savings(None)['prompt_tokens_saved'] == 0
+    assert "saved over 10 steps" in format_compaction(result, 10)
+
+    print("✅ Savings estimates test passed")
+
+def main():
+    """Run all tests."""
+    print("🚀 Running prompt compaction tests...")
+
+    tests = [
+        ("Filler and Repeat Removal", test_shorten_and_dedupe),
+        ("Token Budget", test_budget),
+        ("Savings Estimates", test_savings),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n--- {test_name} ---")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_name} failed: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
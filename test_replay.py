@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test script to verify HTTP and LLM record/replay.
+"""
+
+import asyncio
+import sys
+import tempfile
+
+from replay import Cassette, HttpArchive, LLMRecording, RecordingLLM, ReplayLLM, ReplayMiss
+
+class FakeMessage:
+    def __init__(self, text):
+        self.text = text
+
+class FakeChunk:
+    def __init__(self, content):
+        self.content = content
+
+class FakeLangchainLLM:
+    """Stands in for the langchain ChatOpenAI."""
+
+    async def ainvoke(self, prompt, **kwargs):
+        return FakeChunk(f"combined: {prompt}")
+
+    async def astream(self, prompt, **kwargs):
+        for part in ("1. Open screener.in\n", "2. Run ", "the screen\n"):
+            yield FakeChunk(part)
+
+def test_http_archive():
+    """Test that responses are served by body, URL and path, in recorded order."""
+    print("🔧 Testing HTTP archive...")
+
+    archive = HttpArchive()
+    headers = [{'name': 'Content-Type', 'value': 'text/html'}, {'name': 'Set-Cookie', 'value': 'sessionid=x'}]
+    archive.add('GET', 'https://www.screener.in/', None, 200, 'OK', headers, b'<html>first</html>')
+    archive.add('GET', 'https://www.screener.in/', None, 200, 'OK', headers, b'<html>second</html>')
+    archive.add('POST', 'https://www.screener.in/login/', 'password=real', 302, 'Found', [], b'')
+
+    assert [h['name'] for h in archive.entries[0]['response']['headers']] == ['Content-Type']
+    assert 'real' not in str(archive.entries[2])
+
+    first = archive.lookup('GET', 'https://www.screener.in/')
+    second = archive.lookup('GET', 'https://www.screener.in/')
+    third = archive.lookup('GET', 'https://www.screener.in/?_=123')
+    assert first['response']['content']['size'] == len(b'<html>first</html>')
+    assert second['response']['content']['size'] == len(b'<html>second</html>')
+    assert third is not None
+    assert archive.lookup('POST', 'https://www.screener.in/login/', 'password=placeholder')['response']['status'] == 302
+    assert archive.lookup('GET', 'https://example.com/') is None
+
+    print("✅ HTTP archive test passed")
+
+def test_langchain_round_trip():
+    """Test that recorded langchain calls replay with the same content and streamed lines."""
+    print("🔧 Testing langchain record and replay...")
+
+    async def run():
+        recording = LLMRecording()
+        recorder = RecordingLLM(FakeLangchainLLM(), recording, langchain=True)
+        streamed = ''.join([chunk.content async for chunk in recorder.astream("break down")])
+        combined = (await recorder.ainvoke("combine")).content
+
+        replayer = ReplayLLM(LLMRecording(recording.calls), langchain=True)
+        chunks = [chunk.content async for chunk in replayer.astream("break down")]
+        assert ''.join(chunks) == streamed
+        assert len(chunks) == 2
+        assert (await replayer.ainvoke("combine")).content == combined
+        try:
+            await replayer.ainvoke("combine")
+            assert False, "expected a replay miss"
+        except ReplayMiss:
+            pass
+
+    asyncio.run(run())
+    print("✅ Langchain record and replay test passed")
+
+def test_agent_replay():
+    """Test that structured agent outputs replay by prompt, falling back to call order."""
+    print("🔧 Testing agent output replay...")
+
+    from pydantic import BaseModel
+
+    class Output(BaseModel):
+        next_goal: str
+        done: bool = False
+
+    recording = LLMRecording()
+    recording.add('agent', [FakeMessage("step 1")], Output(next_goal="open").model_dump_json(exclude_unset=True), 'json')
+    recording.add('agent', [FakeMessage("step 2")], Output(next_goal="finish", done=True).model_dump_json(), 'json')
+
+    async def run():
+        llm = ReplayLLM(recording, model='gpt-test')
+        # Prompt 2 matches exactly; the changed prompt falls back to the remaining call
+        second = await llm.ainvoke([FakeMessage("step 2")], Output)
+        first = await llm.ainvoke([FakeMessage("step 1 at 12:01")], Output)
+        assert second.completion.done and second.completion.next_goal == "finish"
+        assert first.completion.next_goal == "open"
+        assert llm.model == 'gpt-test'
+
+    asyncio.run(run())
+    print("✅ Agent output replay test passed")
+
+def test_cassette_files():
+    """Test that a recorded cassette loads back for replay."""
+    print("🔧 Testing cassette files...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        recorded = Cassette('demo', 'record', directory=tmp)
+        recorded.archive.add('GET', 'https://www.screener.in/', None, 200, 'OK', [], b'ok')
+        recorded.llm_calls.add('invoke', "combine", "combined")
+        recorded.save(query="Find stocks")
+
+        replayed = Cassette('demo', 'replay', directory=tmp)
+        assert replayed.replaying
+        assert replayed.meta['query'] == "Find stocks"
+        assert replayed.archive.lookup('GET', 'https://www.screener.in/') is not None
+        assert len(replayed.llm_calls.calls) == 1
+
+    print("✅ Cassette files test passed")
+
+def main():
+    """Run all tests."""
+    print("🚀 Running record/replay tests...")
+
+    tests = [
+        ("HTTP Archive", test_http_archive),
+        ("Langchain Round Trip", test_langchain_round_trip),
+        ("Agent Replay", test_agent_replay),
+        ("Cassette Files", test_cassette_files),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n--- {test_name} ---")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_name} failed: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
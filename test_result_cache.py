@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the execution result cache and single-flight runs.
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from event_channel import create_channel, retain_channel, get_channel, drop_channel, leave_channel
+from result_cache import ResultCache, credential_scope, result_cache_key, format_freshness
+from run_store import RunStore, RUN_SUCCEEDED, RUN_FAILED
+
+ALICE = {'email': 'alice@example.com', 'password': 'one'}
+
+def _record(store, run_id, key, status=RUN_SUCCEEDED, result="12 stocks found", error=None, age=0):
+    store.start_run(run_id, "Find stocks with P/E below 15", combined_prompt="Execute: P/E below 15", cache_key=key)
+    store.finish_run(run_id, status, result=result, error=error)
+    store._connect().execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time() - age, run_id))
+
+def test_cache_keys():
+    """Test that keys ignore whitespace but not the prompt, the app user or the credentials."""
+    print("🔧 Testing cache keys...")
+
+    key = result_cache_key("Set P/E  below 15\nand show results", ALICE, 'alice')
+    assert key == result_cache_key("  Set P/E below 15 and show results ", {'email': 'Alice@Example.com ', 'password': 'one'},
+                                   'alice')
+    assert key != result_cache_key("Set P/E below 12 and show results", ALICE, 'alice')
+    # Another app user, or someone who only knows the email, never shares Alice's runs
+    assert key != result_cache_key("Set P/E below 15 and show results", ALICE, 'mallory')
+    assert key != result_cache_key("Set P/E below 15 and show results", {**ALICE, 'password': 'guess'}, 'alice')
+    assert key != result_cache_key("Set P/E below 15 and show results", {'email': 'bob@example.com'}, 'alice')
+    assert 'alice' not in credential_scope(ALICE, 'alice')
+    assert format_freshness(0) == "Always run fresh"
+    assert format_freshness(900) == "15 minutes" and format_freshness(3600) == "1 hour"
+
+    print("✅ Cache keys test passed")
+
+def test_freshness_window():
+    """Test that only successful runs within the requested window are served."""
+    print("🔧 Testing freshness windows...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = RunStore(Path(tmp) / 'runs.db', enabled=True)
+        cache = ResultCache(store, enabled=True)
+        key = result_cache_key("Set P/E below 15", ALICE)
+        _record(store, 'old', key, age=3000)
+        _record(store, 'failed', key, status=RUN_FAILED, result=None, error="Login failed", age=10)
+        _record(store, 'other', result_cache_key("Set P/E below 12", ALICE), age=10)
+
+        assert cache.lookup(key, 900) is None
+        assert cache.lookup(key, 3600)['run_id'] == 'old'
+        _record(store, 'recent', key, age=60)
+        assert cache.lookup(key, 900)['run_id'] == 'recent'
+        assert cache.lookup(key, 0) is None
+        assert ResultCache(store, enabled=False).lookup(key, 3600) is None
+
+        metrics = cache.get_metrics()
+        assert metrics['hits'] == 2 and metrics['misses'] == 1
+
+    print("✅ Freshness windows test passed")
+
+def test_single_flight():
+    """Test that identical requests join the in-flight run and start a new one once it is done."""
+    print("🔧 Testing single flight...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(RunStore(Path(tmp) / 'runs.db', enabled=False), enabled=True)
+        active = set()
+        submitted = []
+
+        def submit():
+            run_id = f"run-{len(submitted) + 1}"
+            submitted.append(run_id)
+            active.add(run_id)
+            return run_id
+
+        assert cache.single_flight('k', active.__contains__, submit) == ('run-1', False)
+        assert cache.single_flight('k', active.__contains__, submit) == ('run-1', True)
+        assert cache.single_flight('k', active.__contains__, submit, force_refresh=True) == ('run-1', True)
+        assert cache.single_flight('other', active.__contains__, submit) == ('run-2', False)
+
+        # A run that finished without being released is not joined
+        active.discard('run-1')
+        assert cache.single_flight('k', active.__contains__, submit, force_refresh=True) == ('run-3', False)
+        cache.release('k', 'run-3')
+        cache.release('other', 'run-2')
+        assert cache.get_metrics()['inflight'] == 0
+        assert cache.get_metrics()['joined'] == 2 and cache.get_metrics()['refreshes'] == 1
+
+    print("✅ Single flight test passed")
+
+def test_shared_channel():
+    """Test that a joined run's channel stays registered until every session drops it."""
+    print("🔧 Testing shared channels...")
+
+    channel = create_channel('shared-run')
+    assert retain_channel('shared-run') is channel
+    drop_channel('shared-run')
+    assert get_channel('shared-run') is channel
+
+    # Cancelling from one of two followers only leaves the run; the last follower cancels it
+    assert retain_channel('shared-run') is channel
+    assert leave_channel('shared-run')
+    assert not leave_channel('shared-run')
+    assert get_channel('shared-run') is channel
+    drop_channel('shared-run')
+    assert get_channel('shared-run') is None
+    assert retain_channel('shared-run') is None
+
+    print("✅ Shared channels test passed")
+
+def main():
+    """Run all tests."""
+    print("🚀 Running result cache tests...")
+
+    tests = [
+        ("Cache Keys", test_cache_keys),
+        ("Freshness Windows", test_freshness_window),
+        ("Single Flight", test_single_flight),
+        ("Shared Channels", test_shared_channel),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n--- {test_name} ---")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_name} failed: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
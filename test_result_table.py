@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test script to verify result tables read from screener.in results pages.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+from result_table import ResultTable, load_result_table, table_to_csv
+from screen_query import page_url, page_count
+
+HEADERS = ['S.No.', 'Name', 'CMP\nRs.', 'P/E', 'Mar Cap\nRs.Cr.', 'ROE\n%']
+
+def test_typed_columns():
+    """Test that pages are combined and numeric columns become floats."""
+    print("🔧 Testing typed columns...")
+
+    table = ResultTable()
+    table.add_page(HEADERS, [
+        ['1.', 'Alpha Ltd', '1,234.50', '9.5', '12,000', '21.4%'],
+        ['2.', 'Beta Ltd', '88.10', '', '1,500', '18'],
+    ])
+    # A later page with a missing cell is padded to the first page's columns
+    table.add_page(HEADERS, [['3.', 'Gamma Ltd', '410', '-', '2,200']])
+    assert table.num_rows == 3 and table.pages == 2
+
+    frame = table.to_pandas()
+    assert list(frame.columns) == ['S.No.', 'Name', 'CMP Rs.', 'P/E', 'Mar Cap Rs.Cr.', 'ROE %']
+    assert frame['Name'].tolist() == ['Alpha Ltd', 'Beta Ltd', 'Gamma Ltd']
+    assert frame['CMP Rs.'].tolist() == [1234.5, 88.1, 410.0]
+    assert frame['P/E'].isna().tolist() == [False, True, True]
+    assert frame['Mar Cap Rs.Cr.'].dtype == 'float64'
+    assert frame['ROE %'].tolist()[:2] == [21.4, 18.0]
+
+    print("✅ Typed columns test passed")
+
+def test_save_and_export():
+    """Test that a saved table loads back with its types and exports as CSV."""
+    print("🔧 Testing save and export...")
+
+    table = ResultTable()
+    table.add_page(['Name', 'P/E'], [['Alpha Ltd', '9.5'], ['Beta, Ltd', '12']])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = table.save(Path(tmp) / 'run.parquet')
+        frame = load_result_table(path)
+        assert frame['P/E'].tolist() == [9.5, 12.0]
+        csv = table_to_csv(path).decode('utf-8').splitlines()
+        assert csv[0] == '"Name","P/E"'
+        assert csv[2] == '"Beta, Ltd",12'
+
+    print("✅ Save and export test passed")
+
+def test_pagination():
+    """Test results page URLs and how many pages are read."""
+    print("🔧 Testing pagination...")
+
+    url = 'https://www.screener.in/screen/raw/?query=P%2FE+%3C+15&limit=50&page=3'
+    assert page_url(url, 2) == 'https://www.screener.in/screen/raw/?query=P%2FE+%3C+15&limit=50&page=2'
+    assert page_url(url, 1) == 'https://www.screener.in/screen/raw/?query=P%2FE+%3C+15&limit=50'
+
+    rows = [['row']] * 50
+    assert page_count({'pages': 1, 'total': 120, 'rows': rows}) == 3
+    assert page_count({'pages': 4, 'total': None, 'rows': rows}) == 4
+    assert page_count({'pages': 1, 'total': 5000, 'rows': rows}, max_pages=20) == 20
+    assert page_count({'pages': 1, 'total': 0, 'rows': []}) == 1
+
+    print("✅ Pagination test passed")
+
+def main():
+    """Run all tests."""
+    print("🚀 Running result table tests...")
+
+    tests = [
+        ("Typed Columns", test_typed_columns),
+        ("Save and Export", test_save_and_export),
+        ("Pagination", test_pagination),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n--- {test_name} ---")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_name} failed: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the run history store and its search.
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from event_channel import EventChannel, EVENT_STEP_START, EVENT_STEP_END, EVENT_SCREENSHOT, EVENT_COMPLETED
+from run_store import RunStore, RUN_SUCCEEDED, RUN_FAILED, RUN_RUNNING
+
+def _record(store, run_id, prompt, app_user='alice', result=None, status=RUN_SUCCEEDED):
+    store.start_run(run_id, prompt, app_user=app_user, combined_prompt=f"Execute: {prompt}", steps=[prompt])
+    channel = EventChannel(run_id)
+    channel.publish(EVENT_STEP_START, step=1, goal="Open screen query")
+    channel.publish(EVENT_SCREENSHOT, step=1, frame={'path': f"/tmp/{run_id}.png", 'step': 1})
+    channel.publish(EVENT_STEP_END, step=1, action="Open screen query", result="Opened the results page")
+    channel.publish(EVENT_COMPLETED, result=result)
+    store.finish_run(run_id, status, result=result, agent_steps=1, direct=True, events=channel.read_since(0),
+                     metrics={'wall_s': 2.5})
+
+def test_record_and_get():
+    """Test that a run's prompt, outcome, step log and screenshots are recorded."""
+    print("🔧 Testing run records...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = RunStore(Path(tmp) / 'runs.db', enabled=True)
+        store.start_run('r1', "Find stocks with P/E below 15", app_user='alice', steps=["Set P/E below 15"])
+        assert store.get_run('r1')['status'] == RUN_RUNNING
+
+        _record(store, 'r1', "Find stocks with P/E below 15", result="12 stocks found: Alpha Ltd, Beta Ltd")
+        run = store.get_run('r1')
+        assert run['status'] == RUN_SUCCEEDED and run['direct'] == 1 and run['agent_steps'] == 1
+        assert run['steps'] == ["Find stocks with P/E below 15"]
+        assert run['thoughts'] == [{'step': 1, 'goal': "Open screen query", 'started_at': run['thoughts'][0]['started_at'],
+                                    'action': "Open screen query", 'result': "Opened the results page"}]
+        assert run['screenshots'] == [{'path': "/tmp/r1.png", 'step': 1}]
+        assert run['metrics'] == {'wall_s': 2.5}
+        assert run['duration_s'] >= 0
+        assert store.get_run('missing') is None
+
+    print("✅ Run records test passed")
+
+def test_search_and_lookup():
+    """Test full-text search, per-user listing and lookup by prompt."""
+    print("🔧 Testing search and lookup...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = RunStore(Path(tmp) / 'runs.db', enabled=True)
+        _record(store, 'r1', "Find stocks with P/E below 15", result="Alpha Ltd, Beta Ltd")
+        _record(store, 'r2', "Companies with ROE above 20", result="Gamma Industries")
+        _record(store, 'r3', "Companies with ROE above 20", app_user='bob', result="Gamma Industries")
+        _record(store, 'r4', "find stocks with  P/E below 15 ", status=RUN_FAILED)
+
+        assert [run['run_id'] for run in store.search("gamma", 'alice')] == ['r2']
+        assert [run['run_id'] for run in store.search("gam", 'bob')] == ['r3']
+        assert {run['run_id'] for run in store.search("P/E below", 'alice')} == {'r1', 'r4'}
+        assert store.search('"unbalanced', 'alice') == []
+        assert store.search("   ", 'alice') == []
+
+        assert [run['run_id'] for run in store.recent('alice')] == ['r4', 'r2', 'r1']
+        assert [run['run_id'] for run in store.runs_for_prompt("FIND stocks with P/E below 15", 'alice')] == ['r4', 'r1']
+        assert [run['run_id'] for run in store.runs_for_prompt(
+            "Find stocks with P/E below 15", 'alice', status=RUN_SUCCEEDED)] == ['r1']
+
+    print("✅ Search and lookup test passed")
+
+def test_retention():
+    """Test that runs past the retention period are dropped from the table and the search index."""
+    print("🔧 Testing retention...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = RunStore(Path(tmp) / 'runs.db', retention=60, enabled=True)
+        _record(store, 'old', "Dividend yield above 3", result="Delta Ltd")
+        store._connect().execute("UPDATE runs SET started_at = ?", (time.time() - 120,))
+        _record(store, 'new', "Debt to equity below 0.5", result="Epsilon Ltd")
+        assert store.count() == 1
+        assert store.search("delta", 'alice') == []
+        assert [run['run_id'] for run in store.search("epsilon", 'alice')] == ['new']
+
+    print("✅ Retention test passed")
+
+def main():
+    """Run all tests."""
+    print("🚀 Running run store tests...")
+
+    tests = [
+        ("Run Records", test_record_and_get),
+        ("Search and Lookup", test_search_and_lookup),
+        ("Retention", test_retention),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n--- {test_name} ---")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_name} failed: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test script to verify compiling workflow steps into screener.in screen queries.
+"""
+
+import asyncio
+import sys
+from urllib.parse import parse_qs, urlparse
+
+from result_table import ResultTable
+from screen_query import ScreenCompileError, ScreenResult, compile_steps, open_screen, extract_results
+
+STEPS = [
+    "Navigate to screener.in and log in with the provided credentials",
+    "Set P/E ratio filter to less than 15",
+    "Set market cap filter to above 1000cr",
+    "Apply filters and give the filtered results",
+]
+
+class FakeCDP:
+    """Answers Runtime.evaluate like a page that redirects to the login form until it is submitted."""
+
+    def __init__(self, session):
+        self.session = session
+        self.send = self
+        self.Runtime = self
+
+    async def evaluate(self, params, session_id=None):
+        expression = params['expression']
+        if 'readyState' in expression:
+            return {'result': {'value': {'url': self.session.url, 'ready': 'complete'}}}
+        if 'form.submit()' in expression:
+            self.session.logged_in = True
+            self.session.url = self.session.next_url
+            return {'result': {'value': True}}
+        return {'result': {'value': {'headers': ['S.No.', 'Name', 'P/E'], 'total': 2, 'found': True,
+                                     'rows': [['1', 'Alpha Ltd', '9.5'], ['2', 'Beta | Co', '12.1']]}}}
+
+class FakeSession:
+    def __init__(self):
+        self.url = 'about:blank'
+        self.next_url = None
+        self.logged_in = False
+        self.cdp_client = FakeCDP(self)
+        self.session_id = 'page'
+
+    async def navigate_to(self, url):
+        self.next_url = url
+        self.url = url if self.logged_in else 'https://www.screener.in/login/?next=/screen/raw/'
+
+    async def get_or_create_cdp_session(self, focus=True):
+        return self
+
+def test_compile_steps():
+    """Test that filter steps compile into a query and navigation steps are skipped."""
+    print("🔧 Testing step compilation...")
+
+    screen = compile_steps(STEPS)
+    assert screen.conditions == [('Price to earning', '<', 15.0), ('Market Capitalization', '>', 1000.0)]
+    assert screen.describe() == "Price to earning < 15 AND Market Capitalization > 1000"
+    query = parse_qs(urlparse(screen.url).query)['query'][0]
+    assert query == "Price to earning < 15 AND\nMarket Capitalization > 1000"
+
+    screen = compile_steps(["Filter ROE above 20% and debt to equity below 0.5",
+                            "Set P/E between 10 and 20 and market cap above 1 lakh crore"])
+    assert screen.describe() == ("Return on equity > 20 AND Debt to equity < 0.5 AND Price to earning > 10 AND "
+                                 "Price to earning < 20 AND Market Capitalization > 100000")
+
+    print("✅ Step compilation test passed")
+
+def test_compile_failures():
+    """Test that steps a screen query cannot express are left to the browser agent."""
+    print("🔧 Testing compilation failures...")
+
+    for steps in (
+        ["Set P/E less than 15", "Sort the results by market cap"],
+        ["Set P/E less than 15 for banking stocks"],
+        ["Set P/E less than 15", "Set P/E less than 12"],
+        ["Set P/E above 20", "Set P/E below 10"],
+        ["Apply the P/E and ROE filters", "Set P/E less than 15"],
+        ["Open the top 10 stocks"],
+        ["Navigate to screener.in and show the results"],
+    ):
+        try:
+            compile_steps(steps)
+            assert False, f"{steps} should not compile"
+        except ScreenCompileError:
+            pass
+
+    print("✅ Compilation failures test passed")
+
+def test_open_and_extract():
+    """Test logging in on the way to the screen and reading its results table."""
+    print("🔧 Testing screen execution...")
+
+    screen = compile_steps(STEPS)
+    session = FakeSession()
+    logged_in = asyncio.run(open_screen(session, screen, {'email': 'user@example.com', 'password': 'x'}))
+    assert logged_in and session.url == screen.url
+
+    data = asyncio.run(extract_results(session))
+    table = ResultTable()
+    table.add_page(data['headers'], data['rows'])
+    result = ScreenResult(screen, table, data['total'])
+    assert result.is_done() and result.number_of_steps() == 2
+    text = result.final_result()
+    assert "| S.No. | Name | P/E |" in text
+    assert "| 2 | Beta \\| Co | 12.1 |" in text
+    assert "No stocks match" in ScreenResult(screen, ResultTable(), 0).final_result()
+
+    print("✅ Screen execution test passed")
+
+def main():
+    """Run all tests."""
+    print("🚀 Running screen query tests...")
+
+    tests = [
+        ("Step Compilation", test_compile_steps),
+        ("Compilation Failures", test_compile_failures),
+        ("Screen Execution", test_open_and_extract),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n--- {test_name} ---")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_name} failed: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
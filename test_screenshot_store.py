@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the screenshot store.
+"""
+
+import io
+import sys
+import tempfile
+
+from PIL import Image, ImageDraw
+
+from screenshot_store import ScreenshotStore, prune_disk_cache
+
+def make_png(blocks, size=(1920, 2400)):
+    """Render a synthetic page screenshot with a number of coloured blocks."""
+    image = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(image)
+    for i in range(blocks):
+        draw.rectangle([i * 40, i * 30, i * 40 + 300, i * 30 + 120], fill=(i * 37 % 255, 80, 160))
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def test_dedup_and_disk_spill():
+    """Test that consecutive duplicates are skipped and frames spill to disk."""
+    print("🔧 Testing deduplication and disk spill...")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        store = ScreenshotStore(cache_dir=cache_dir)
+        first = store.add(make_png(3), step=1, label='start')
+        duplicate = store.add(make_png(3), step=1, label='end')
+        second = store.add(make_png(9), step=2, label='start')
+
+        assert first is not None and second is not None
+        assert duplicate is None
+        assert len(store) == 2
+        assert store.full_image(first) == make_png(3)
+        assert Image.open(io.BytesIO(store.thumbnail(first))).width == store.thumbnail_width
+
+    print("✅ Deduplication and disk spill test passed")
+
+def test_thumbnail_budget():
+    """Test that thumbnails are evicted over budget and regenerated on demand."""
+    print("🔧 Testing thumbnail memory budget...")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        store = ScreenshotStore(cache_dir=cache_dir, budget_bytes=20000)
+        for blocks in range(1, 8):
+            store.add(make_png(blocks * 4), step=blocks)
+
+        assert store.memory_bytes() <= 20000 or len(store._thumbnails) == 1
+        assert store.stats['evictions'] > 0
+        assert store.thumbnail(store[0]).startswith(b'\xff\xd8')
+
+        # Frames of a live store stay until the store forgets them
+        count = len(store)
+        assert prune_disk_cache(cache_dir, max_bytes=0) == 0
+        store.clear()
+        assert prune_disk_cache(cache_dir, max_bytes=0) == count
+
+    print("✅ Thumbnail memory budget test passed")
+
+def test_pruning_shared_frames():
+    """Test that frames registered from another process survive pruning, and pruned ones read as missing."""
+    print("🔧 Testing pruning of shared frames...")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # A worker process writes the frames and forgets them; the UI registers their references
+        worker = ScreenshotStore(cache_dir=cache_dir)
+        refs = [worker.add(make_png(blocks), step=blocks).to_dict() for blocks in (3, 9)]
+        worker.clear()
+        ui = ScreenshotStore(cache_dir=cache_dir)
+        frames = [ui.add_existing(ref) for ref in refs]
+
+        assert prune_disk_cache(cache_dir, max_bytes=0) == 0
+        assert ui.full_image(frames[0]) == make_png(3)
+
+        # A frame pruned anyway (e.g. by another process) is reported missing, not raised
+        assert prune_disk_cache(cache_dir, max_bytes=0, keep=()) == 2
+        assert ui.full_image(frames[1]) is None
+        assert ui.thumbnail(frames[1]) is None
+
+    print("✅ Pruning of shared frames test passed")
+
+def main():
+    """Run all tests."""
+    print("🚀 Running screenshot store tests...")
+
+    tests = [
+        ("Dedup and Disk Spill", test_dedup_and_disk_spill),
+        ("Thumbnail Budget", test_thumbnail_budget),
+        ("Pruning Shared Frames", test_pruning_shared_frames),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n--- {test_name} ---")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_name} failed: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the bounded agent thought log.
+"""
+
+import sys
+import tempfile
+
+from thought_log import ThoughtLog, ENTRY_COMPLETED, format_entry
+
+def test_eviction_and_paging():
+    """Test that old entries spill to disk and stay readable page by page."""
+    print("🔧 Testing eviction and paging...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = ThoughtLog('run-1', max_entries=5, directory=tmp)
+        for step in range(1, 13):
+            log.start_step(step, f"Goal {step}")
+
+        assert len(log) == 12
+        assert log.evicted == 7
+        assert log.page_count(5) == 3
+        assert [entry['step'] for entry in log.page(0, 5)] == [8, 9, 10, 11, 12]
+        assert [entry['step'] for entry in log.page(1, 5)] == [3, 4, 5, 6, 7]
+        assert [entry['step'] for entry in log.page(2, 5)] == [1, 2]
+        assert log.page(3, 5) == []
+
+        # A second session following the same run spills to its own file
+        follower = ThoughtLog('run-1', max_entries=5, directory=tmp)
+        for step in range(1, 9):
+            follower.start_step(step, f"Goal {step}")
+        assert follower.spill_path != log.spill_path
+        assert [entry['step'] for entry in log.page(2, 5)] == [1, 2]
+
+        log.clear()
+        assert len(log) == 0
+        assert not log.spill_path.exists()
+        assert [entry['step'] for entry in follower.page(1, 5)] == [1, 2, 3]
+
+    # Without spilling, evicted entries are gone
+    log = ThoughtLog('run-2', max_entries=5, spill=False)
+    for step in range(1, 13):
+        log.start_step(step, f"Goal {step}")
+    assert log.page_count(5) == 1
+    assert [entry['step'] for entry in log.page(0, 3)] == [10, 11, 12]
+    assert [entry['step'] for entry in log.page(1, 3)] == [8, 9]
+
+    print("✅ Eviction and paging test passed")
+
+def test_step_outcome():
+    """Test that a step's action and result are recorded and rendered."""
+    print("🔧 Testing step outcome...")
+
+    log = ThoughtLog(spill=False)
+    log.start_step(1, "Open the screen", ts=100.0)
+    log.end_step(1, ts=102.5, action='go_to_url', result='x' * 1000)
+    log.end_step(7, ts=103.0, action='click_element')
+    log.add_note(ENTRY_COMPLETED, None, ts=104.0)
+
+    step, completed = log.page(0, 10)
+    assert step['action'] == 'go_to_url'
+    assert len(step['result']) == 501
+    rendered = format_entry(step)
+    assert "**Step 1**" in rendered and "Open the screen" in rendered
+    assert "`go_to_url` (2.5s)" in rendered
+    assert format_entry(completed) == "**Workflow completed successfully!**"
+
+    print("✅ Step outcome test passed")
+
+def main():
+    """Run all tests."""
+    print("🚀 Running thought log tests...")
+
+    tests = [
+        ("Eviction and Paging", test_eviction_and_paging),
+        ("Step Outcome", test_step_outcome),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n--- {test_name} ---")
+        try:
+            test_func()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_name} failed: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
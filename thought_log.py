@@ -0,0 +1,161 @@
+# Bounded agent thought log for the Workflow Automator
+#
+# Keeps a run's agent steps as structured entries in a ring buffer instead of
+# one ever-growing markdown string. Entries pushed out of the buffer are
+# spilled to a JSONL file, so older pages stay browsable without holding the
+# whole run in memory, and the UI renders one page at a time.
+
+import json
+import os
+import time
+import uuid
+from collections import deque
+from itertools import islice
+from pathlib import Path
+
+from config import THOUGHT_LOG_MAX_ENTRIES, THOUGHT_LOG_SPILL, THOUGHT_LOG_DIR, THOUGHT_LOG_RETENTION
+
+# Entry kinds
+ENTRY_STEP = 'step'
+ENTRY_COMPLETED = 'completed'
+ENTRY_ERROR = 'error'
+
+# Longest action or result text kept per entry
+MAX_TEXT_CHARS = 500
+
+
+def _clip(text):
+    if text and len(text) > MAX_TEXT_CHARS:
+        return text[:MAX_TEXT_CHARS] + '…'
+    return text
+
+
+class ThoughtLog:
+    """Ring buffer of a run's agent steps, with optional spill of evicted entries to disk."""
+
+    def __init__(self, run_id=None, max_entries=THOUGHT_LOG_MAX_ENTRIES, spill=THOUGHT_LOG_SPILL,
+                 directory=THOUGHT_LOG_DIR):
+        self.run_id = run_id
+        self.max_entries = max_entries
+        # Sessions following the same run each keep their own log, so each spills to its own file
+        self.spill_path = Path(directory) / f"{run_id}-{uuid.uuid4().hex[:8]}.jsonl" if spill and run_id else None
+        self.evicted = 0
+        self._entries = deque()
+        self._steps = {}
+
+    def __len__(self):
+        """Entries logged so far, including those no longer in memory."""
+        return self.evicted + len(self._entries)
+
+    def start_step(self, step, goal, ts=None):
+        self._steps[step] = self._append({
+            'kind': ENTRY_STEP, 'step': step, 'goal': goal,
+            'started_at': ts or time.time(), 'ended_at': None, 'action': None, 'result': None,
+        })
+
+    def end_step(self, step, ts=None, action=None, result=None):
+        """Complete a step's entry; ignored if it was already evicted."""
+        entry = self._steps.get(step)
+        if entry is not None:
+            entry.update(ended_at=ts or time.time(), action=_clip(action), result=_clip(result))
+
+    def add_note(self, kind, text, ts=None):
+        """Log the run's outcome or an error."""
+        self._append({'kind': kind, 'text': _clip(text), 'started_at': ts or time.time()})
+
+    def _append(self, entry):
+        self._entries.append(entry)
+        while len(self._entries) > self.max_entries:
+            evicted = self._entries.popleft()
+            self._steps.pop(evicted.get('step'), None)
+            self.evicted += 1
+            if self.spill_path:
+                self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.spill_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(evicted) + '\n')
+        return entry
+
+    def page_count(self, page_size):
+        """Pages available, counting spilled entries only if they can be read back."""
+        available = len(self) if self.spill_path else len(self._entries)
+        return max(1, -(-available // page_size))
+
+    def page(self, index, page_size):
+        """Entries of one page, oldest first; page 0 holds the newest entries."""
+        stop = len(self) - index * page_size
+        start = max(0, stop - page_size)
+        if not self.spill_path:
+            start = max(start, self.evicted)
+        if stop <= start:
+            return []
+
+        entries = []
+        if start < self.evicted:
+            with open(self.spill_path, encoding='utf-8') as f:
+                entries = [json.loads(line) for line in islice(f, start, min(stop, self.evicted))]
+        if stop > self.evicted:
+            first = max(start, self.evicted) - self.evicted
+            entries.extend(islice(self._entries, first, stop - self.evicted))
+        return entries
+
+    def clear(self):
+        """Drop all entries and the spill file."""
+        self._entries.clear()
+        self._steps.clear()
+        self.evicted = 0
+        if self.spill_path and self.spill_path.exists():
+            os.remove(self.spill_path)
+
+
+def prune_spill_files(directory=THOUGHT_LOG_DIR, max_age=THOUGHT_LOG_RETENTION):
+    """Delete spill files of runs older than `max_age` seconds."""
+    directory = Path(directory)
+    if not directory.exists():
+        return 0
+
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in directory.glob('*.jsonl'):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def format_entry(entry):
+    """Render one log entry as markdown."""
+    if entry['kind'] == ENTRY_COMPLETED:
+        return "**Workflow completed successfully!**"
+    if entry['kind'] == ENTRY_ERROR:
+        return f"**Error during execution: {entry['text']}**"
+
+    clock = time.strftime('%H:%M:%S', time.localtime(entry['started_at']))
+    lines = [f"**Step {entry['step']}** · {clock}: {entry['goal']}"]
+    if entry.get('ended_at'):
+        duration = entry['ended_at'] - entry['started_at']
+        if entry.get('action'):
+            lines.append(f"- Action: `{entry['action']}` ({duration:.1f}s)")
+        if entry.get('result'):
+            lines.append(f"- Result: {entry['result']}")
+    return '\n'.join(lines)
+
+
+def describe_step_outcome(agent):
+    """Short action and result text of the agent's last step."""
+    action, result = None, None
+    try:
+        output = agent.state.last_model_output
+        if output is not None:
+            action = ', '.join(
+                name for model in output.action for name in model.model_dump(exclude_unset=True)
+            ) or None
+        results = agent.state.last_result or []
+        result = ' '.join(
+            item.error or item.extracted_content for item in results if item.error or item.extracted_content
+        ) or None
+    except Exception as e:
+        print(f"⚠️ Could not read step outcome: {e}")
+    return action, result
@@ -2,11 +2,26 @@
 
 import streamlit as st
 import os
-import asyncio
 import time
 from prompts import *
-from config import COLUMN_RATIOS, APP_TITLE, get_env_var
-from browser import execute_workflow, cleanup_screenshots
+from config import (
+    COLUMN_RATIOS, APP_TITLE, DEBUG_MODE, LIVE_UPDATE_INTERVAL, THOUGHT_LOG_PAGE_SIZE, BATCH_REFRESH_INTERVAL,
+    RUN_HISTORY_PAGE_SIZE, RESULT_CACHE_MAX_AGE, RESULT_CACHE_WINDOWS, get_env_var,
+)
+from job_runner import JobQueueFull, get_job_runner
+from event_channel import get_channel, drop_channel, leave_channel
+from session_manager import SessionManager
+from llm_cache import get_llm_cache, format_cache_metrics
+from llm_gateway import get_llm_gateway, format_gateway_metrics, run_sync
+from plan_library import get_plan_library, format_plan_metrics
+from run_store import get_run_store, RUN_SUCCEEDED, RUN_RUNNING
+from result_cache import get_result_cache, format_result_cache_metrics, format_freshness
+from instrumentation import get_metrics_registry, summarize_steps
+from thought_log import format_entry
+
+# The browser and LLM modules are imported inside the views that use them, so
+# the login and input views never load browser-use, Chromium setup or the
+# model clients
 
 class UIComponents:
     """Manages all UI components and layouts."""
@@ -53,6 +68,7 @@ class UIComponents:
             if submitted:
                 if username == env_username and password == env_password:
                     st.session_state['authenticated'] = True
+                    st.session_state['app_user'] = username
                     st.session_state['login_error'] = ""
                     st.success(LOGIN_SUCCESS)
                     st.rerun()
@@ -88,6 +104,10 @@ class UIComponents:
             
             if submitted:
                 if email and password:
+                    from auth_state import get_auth_state_store
+                    # Saved logins of other accounts are stale; one saved under a different
+                    # password for this account fails to decrypt and is dropped on load
+                    get_auth_state_store().invalidate(st.session_state.get('app_user'), keep_email=email)
                     st.session_state['sensitive_data'] = {
                         'email': email,
                         'password': password
@@ -111,6 +131,7 @@ class UIComponents:
         
         if st.sidebar.button(LOGOUT_BUTTON):
             st.session_state['authenticated'] = False
+            st.session_state['app_user'] = ""
             st.session_state['credentials_configured'] = False
             st.session_state['sensitive_data'] = {}
             st.session_state['login_error'] = ""
@@ -137,14 +158,200 @@ class UIComponents:
                     st.session_state['current_prompt'] = user_input
                     st.session_state['workflow_approved'] = False
                     st.session_state['agent_ran'] = False
+                    st.session_state['workflow_steps'] = []
+                    st.session_state['edited_steps'] = []
                     
-                    with st.spinner("Breaking down your request into steps..."):
-                        from agent_manager import break_down_prompt
-                        steps = asyncio.run(break_down_prompt(user_input))
-                        st.session_state['workflow_steps'] = steps
+                    # A saved plan for this prompt skips the breakdown and approval
+                    plan = get_plan_library().lookup(user_input)
+                    if plan and plan['exact']:
+                        UIComponents.apply_saved_plan(plan)
+                    elif plan:
+                        st.session_state['plan_match'] = plan
+                    else:
+                        # The breakdown view streams the steps in as they are generated
+                        st.session_state['breakdown_streaming'] = True
                     st.rerun()
                 else:
                     st.error("Please enter a workflow prompt.")
+            
+            if st.session_state.get('plan_match'):
+                UIComponents.plan_match_offer(st.session_state['plan_match'])
+
+            UIComponents.batch_view()
+            UIComponents.run_history_view()
+    
+    @staticmethod
+    def apply_saved_plan(plan):
+        """Go straight to execution with a saved plan's steps and execution prompt."""
+        from browser import warm_browser_pool
+        
+        st.session_state['workflow_steps'] = list(plan['steps'])
+        st.session_state['edited_steps'] = list(plan['steps'])
+        st.session_state['combined_prompt'] = plan['combined_prompt']
+        st.session_state['plan_match'] = None
+        if not plan['exact']:
+            # Saved under this prompt too, so it matches exactly next time
+            get_plan_library().save(st.session_state['current_prompt'], plan['steps'], plan['combined_prompt'])
+        st.session_state['workflow_approved'] = True
+        st.session_state['show_workflow_view'] = True
+        warm_browser_pool()
+    
+    @staticmethod
+    def plan_match_offer(plan):
+        """Offer a similar saved plan in place of a new breakdown."""
+        # Rounded down, so a near match never reads as 100%
+        st.info(PLAN_MATCH_FOUND.format(prompt=plan['prompt'], score=int(plan['score'] * 100)))
+        with st.expander(PLAN_MATCH_STEPS):
+            st.markdown('\n'.join(f"{i}. {step}" for i, step in enumerate(plan['steps'], 1)))
+        
+        col_use, col_new = st.columns(2)
+        with col_use:
+            if st.button(USE_SAVED_PLAN_BUTTON, type="primary", use_container_width=True):
+                UIComponents.apply_saved_plan(plan)
+                st.rerun()
+        with col_new:
+            if st.button(NEW_BREAKDOWN_BUTTON, use_container_width=True):
+                st.session_state['plan_match'] = None
+                st.session_state['breakdown_streaming'] = True
+                st.rerun()
+    
+    @staticmethod
+    def batch_view():
+        """Upload a file of prompts and follow the batch's progress."""
+        from batch import batch_id_for, parse_prompts, start_batch, get_batch, cancel_batch
+        
+        with st.expander(BATCH_HEADER, expanded=bool(st.session_state.get('batch_id'))):
+            st.markdown(BATCH_DESCRIPTION)
+            upload = st.file_uploader(BATCH_UPLOAD_LABEL, type=['csv', 'jsonl'])
+            
+            if upload is not None and st.button(START_BATCH_BUTTON, use_container_width=True):
+                data = upload.getvalue()
+                try:
+                    jobs = parse_prompts(data.decode('utf-8'), 'csv' if upload.name.lower().endswith('.csv') else 'jsonl')
+                except (ValueError, UnicodeDecodeError) as e:
+                    st.error(ERROR_BATCH_FILE.format(error=e))
+                    jobs = None
+                if jobs == []:
+                    st.error(ERROR_BATCH_EMPTY)
+                elif jobs:
+                    # Named after the user and the file's content, so uploading it again resumes the batch
+                    sensitive_data = st.session_state['sensitive_data']
+                    app_user = st.session_state.get('app_user')
+                    batch_id = batch_id_for(data, sensitive_data, app_user)
+                    try:
+                        start_batch(batch_id, jobs, sensitive_data, app_user)
+                        st.session_state['batch_id'] = batch_id
+                    except ValueError as e:
+                        st.error(ERROR_BATCH_START.format(error=e))
+            
+            batch = get_batch(st.session_state['batch_id']) if st.session_state.get('batch_id') else None
+            if batch is not None:
+                running = not batch.finished
+                st.fragment(run_every=BATCH_REFRESH_INTERVAL if running else None)(UIComponents.batch_progress)(batch, running)
+                if running and st.button(CANCEL_BATCH_BUTTON, use_container_width=True):
+                    cancel_batch(st.session_state['batch_id'])
+                    st.rerun()
+    
+    @staticmethod
+    def run_history_view():
+        """Search this user's past runs and show one without running it again."""
+        store = get_run_store()
+        app_user = st.session_state.get('app_user')
+        
+        with st.expander(RUN_HISTORY_HEADER):
+            search = st.text_input(RUN_HISTORY_SEARCH_LABEL, key='history_search', placeholder=RUN_HISTORY_SEARCH_PLACEHOLDER)
+            if search.strip():
+                runs = store.search(search, app_user, limit=RUN_HISTORY_PAGE_SIZE)
+            else:
+                runs = store.recent(app_user, limit=RUN_HISTORY_PAGE_SIZE)
+            if not runs:
+                st.caption(RUN_HISTORY_EMPTY)
+                return
+            
+            icons = {RUN_SUCCEEDED: '✅', RUN_RUNNING: '🔄'}
+            labels = {
+                run['run_id']: f"{icons.get(run['status'], '❌')} "
+                               f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(run['started_at']))} · {run['prompt'][:80]}"
+                for run in runs
+            }
+            run_id = st.selectbox(RUN_HISTORY_SELECT_LABEL, list(labels), format_func=labels.get, key='history_run')
+            run = store.get_run(run_id) if run_id else None
+            if run is not None:
+                UIComponents.run_history_detail(run)
+    
+    @staticmethod
+    def run_history_detail(run):
+        """Show a recorded run: its steps, outcome, results table and last screenshot."""
+        duration = f"{run['duration_s']:.0f}s" if run['duration_s'] is not None else "-"
+        st.caption(RUN_HISTORY_SUMMARY.format(
+            status=run['status'], duration=duration, steps=run['agent_steps'] or 0,
+            mode=RUN_MODE_DIRECT if run['direct'] else RUN_MODE_AGENT,
+        ))
+        if run['steps']:
+            st.markdown('\n'.join(f"{i}. {step}" for i, step in enumerate(run['steps'], 1)))
+        if run['error']:
+            st.error(run['error'])
+        if run['result']:
+            st.write(run['result'])
+        if run['table_path'] and os.path.exists(run['table_path']):
+            UIComponents.result_table_view(run['table_path'])
+        
+        frames = [frame for frame in run['screenshots'] or [] if os.path.exists(frame['path'])]
+        if frames:
+            st.image(frames[-1]['path'], caption=FINAL_SCREENSHOT_CAPTION)
+        if run['thoughts']:
+            with st.expander(RUN_HISTORY_STEP_LOG):
+                for entry in run['thoughts']:
+                    st.markdown(f"**Step {entry['step']}:** {entry['goal'] or ''}")
+                    if entry['result']:
+                        st.caption(entry['result'])
+        
+        if run['steps'] and run['combined_prompt'] and st.button(RUN_AGAIN_BUTTON, use_container_width=True):
+            st.session_state['current_prompt'] = run['prompt']
+            UIComponents.apply_saved_plan({'steps': run['steps'], 'combined_prompt': run['combined_prompt'], 'exact': True})
+            st.rerun()
+    
+    @staticmethod
+    def batch_progress(batch, was_running=False):
+        """Show a batch's progress and its results so far."""
+        progress = batch.progress()
+        done = progress['succeeded'] + progress['failed']
+        if progress['finished'] and was_running:
+            # Stop refreshing and drop the cancel button
+            st.rerun()
+        if progress['finished']:
+            st.success(BATCH_FINISHED.format(**progress))
+        else:
+            st.progress(done / max(progress['total'], 1), text=BATCH_PROGRESS.format(**progress))
+        
+        if batch.output_path.exists():
+            st.download_button(
+                DOWNLOAD_BATCH_BUTTON, batch.output_path.read_bytes(),
+                file_name=f"{batch.output_path.stem}-results.jsonl", mime='application/jsonl',
+                use_container_width=True
+            )
+    
+    @staticmethod
+    def stream_step_breakdown():
+        """Render steps as the LLM generates them, then switch to the editable list."""
+        from agent_manager import stream_break_down_prompt
+        
+        status = st.empty()
+        status.caption(BREAKDOWN_STREAMING)
+        steps_placeholder = st.empty()
+        steps = []
+        
+        async def consume():
+            async for step in stream_break_down_prompt(st.session_state['current_prompt']):
+                steps.append(step)
+                steps_placeholder.markdown('\n'.join(f"{i}. {text}" for i, text in enumerate(steps, 1)))
+        
+        run_sync(consume())
+        status.empty()
+        
+        st.session_state['workflow_steps'] = steps
+        st.session_state['breakdown_streaming'] = False
+        st.rerun()
     
     @staticmethod
     def step_breakdown_view():
@@ -157,6 +364,10 @@ class UIComponents:
         # Steps breakdown
         st.markdown(f"### {PROPOSED_STEPS_HEADER}")
         
+        if st.session_state.get('breakdown_streaming'):
+            UIComponents.stream_step_breakdown()
+            return
+        
         # Initialize edited_steps if not already done
         if not st.session_state['edited_steps']:
             st.session_state['edited_steps'] = st.session_state['workflow_steps'].copy()
@@ -246,13 +457,30 @@ class UIComponents:
                 if st.button(APPROVE_RUN_BUTTON, type="primary", use_container_width=True):
                     # Combine steps into a comprehensive prompt
                     with st.spinner("Combining steps into execution prompt..."):
-                        from agent_manager import combine_steps_into_prompt
-                        combined_prompt = asyncio.run(combine_steps_into_prompt(
-                            st.session_state['current_prompt'], 
-                            st.session_state['edited_steps']
-                        ))
+                        from agent_manager import combine_steps_into_prompt, fallback_combined_prompt
+                        try:
+                            # Unedited steps skip the LLM and use the combined prompt template
+                            combined_prompt = run_sync(combine_steps_into_prompt(
+                                st.session_state['current_prompt'], 
+                                st.session_state['edited_steps'],
+                                generated_steps=st.session_state['workflow_steps'],
+                                fallback=False
+                            ))
+                            get_plan_library().save(
+                                st.session_state['current_prompt'], st.session_state['edited_steps'], combined_prompt
+                            )
+                        except Exception as e:
+                            # Saved plans run without approval, so a fallback prompt is never saved
+                            st.error(ERROR_COMBINE_STEPS.format(error=e))
+                            combined_prompt = fallback_combined_prompt(
+                                st.session_state['current_prompt'], st.session_state['edited_steps']
+                            )
                         st.session_state['combined_prompt'] = combined_prompt
                     
+                    # Launch browsers while the user reviews the execution prompt
+                    from browser import warm_browser_pool
+                    warm_browser_pool()
+                    
                     st.session_state['workflow_approved'] = True
                     st.session_state['show_workflow_view'] = True
                     # Use edited steps for the workflow
@@ -281,6 +509,9 @@ class UIComponents:
     @staticmethod
     def workflow_execution_view():
         """Display the workflow execution view."""
+        from browser import cancel_workflow_run, get_browser_pool, format_pool_metrics
+        from prompt_compaction import compact_prompt
+        
         # Add error recovery
         if st.session_state.get('agent_error'):
             st.error("Previous agent execution failed. Please try again or check the debug info.")
@@ -313,8 +544,11 @@ class UIComponents:
                 st.session_state['agent_ran'] = False
                 st.session_state['agent_completed'] = False
                 st.session_state['final_result'] = ""
+                st.session_state['result_table'] = None
+                st.session_state['result_cached_at'] = None
                 st.session_state['start_realtime_updates'] = False
-                st.session_state['latest_thoughts'] = ""
+                st.session_state['thought_log'] = None
+                st.session_state['run_id'] = None
                 st.session_state['show_workflow_view'] = False
                 st.session_state['edited_steps'] = []
                 st.session_state['editing_step'] = None
@@ -324,9 +558,31 @@ class UIComponents:
                 st.session_state['show_workflow_view'] = False
                 st.rerun()
             
+            # Cancel the active run
+            if st.session_state.get('agent_ran', False) and not st.session_state.get('agent_completed', False):
+                if st.button(CANCEL_RUN_BUTTON):
+                    # A run joined from another session keeps going for the sessions still following it
+                    if leave_channel(st.session_state['run_id']):
+                        st.session_state['run_id'] = None
+                        st.session_state['agent_ran'] = False
+                        st.session_state['start_realtime_updates'] = False
+                        st.info(RUN_LEFT)
+                    else:
+                        cancel_workflow_run(st.session_state['run_id'])
+                        st.info(RUN_CANCELLED)
+            
             # Show current email in sidebar
             if st.session_state['sensitive_data']:
                 st.info(f"Screener.in: {st.session_state['sensitive_data'].get('email', 'Unknown')}")
+            
+            # Show browser pool metrics in debug mode
+            if DEBUG_MODE:
+                st.caption(f"Browser pool: {format_pool_metrics(get_browser_pool().get_metrics())}")
+                st.caption(f"Jobs: {get_job_runner().get_stats()}")
+                st.caption(f"LLM cache: {format_cache_metrics(get_llm_cache().get_metrics())}")
+                st.caption(f"LLM gateway: {format_gateway_metrics(get_llm_gateway().get_metrics())}")
+                st.caption(f"Plan library: {format_plan_metrics(get_plan_library().get_metrics())}")
+                st.caption(f"Result cache: {format_result_cache_metrics(get_result_cache().get_metrics())}")
         
         # Show approved workflow info
         st.success(f"✅ **Approved Workflow:** {st.session_state['current_prompt']}")
@@ -336,36 +592,203 @@ class UIComponents:
             with st.expander(EXECUTION_PROMPT_TITLE, expanded=False):
                 st.markdown("**Combined Prompt for Browser Agent:**")
                 st.text_area("", value=st.session_state['combined_prompt'], height=150, disabled=True)
+                # Compacted once per prompt, not on every rerun
+                compaction = st.session_state.get('prompt_compaction')
+                if compaction is None or compaction.original != st.session_state['combined_prompt']:
+                    compaction = compact_prompt(st.session_state['combined_prompt'])
+                    st.session_state['prompt_compaction'] = compaction
+                st.caption(EXECUTION_PROMPT_TOKENS.format(
+                    before=compaction.tokens_before, after=compaction.tokens_after, budget=compaction.budget
+                ))
                 st.info(EXECUTION_PROMPT_DESCRIPTION)
         
+            # Results of an identical recent run are reused if they are fresh enough
+            windows = sorted(set(RESULT_CACHE_WINDOWS) | {RESULT_CACHE_MAX_AGE})
+            st.selectbox(
+                RESULT_FRESHNESS_LABEL, windows, index=windows.index(RESULT_CACHE_MAX_AGE), key='result_max_age',
+                format_func=format_freshness, help=RESULT_FRESHNESS_HELP
+            )
+            
             # Execute workflow button
             if st.button(EXECUTE_WORKFLOW_BUTTON, type="primary", use_container_width=True):
-                # Reset state for new run
-                st.session_state['agent_ran'] = False
-                st.session_state['agent_completed'] = False
-                st.session_state['final_result'] = ""
-                st.session_state['start_realtime_updates'] = False
-                st.session_state['agent_error'] = False
-                st.session_state['latest_thoughts'] = ''
-                st.session_state['step_counter'] = {'n': 0}
-                
-                # Clean up screenshots
-                cleanup_screenshots()
-                
-                # Set flag to start real-time updates
-                st.session_state['start_realtime_updates'] = True
-                
-                # Use the combined prompt for execution
-                execution_prompt = st.session_state.get('combined_prompt', st.session_state['current_prompt'])
-                
-                # Run agent with timeout protection
-                asyncio.run(execute_workflow(execution_prompt))
+                UIComponents.start_execution()
 
-        # Real-time update logic - use auto-rerun when agent is running
-        if st.session_state.get('agent_ran', False) and not st.session_state.get('agent_completed', False):
-            # Auto-rerun every 2 seconds to show live updates
-            time.sleep(2)
-            st.rerun()
+        # Live panels refresh as a fragment while the agent runs, so only they redraw
+        agent_running = st.session_state.get('agent_ran', False) and not st.session_state.get('agent_completed', False)
+        st.fragment(run_every=LIVE_UPDATE_INTERVAL if agent_running else None)(UIComponents.live_run_panels)()
+
+        # Final Results Section - Show at bottom when agent completes
+        if st.session_state.get('agent_completed', False) and st.session_state.get('final_result'):
+            st.markdown("---")
+            st.subheader(FINAL_RESULTS_TITLE)
+            
+            # A result served from an earlier run can be refreshed with a new run
+            if st.session_state.get('result_cached_at'):
+                minutes = max(0, int((time.time() - st.session_state['result_cached_at']) // 60))
+                st.info(RESULT_FROM_CACHE.format(minutes=minutes))
+                if st.button(REFRESH_RESULT_BUTTON):
+                    UIComponents.start_execution(force_refresh=True)
+                    st.rerun()
+            
+            # Display the final result
+            final_result = st.session_state.get('final_result', "")
+            if final_result:
+                with st.expander(VIEW_FINAL_RESULTS, expanded=True):
+                    st.markdown(f"**{FINAL_RESULTS_HEADER}:**")
+                    st.write(final_result)
+
+            if st.session_state.get('result_table'):
+                UIComponents.result_table_view(st.session_state['result_table'])
+
+        # Debug: per-step timing and resources of the run
+        if DEBUG_MODE and st.session_state.get('run_id'):
+            UIComponents.run_metrics_panel(st.session_state['run_id'])
+
+    @staticmethod
+    def start_execution(force_refresh=False):
+        """Reset the run panels and submit the approved workflow, or serve it from a fresh enough earlier run."""
+        from browser import start_workflow_run, cleanup_screenshots, get_screenshot_store
+        
+        # Reset state for new run
+        st.session_state['agent_ran'] = False
+        st.session_state['agent_completed'] = False
+        st.session_state['final_result'] = ""
+        st.session_state['result_table'] = None
+        st.session_state['result_cached_at'] = None
+        st.session_state['start_realtime_updates'] = False
+        st.session_state['agent_error'] = False
+        st.session_state['thought_log'] = None
+        st.session_state['step_counter'] = {'n': 0}
+        
+        # Clean up screenshots
+        cleanup_screenshots()
+        
+        # Set flag to start real-time updates
+        st.session_state['start_realtime_updates'] = True
+        
+        # Use the combined prompt for execution
+        execution_prompt = st.session_state.get('combined_prompt', st.session_state['current_prompt'])
+        
+        # Submit the agent run as a background job; progress arrives as events
+        if st.session_state.get('run_id'):
+            drop_channel(st.session_state['run_id'])
+        try:
+            st.session_state['run_id'] = start_workflow_run(
+                execution_prompt,
+                st.session_state['sensitive_data'],
+                get_screenshot_store(),
+                app_user=st.session_state.get('app_user'),
+                steps=list(st.session_state['edited_steps']),
+                request=st.session_state['current_prompt'],
+                max_age=st.session_state.get('result_max_age'),
+                force_refresh=force_refresh
+            )
+            st.session_state['event_cursor'] = 0
+            st.session_state['agent_ran'] = True
+        except JobQueueFull:
+            st.session_state['run_id'] = None
+            st.session_state['start_realtime_updates'] = False
+            st.error(ERROR_QUEUE_FULL)
+
+    @staticmethod
+    def result_table_view(path):
+        """Display a run's results table, sortable by any column, with CSV and Parquet downloads."""
+        from result_table import load_result_table, table_to_csv
+
+        try:
+            frame = load_result_table(path)
+        except Exception as e:
+            st.warning(ERROR_RESULT_TABLE.format(error=e))
+            return
+        
+        st.subheader(RESULT_TABLE_TITLE)
+        st.caption(RESULT_TABLE_COUNT.format(rows=len(frame), columns=len(frame.columns)))
+        st.dataframe(frame, use_container_width=True, hide_index=True)
+        
+        name = os.path.splitext(os.path.basename(path))[0]
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button(
+                DOWNLOAD_CSV_BUTTON, table_to_csv(path), file_name=f"{name}.csv", mime='text/csv',
+                use_container_width=True
+            )
+        with col2:
+            with open(path, 'rb') as f:
+                st.download_button(
+                    DOWNLOAD_PARQUET_BUTTON, f.read(), file_name=f"{name}.parquet",
+                    mime='application/vnd.apache.parquet', use_container_width=True
+                )
+
+    @staticmethod
+    def run_metrics_panel(run_id):
+        """Display where time went in a run and its slowest steps."""
+        from network_profile import format_blocked_by_type
+        
+        steps = get_metrics_registry().get_steps(run_id)
+        if not steps:
+            return
+        
+        summary = summarize_steps(steps)
+        with st.expander(RUN_METRICS_TITLE):
+            columns = st.columns(6)
+            columns[0].metric("Wall time", f"{summary['wall_s']:.1f}s")
+            columns[1].metric("LLM", f"{summary['llm_s']:.1f}s")
+            columns[2].metric("Screenshots", f"{summary['screenshot_capture_s'] + summary['screenshot_decode_s']:.1f}s")
+            columns[3].metric("Navigation", f"{summary['navigation_s']:.1f}s")
+            columns[4].metric("Other", f"{summary['other_s']:.1f}s")
+            columns[5].metric("Tokens", f"{summary['prompt_tokens'] + summary['completion_tokens']:,}")
+            if summary['peak_browser_rss_mb'] is not None:
+                st.caption(f"Peak browser memory: {summary['peak_browser_rss_mb']:.0f} MB")
+            if summary['requests']:
+                st.caption(
+                    f"Network profile: {summary['requests_blocked']}/{summary['requests']} requests blocked "
+                    f"({format_blocked_by_type(summary['requests_blocked_by_type'])}), "
+                    f"{summary['downscaled_bytes_saved'] / 1024:.0f} KB saved by downscaling images"
+                )
+
+            st.markdown(f"**{SLOWEST_STEPS_HEADER}**")
+            st.dataframe([
+                {
+                    'step': step['step'],
+                    'goal': step.get('goal'),
+                    'wall_s': round(step['wall_s'] or 0, 2),
+                    'llm_s': round(step['llm_s'] or 0, 2),
+                    'screenshot_s': round((step['screenshot_capture_s'] or 0) + (step['screenshot_decode_s'] or 0), 2),
+                    'navigation_s': round(step['navigation_s'] or 0, 2),
+                    'tokens': (step['prompt_tokens'] or 0) + (step['completion_tokens'] or 0),
+                    'browser_cpu_s': step.get('browser_cpu_s'),
+                    'url': step.get('url'),
+                }
+                for step in get_metrics_registry().slowest_steps(run_id)
+            ], use_container_width=True)
+
+    @staticmethod
+    def thought_log_page(thought_log):
+        """Render one page of the run's thought log, newest page first."""
+        page_count = thought_log.page_count(THOUGHT_LOG_PAGE_SIZE)
+        if page_count > 1:
+            # Clamp before the widget is created; Streamlit rejects a value outside its bounds
+            st.session_state['thought_page'] = min(max(st.session_state.get('thought_page', 1), 1), page_count)
+            st.number_input(
+                THOUGHT_LOG_PAGE_LABEL.format(pages=page_count),
+                min_value=1, max_value=page_count, key='thought_page'
+            )
+            page = st.session_state['thought_page']
+        else:
+            page = 1
+
+        entries = thought_log.page(page - 1, THOUGHT_LOG_PAGE_SIZE)
+        st.markdown('\n\n'.join(format_entry(entry) for entry in entries))
+        if page_count > 1:
+            st.caption(THOUGHT_LOG_COUNT.format(count=len(thought_log)))
+
+    @staticmethod
+    def live_run_panels():
+        """Display the agent's thoughts and screenshots from the active run's events."""
+        from browser import get_run_status, get_screenshot_store
+        
+        was_running = st.session_state.get('agent_ran', False) and not st.session_state.get('agent_completed', False)
+        SessionManager.apply_run_events()
 
         col1, col2 = st.columns(COLUMN_RATIOS['workflow'])
 
@@ -373,15 +796,21 @@ class UIComponents:
         with col1:
             st.subheader(AGENT_THOUGHTS_HEADER)
 
+            # Show queue position while the run waits for a worker
+            run_status = get_run_status(st.session_state['run_id']) if st.session_state.get('run_id') else None
+            if run_status and run_status['queue_position']:
+                st.info(RUN_QUEUED.format(position=run_status['queue_position']))
+
             # Show thoughts with live updates
-            if st.session_state['latest_thoughts']:
+            thought_log = st.session_state.get('thought_log')
+            if thought_log:
                 with st.expander("Agent's Live Actions", expanded=True):
-                    st.markdown(st.session_state['latest_thoughts'])
+                    UIComponents.thought_log_page(thought_log)
                     
                     # Show current status only when agent is running and not completed
                     if st.session_state.get('agent_ran', False) and not st.session_state.get('agent_completed', False):
                         current_step = st.session_state.get('step_counter', {}).get('n', 0)
-                        screenshots_count = len(st.session_state.get('screenshots', []))
+                        screenshots_count = len(get_screenshot_store())
                         
                         # Show progress bar
                         if current_step > 0:
@@ -405,16 +834,23 @@ class UIComponents:
             st.subheader(BROWSER_SCREENSHOT_HEADER)
             
             # Show screenshots in real-time as they're captured
-            screenshots = st.session_state.get('screenshots', [])
+            screenshots = get_screenshot_store()
             if screenshots:    
                 # If there are multiple screenshots, show a slider below to browse them
                 if len(screenshots) > 1:
                     st.markdown("**Browse Steps:**")
-                    step_numbers = list(range(1, len(screenshots) + 1))
                     selected_step = st.slider("Select Step", min_value=1, max_value=len(screenshots), value=len(screenshots))
                     if selected_step != len(screenshots):  # Don't show the same image twice
-                        selected_screenshot = screenshots[selected_step - 1]
-                        st.image(selected_screenshot, caption=f"Step {selected_step} Screenshot", use_container_width=True)
+                        frame = screenshots[selected_step - 1]
+                        caption = f"Step {frame.step} Screenshot ({frame.label})"
+                        if st.checkbox("Show full resolution", key="screenshot_full_res"):
+                            image = screenshots.full_image(frame)
+                        else:
+                            image = screenshots.thumbnail(frame)
+                        if image is not None:
+                            st.image(image, caption=caption, use_container_width=True)
+                        else:
+                            st.caption(SCREENSHOT_UNAVAILABLE)
             else:
                 if st.session_state.get('agent_ran', False) and not st.session_state.get('agent_completed', False):
                     st.info("Agent is running... Screenshots will appear here as steps are completed.")
@@ -423,15 +859,18 @@ class UIComponents:
                         st.empty()
                 else:
                     st.info("Run the agent to generate screenshots.")
-        
-        # Final Results Section - Show at bottom when agent completes
-        if st.session_state.get('agent_completed', False) and st.session_state.get('final_result'):
-            st.markdown("---")
-            st.subheader(FINAL_RESULTS_TITLE)
-            
-            # Display the final result
-            final_result = st.session_state.get('final_result', "")
-            if final_result:
-                with st.expander(VIEW_FINAL_RESULTS, expanded=True):
-                    st.markdown(f"**{FINAL_RESULTS_HEADER}:**")
-                    st.write(final_result)
\ No newline at end of file
+
+        # Debug: step-to-screen latency of the live panels
+        run_channel = get_channel(st.session_state.get('run_id')) if st.session_state.get('run_id') else None
+        if DEBUG_MODE and run_channel:
+            latency = run_channel.latency_stats()
+            if latency['count']:
+                st.caption(f"Step-to-screen latency: median {latency['median'] * 1000:.0f} ms, p95 {latency['p95'] * 1000:.0f} ms")
+
+        # Once the run finishes, rerun the whole app to show results and stop refreshing
+        if was_running and st.session_state.get('agent_completed', False):
+            if run_channel:
+                latency = run_channel.latency_stats()
+                if latency['count']:
+                    print(f"ℹ️  Step-to-screen latency: median {latency['median'] * 1000:.0f} ms over {latency['count']} events")
+            st.rerun()
@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+"""
+Multi-process worker fleet for the Workflow Automator.
+
+N worker processes, each owning its own browser, pull jobs from a local
+SQLite queue. Run events (steps, screenshot references, results) are
+written back to the same database and read by the UI process.
+
+Run standalone workers with:
+    python worker_fleet.py --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from config import (
+    WORKER_COUNT,
+    WORKER_QUEUE_PATH,
+    WORKER_POLL_INTERVAL,
+    WORKER_EVENT_RETENTION,
+    WORKER_HEARTBEAT_INTERVAL,
+    WORKER_HEARTBEAT_TIMEOUT,
+    WORKER_BROWSER_SINGLE_PROCESS,
+    LLM_RATE_SHARE,
+    JOB_QUEUE_SIZE,
+    JOB_TIMEOUT,
+)
+from event_channel import EventChannel, RunEvent, EVENT_COMPLETED, EVENT_ERROR
+from job_runner import (
+    JobQueueFull,
+    JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED, JOB_TIMED_OUT,
+)
+
+WORKER_SCRIPT = Path(__file__).resolve()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT,
+    status TEXT NOT NULL,
+    worker_id TEXT,
+    worker_pid INTEGER,
+    worker_host TEXT,
+    heartbeat_at REAL,
+    timeout REAL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS events (
+    run_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    ts REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (run_id, seq)
+);
+"""
+
+
+class JobQueue:
+    """SQLite-backed job queue and event log shared by the UI and worker processes."""
+
+    def __init__(self, db_path=WORKER_QUEUE_PATH):
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if columns and 'heartbeat_at' not in columns:
+                # Queues created before jobs recorded their worker process
+                for column in ('worker_pid INTEGER', 'worker_host TEXT', 'heartbeat_at REAL'):
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column}")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        """Per-thread connection in autocommit mode."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, kind, payload, job_id=None, timeout=JOB_TIMEOUT):
+        """Add a job to the queue and return its id."""
+        job_id = job_id or uuid.uuid4().hex
+        self._connect().execute(
+            "INSERT INTO jobs (id, kind, payload, status, timeout, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(payload), JOB_QUEUED, timeout, time.time())
+        )
+        return job_id
+
+    def claim(self, worker_id):
+        """Atomically take the oldest queued job, or return None."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, kind, payload, timeout FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (JOB_QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            # The payload may hold credentials; drop it once a worker has it
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = ?, worker_pid = ?, worker_host = ?, started_at = ?, "
+                "heartbeat_at = ?, payload = NULL WHERE id = ?",
+                (JOB_RUNNING, worker_id, os.getpid(), socket.gethostname(), now, now, row['id'])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        return {
+            'id': row['id'],
+            'kind': row['kind'],
+            'payload': json.loads(row['payload']),
+            'timeout': row['timeout'],
+        }
+
+    def finish(self, job_id, status, result=None, error=None):
+        """Record the outcome of a job."""
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? WHERE id = ?",
+            (status, time.time(), json.dumps(result) if result is not None else None, error, job_id)
+        )
+
+    def request_cancel(self, job_id):
+        """Cancel a queued job, or flag a running one for its worker. False if already finished."""
+        conn = self._connect()
+        cursor = conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, error = 'Cancelled', payload = NULL "
+            "WHERE id = ? AND status = ?",
+            (JOB_CANCELLED, time.time(), job_id, JOB_QUEUED)
+        )
+        if cursor.rowcount:
+            return True
+        cursor = conn.execute(
+            "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?",
+            (job_id, JOB_RUNNING)
+        )
+        return bool(cursor.rowcount)
+
+    def is_cancel_requested(self, job_id):
+        """Whether the UI asked for a running job to stop."""
+        row = self._connect().execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row['cancel_requested'])
+
+    def get(self, job_id):
+        """Status snapshot of a job, or None."""
+        row = self._connect().execute(
+            "SELECT id, kind, status, worker_id, created_at, started_at, finished_at, result, error "
+            "FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['name'] = job.pop('kind')
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def queue_position(self, job_id):
+        """1-based position of a queued job, or 0 if it is not waiting."""
+        row = self._connect().execute(
+            "SELECT COUNT(*) FROM jobs AS waiting JOIN jobs AS target ON target.id = ? "
+            "WHERE target.status = ? AND waiting.status = ? AND waiting.created_at <= target.created_at",
+            (job_id, JOB_QUEUED, JOB_QUEUED)
+        ).fetchone()
+        return row[0]
+
+    def count(self, status):
+        """Number of jobs in a state."""
+        return self._connect().execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def stats(self):
+        """Counts of jobs by state."""
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def append_event(self, run_id, kind, data):
+        """Append an event to a run's log and return its sequence number."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM events WHERE run_id = ?", (run_id,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO events (run_id, seq, kind, ts, data) VALUES (?, ?, ?, ?, ?)",
+                (run_id, seq, kind, time.time(), json.dumps(data))
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return seq
+
+    def read_events(self, run_id, cursor=0):
+        """Events of a run with a sequence number greater than `cursor`."""
+        return self._connect().execute(
+            "SELECT seq, kind, ts, data FROM events WHERE run_id = ? AND seq > ? ORDER BY seq",
+            (run_id, cursor)
+        ).fetchall()
+
+    def run_closed(self, run_id):
+        """Whether a run has published its completion or error event."""
+        row = self._connect().execute(
+            "SELECT 1 FROM events WHERE run_id = ? AND kind IN (?, ?) LIMIT 1",
+            (run_id, EVENT_COMPLETED, EVENT_ERROR)
+        ).fetchone()
+        return row is not None
+
+    def heartbeat(self, job_id):
+        """Record that the worker running a job is still alive."""
+        self._connect().execute(
+            "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ?", (time.time(), job_id, JOB_RUNNING)
+        )
+
+    def fail_orphaned(self, heartbeat_timeout=WORKER_HEARTBEAT_TIMEOUT):
+        """Fail jobs left running by workers that are gone; returns their ids.
+
+        A worker on this host is gone when its process no longer exists; one on
+        another host when its job has had no heartbeat for `heartbeat_timeout` seconds.
+        """
+        conn = self._connect()
+        host = socket.gethostname()
+        stale = time.time() - heartbeat_timeout
+        rows = conn.execute(
+            "SELECT id, worker_pid, worker_host, heartbeat_at FROM jobs WHERE status = ?", (JOB_RUNNING,)
+        ).fetchall()
+        orphaned = [
+            row['id'] for row in rows
+            if (not _process_exists(row['worker_pid']) if row['worker_host'] == host
+                else (row['heartbeat_at'] or 0) < stale)
+        ]
+        for job_id in orphaned:
+            self.finish(job_id, JOB_FAILED, error="Worker stopped")
+        return orphaned
+
+    def prune(self, retention=WORKER_EVENT_RETENTION):
+        """Delete finished jobs and events older than `retention` seconds."""
+        cutoff = time.time() - retention
+        conn = self._connect()
+        conn.execute(
+            "DELETE FROM events WHERE run_id IN (SELECT id FROM jobs WHERE finished_at < ?)", (cutoff,)
+        )
+        conn.execute("DELETE FROM jobs WHERE finished_at < ?", (cutoff,))
+
+
+def _process_exists(pid):
+    """Whether a process with this pid is running on this host."""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, but belongs to another user
+        return True
+    return True
+
+
+class SqliteEventChannel(EventChannel):
+    """Event channel backed by the worker queue database, readable across processes."""
+
+    def __init__(self, queue, run_id):
+        super().__init__(run_id)
+        self.queue = queue
+
+    def publish(self, kind, **data):
+        """Append an event to the run's log in the database."""
+        seq = self.queue.append_event(self.run_id, kind, data)
+        if kind in (EVENT_COMPLETED, EVENT_ERROR):
+            self.closed = True
+        return RunEvent(seq, kind, data)
+
+    def read_since(self, cursor=0):
+        """Events with a sequence number greater than `cursor`."""
+        events = []
+        for row in self.queue.read_events(self.run_id, cursor):
+            event = RunEvent(row['seq'], row['kind'], json.loads(row['data']))
+            event.ts = row['ts']
+            if event.kind in (EVENT_COMPLETED, EVENT_ERROR):
+                self.closed = True
+            events.append(event)
+        return events
+
+    def wait(self, cursor=0, timeout=None):
+        """Poll until events newer than `cursor` exist or the run closes."""
+        deadline = time.time() + timeout if timeout is not None else None
+        while True:
+            events = self.read_since(cursor)
+            if events or self.closed or (deadline is not None and time.time() >= deadline):
+                return events
+            time.sleep(WORKER_POLL_INTERVAL)
+
+
+# --------- Worker Process ---------
+async def _run_workflow_job(queue, job, state):
+    """Run a browser workflow with this worker's own browser."""
+    # Imported here so only worker processes load the browser machinery
+    from browser import execute_workflow, build_browser_profile
+    from browser_pool import BrowserPool
+    from screenshot_store import ScreenshotStore
+
+    if 'pool' not in state:
+        profile = build_browser_profile(single_process=WORKER_BROWSER_SINGLE_PROCESS)
+        state['pool'] = BrowserPool(profile, size=1)
+
+    payload = job['payload']
+    channel = SqliteEventChannel(queue, job['id'])
+    result = await execute_workflow(
+        payload['query'], payload['sensitive_data'], channel, ScreenshotStore(), pool=state['pool'],
+        app_user=payload.get('app_user'), steps=payload.get('steps'), request=payload.get('request')
+    )
+    return {'final_result': result.final_result(), 'is_done': result.is_done(), 'agent_steps': result.number_of_steps()}
+
+async def _run_synthetic_job(queue, job, state):
+    """Load-test job: burn CPU, then wait on simulated I/O."""
+    payload = job['payload']
+    deadline = time.process_time() + payload.get('cpu_seconds', 0)
+    iterations = 0
+    while time.process_time() < deadline:
+        iterations += 1
+    await asyncio.sleep(payload.get('io_seconds', 0))
+    return {'iterations': iterations}
+
+JOB_HANDLERS = {
+    'workflow': _run_workflow_job,
+    'synthetic': _run_synthetic_job,
+}
+
+async def _watch_cancel(queue, job_id, task, poll_interval, heartbeat_interval=WORKER_HEARTBEAT_INTERVAL):
+    """Cancel a job's task once the UI requests it, and send the job's heartbeats meanwhile."""
+    last_heartbeat = time.monotonic()
+    while not task.done():
+        if queue.is_cancel_requested(job_id):
+            task.cancel()
+            return
+        if time.monotonic() - last_heartbeat >= heartbeat_interval:
+            queue.heartbeat(job_id)
+            last_heartbeat = time.monotonic()
+        await asyncio.sleep(poll_interval)
+
+async def _run_job(queue, job, state, poll_interval):
+    """Run one claimed job and record its outcome."""
+    handler = JOB_HANDLERS.get(job['kind'])
+    if handler is None:
+        queue.finish(job['id'], JOB_FAILED, error=f"Unknown job kind: {job['kind']}")
+        return
+
+    task = asyncio.ensure_future(handler(queue, job, state))
+    watcher = asyncio.ensure_future(_watch_cancel(queue, job['id'], task, poll_interval))
+    status, result, error = JOB_SUCCEEDED, None, None
+    try:
+        result = await asyncio.wait_for(task, timeout=job['timeout'])
+    except asyncio.TimeoutError:
+        status, error = JOB_TIMED_OUT, f"Timed out after {job['timeout']:.0f}s"
+    except asyncio.CancelledError:
+        status, error = JOB_CANCELLED, "Cancelled"
+    except Exception as e:
+        status, error = JOB_FAILED, str(e)
+    finally:
+        watcher.cancel()
+
+    queue.finish(job['id'], status, result=result, error=error)
+
+    # Cancelled or timed-out runs never reach execute_workflow's error handler
+    if job['kind'] == 'workflow' and not queue.run_closed(job['id']):
+        queue.append_event(job['id'], EVENT_ERROR, {'error': error or f"Workflow run {status}"})
+
+async def run_worker(worker_id, db_path=WORKER_QUEUE_PATH, poll_interval=WORKER_POLL_INTERVAL):
+    """Pull and run jobs from the queue forever."""
+    queue = JobQueue(db_path)
+    state = {}
+    print(f"✅ Worker {worker_id} started (pid {os.getpid()})")
+
+    while True:
+        job = queue.claim(worker_id)
+        if job is None:
+            await asyncio.sleep(poll_interval)
+            continue
+        await _run_job(queue, job, state, poll_interval)
+
+
+# --------- Fleet Manager ---------
+class WorkerFleet:
+    """Starts worker processes and submits jobs to them through the queue."""
+
+    def __init__(self, count=WORKER_COUNT, db_path=WORKER_QUEUE_PATH, max_queue=JOB_QUEUE_SIZE):
+        self.count = max(1, count)
+        self.db_path = str(db_path)
+        self.max_queue = max_queue
+        self.queue = JobQueue(self.db_path)
+        self._processes = []
+
+    def start(self):
+        """Recover from a previous fleet and launch the worker processes."""
+        orphaned = self.queue.fail_orphaned()
+        for job_id in orphaned:
+            if not self.queue.run_closed(job_id):
+                self.queue.append_event(job_id, EVENT_ERROR, {'error': "Worker stopped"})
+        self.queue.prune()
+
+        # Workers split this process's share of the OpenAI rate limits
+        env = {**os.environ, 'LLM_RATE_SHARE': str(LLM_RATE_SHARE / self.count)}
+        for i in range(self.count):
+            self._processes.append(subprocess.Popen(
+                [sys.executable, str(WORKER_SCRIPT), '--worker-id', f"worker-{i}", '--db', self.db_path],
+                cwd=WORKER_SCRIPT.parent, env=env
+            ))
+        print(f"✅ Started {self.count} worker process(es)")
+
+    def stop(self):
+        """Terminate the worker processes."""
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self._processes = []
+
+    def alive(self):
+        """Number of worker processes still running."""
+        return sum(1 for process in self._processes if process.poll() is None)
+
+    def submit(self, kind, payload, job_id=None, timeout=JOB_TIMEOUT):
+        """Queue a job for the workers. Raises JobQueueFull when the queue is at capacity."""
+        if self.queue.count(JOB_QUEUED) >= self.max_queue:
+            raise JobQueueFull(f"Job queue is full ({self.max_queue} waiting)")
+        return self.queue.enqueue(kind, payload, job_id=job_id, timeout=timeout)
+
+    def status(self, job_id):
+        """Status snapshot of a job, including its queue position."""
+        job = self.queue.get(job_id)
+        if job is not None:
+            job['queue_position'] = self.queue.queue_position(job_id)
+        return job
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job."""
+        return self.queue.request_cancel(job_id)
+
+    def channel(self, run_id):
+        """Event channel for reading a run's events from the UI process."""
+        return SqliteEventChannel(self.queue, run_id)
+
+    def get_stats(self):
+        """Counts of jobs by state and live workers."""
+        stats = self.queue.stats()
+        stats['workers'] = self.alive()
+        return stats
+
+
+_fleet = None
+_fleet_lock = threading.Lock()
+
+
+def get_worker_fleet():
+    """Get the process-wide worker fleet, starting it on first use."""
+    global _fleet
+
+    with _fleet_lock:
+        if _fleet is None:
+            import atexit
+            _fleet = WorkerFleet()
+            _fleet.start()
+            atexit.register(_fleet.stop)
+        return _fleet
+
+
+def main():
+    """Run one worker, or a fleet of workers in the foreground."""
+    parser = argparse.ArgumentParser(description="Workflow Automator worker processes")
+    parser.add_argument('--worker-id', help='Run a single worker with this id')
+    parser.add_argument('--workers', type=int, default=WORKER_COUNT, help='Number of workers to start')
+    parser.add_argument('--db', default=WORKER_QUEUE_PATH, help='Path to the SQLite job queue')
+    args = parser.parse_args()
+
+    if args.worker_id:
+        try:
+            asyncio.run(run_worker(args.worker_id, args.db))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    fleet = WorkerFleet(count=args.workers, db_path=args.db)
+    fleet.start()
+    try:
+        while fleet.alive():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("🛑 Stopping workers...")
+    finally:
+        fleet.stop()
+
+if __name__ == "__main__":
+    main()